@@ -0,0 +1,107 @@
+"""Compare the marshmallow and compiled serializers on a release manifest and a package listing.
+
+Usage: python benchmarks/serializers.py [--packages 500] [--repeat 20]
+"""
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import jsonify  # noqa: E402
+from moto import mock_s3  # noqa: E402
+
+from ups import create_app  # noqa: E402
+from ups.database import db  # noqa: E402
+from ups.models import (Namespace, Package, PackageVersion, Release,  # noqa: E402
+                        packages_schema, package_version_schema)
+from ups.models.release import ReleasePackage  # noqa: E402
+from ups.models.serializers import (dump_packages, dump_versions,  # noqa: E402
+                                    package_rows, version_rows)
+
+
+def build_release(count):
+    namespace = Namespace(name='Benchmark')
+    versions = [PackageVersion(package=Package(name=f'Package {i}', namespace=namespace),
+                               version=f'1.{i}.0', local=f'C:/package-{i}', run='run.bat')
+                for i in range(count)]
+
+    release = Release(title='Benchmark').save()
+    release.set_versions(versions, commit=True)
+
+    return release.id, namespace.slug
+
+
+def manifest_marshmallow(release_id):
+    db.session.expunge_all()
+
+    versions = (PackageVersion.loading('manifest')
+                              .join(ReleasePackage,
+                                    ReleasePackage.package_version_id == PackageVersion.id)
+                              .filter(ReleasePackage.release_id == release_id)
+                              .all())
+
+    PackageVersion.presign(versions)
+
+    return jsonify(title='Benchmark',
+                   packages=package_version_schema.dump(versions, many=True).data).get_data()
+
+
+def manifest_compiled(release_id):
+    db.session.expunge_all()
+
+    rows = version_rows(PackageVersion.query
+                                      .join(ReleasePackage,
+                                            ReleasePackage.package_version_id == PackageVersion.id)
+                                      .filter(ReleasePackage.release_id == release_id)).all()
+
+    return jsonify(title='Benchmark', packages=dump_versions(rows)).get_data()
+
+
+def listing_marshmallow(namespace_slug):
+    db.session.expunge_all()
+
+    packages = Package.loading('summary').filter_by(namespace_slug=namespace_slug).all()
+
+    return jsonify(packages_schema.dump(packages).data).get_data()
+
+
+def listing_compiled(namespace_slug):
+    db.session.expunge_all()
+
+    rows = package_rows(Package.query.filter_by(namespace_slug=namespace_slug)).all()
+
+    return jsonify(dump_packages(rows)).get_data()
+
+
+def compare(name, marshmallow, compiled, argument, repeat):
+    assert marshmallow(argument) == compiled(argument), f"{name}: outputs differ"
+
+    slow = min(timeit.repeat(lambda: marshmallow(argument), number=1, repeat=repeat))
+    fast = min(timeit.repeat(lambda: compiled(argument), number=1, repeat=repeat))
+
+    print(f"{name:<10} marshmallow {slow * 1000:8.2f}ms   compiled {fast * 1000:8.2f}ms   "
+          f"({slow / fast:.1f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--packages', type=int, default=500)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    with mock_s3():
+        app = create_app('test')
+
+        with app.test_request_context():
+            release_id, namespace_slug = build_release(args.packages)
+            manifest_compiled(release_id)  # sign every URL up front; both paths share them
+
+            print(f"{args.packages} packages, best of {args.repeat}")
+            compare('manifest', manifest_marshmallow, manifest_compiled, release_id, args.repeat)
+            compare('listing', listing_marshmallow, listing_compiled, namespace_slug, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""Time importing ups and calling create_app() in fresh interpreters, listing the slowest imports.
+
+Usage: python benchmarks/startup.py [--config test --config prod] [--repeat 10]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STARTUP = """
+import time
+start = time.perf_counter()
+from ups.app import create_app
+create_app({config!r})
+print(time.perf_counter() - start)
+"""
+
+
+def time_startup(config):
+    output = subprocess.run([sys.executable, '-c', STARTUP.format(config=config)],
+                            cwd=ROOT, check=True, stdout=subprocess.PIPE,
+                            stderr=subprocess.DEVNULL, universal_newlines=True).stdout
+
+    return float(output.split()[-1])
+
+
+def slowest_imports(config, count):
+    """The `count` modules with the highest cumulative import time, as (microseconds, name)."""
+    stderr = subprocess.run([sys.executable, '-X', 'importtime', '-c', STARTUP.format(config=config)],
+                            cwd=ROOT, check=True, stdout=subprocess.DEVNULL,
+                            stderr=subprocess.PIPE, universal_newlines=True).stderr
+
+    modules = []
+
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+
+        _, cumulative, name = line[len('import time:'):].split('|')
+
+        name = name.strip()
+
+        if '.' not in name and name != 'ups':  # top-level packages only
+            modules.append((int(cumulative), name))
+
+    return sorted(modules, reverse=True)[:count]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--config', action='append', choices=['dev', 'test', 'prod'])
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--imports', type=int, default=10, help="slowest imports to list")
+    args = parser.parse_args()
+
+    time_startup('test')  # compile bytecode before anything is timed
+
+    for config in args.config or ['test', 'prod']:
+        times = [time_startup(config) for _ in range(args.repeat)]
+
+        print(f"create_app({config!r}): median {statistics.median(times) * 1000:.0f}ms, "
+              f"min {min(times) * 1000:.0f}ms over {args.repeat} runs")
+
+        for cumulative, name in slowest_imports(config, args.imports):
+            print(f"  {cumulative / 1000:7.1f}ms  {name}")
+
+
+if __name__ == '__main__':
+    main()
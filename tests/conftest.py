@@ -7,6 +7,8 @@ from ups import create_app
 
 from flask.testing import FlaskClient
 
+from sqlalchemy import event
+
 
 class TestClient(FlaskClient):
     def open(self, *args, **kwargs):
@@ -25,6 +27,28 @@ def app():
     return app
 
 
+@pytest.fixture
+def client(app):
+    """A client that doesn't preserve request contexts, which streamed responses push again."""
+    return app.test_client()
+
+
 @pytest.fixture
 def test_media_directory():
     return os.path.join(os.path.dirname(os.path.realpath(__file__)), 'media')
+
+
+@pytest.fixture
+def statements(app):
+    """The SQL statements run against the packages database during a test."""
+    engine = app.db.get_engine(app, bind='packages')
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', record)
+
+    yield statements
+
+    event.remove(engine, 'before_cursor_execute', record)
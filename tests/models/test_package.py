@@ -3,12 +3,92 @@ import pytest
 import sqlalchemy
 
 from ups.models import Package, PackageVersion, Namespace
+from ups.models.package import package_ids
+from ups.models.utils import version_key
 
 from pathlib import PosixPath
 from distutils.version import LooseVersion
 
 
 class TestPackages:
+    def test_lookup_paths_across_namespaces(self, app):
+        hello, world = Namespace(name='Hello'), Namespace(name='World')
+        a = Package.create(name='Dog Bog', namespace=hello)
+        b = Package.create(name='Dog Bog', namespace=world)
+        Package.create(name='Mog', namespace=world)
+
+        assert Package.lookup_path('hello/dog-bog') == a
+        assert Package.lookup_path('world/dog-bog') == b
+        assert Package.lookup_path('hello/mog') is None
+        assert set(Package.lookup_paths(['hello/dog-bog', 'world/dog-bog', 'hello/mog'])) == {a, b}
+        assert Package.lookup('World', 'Dog Bog') == b
+
+    def test_package_lookups_do_not_load_versions(self, app, statements):
+        n = Namespace(name='Hello')
+        p = Package.create(name='Dog Bog', namespace=n)
+        PackageVersion.create(package=p, version='1.0.0', local='C:/dog-bog')
+        path = p.path
+        package_ids.clear()
+        app.db.session.expunge_all()
+        del statements[:]
+
+        assert Package.lookup_path(path).name == 'Dog Bog'
+        assert len(Package.lookup_paths([path])) == 1
+
+        assert statements and not any('package_versions' in s for s in statements)
+
+    def test_lookup_path_cache_is_invalidated(self, app):
+        n = Namespace(name='Hello')
+        p = Package.create(name='Dog Bog', namespace=n)
+
+        assert Package.lookup_path(p.path) == p
+        assert package_ids.get(p.path) == p.id
+
+        p.delete()
+        assert p.path not in package_ids
+        assert Package.lookup_path(p.path) is None
+
+        replacement = Package.create(name='Dog Bog', namespace=n)
+        assert Package.lookup_path(p.path) == replacement
+
+    def test_lookup_path_ignores_stale_cache_entry(self, app):
+        n = Namespace(name='Hello')
+        p = Package.create(name='Dog Bog', namespace=n)
+        other = Package.create(name='Mog', namespace=n)
+
+        package_ids.set(p.path, other.id)  # as if another worker had renamed things
+
+        assert Package.lookup_path(p.path) == p
+        assert package_ids.get(p.path) == p.id
+
+    def test_package_version_latest_and_range(self, app):
+        n = Namespace(name='Hello')
+        p = Package.create(name='Dog Bog', namespace=n)
+
+        for version in ['1.9.0', '1.10.0', '2.0.0b1', '2.0.0']:
+            PackageVersion.create(package=p, version=version, local='C:/dog-bog')
+
+        assert str(PackageVersion.latest(p).version) == '2.0.0'
+        assert str(PackageVersion.latest(p, '<2').version) == '2.0.0b1'
+        assert str(PackageVersion.latest(p, '>=1.2,<1.10').version) == '1.9.0'
+        assert PackageVersion.latest(p, '>3') is None
+
+        with pytest.raises(ValueError):
+            PackageVersion.in_range('>=1.2,<<2')
+
+    def test_package_version_backfill_version_keys(self, app):
+        n = Namespace(name='Hello')
+        p = Package.create(name='Dog Bog', namespace=n)
+        v = PackageVersion.create(package=p, version='1.10.0', local='C:/dog-bog')
+
+        app.db.session.query(PackageVersion).update({'version_key': None})
+        app.db.session.commit()
+
+        assert PackageVersion.backfill_version_keys(batch_size=1) == 1
+
+        app.db.session.refresh(v)
+        assert v.version_key == version_key('1.10.0')
+
     def test_packages_get_slug(self, app):
         n = Namespace(name='Hello')
         p = Package(name='Dog Bog', namespace=n)
@@ -64,21 +64,81 @@ class TestPackages:
         release = Release().save()
         release.set_versions([version], commit=True)
 
-        data = release_manifest_schema.dump(release).data  # actually generates
-                                                           # version.url; so don't do this after
-                                                           # expected
+        data = release_manifest_schema.dump(release).data
 
         expected = {
             "title": None,
-            "packages": [{"remote": version.url,
+            "packages": [{"remote": version.remote,
                           "local": version.local,
                           "version": version.version,
                           "name": version.package.name,
                           "run": version.run,
-                          "test": version.test}]
+                          "test": version.test,
+                          "digest": version.digest}]
         }
 
         print(data)
         print(expected)
 
         assert data == expected
+
+    @mock_s3
+    def test_manifest_snapshot_is_built_once_per_revision(self, app, version, version_factory):
+        release = Release().save()
+        release.set_versions([version], commit=True)
+
+        snapshot = release.manifest_snapshot()
+        expected = flask.json.loads(flask.json.dumps(release_manifest_schema.dump(release).data))
+        assert flask.json.loads(snapshot) == expected
+        assert release.manifest_snapshot() is snapshot
+
+        release.set_versions([version_factory('2.0.0')], commit=True)
+        assert release.manifest_snapshot() is not snapshot
+        assert flask.json.loads(release.manifest_snapshot())['packages'][0]['version'] == '2.0.0'
+
+    @mock_s3
+    def test_manifest_snapshot_query_count_is_constant(self, app, namespace, statements):
+        versions = [PackageVersion(package=Package(name=f'Package {i}', namespace=namespace),
+                                   version='1.0.0', local='C:/dog-bog')
+                    for i in reversed(range(5))]
+
+        release = Release().save()
+        release.set_versions(versions, commit=True)
+        release_id = release.id
+        app.db.session.expunge_all()
+        del statements[:]
+
+        manifest = flask.json.loads(Release.get(release_id).manifest_snapshot())
+
+        assert [v['name'] for v in manifest['packages']] == [f'Package {i}' for i in range(5)]
+        assert len(statements) == 2  # the release, then its versions with their packages
+
+    @mock_s3
+    def test_editing_a_version_bumps_its_releases(self, app, version):
+        release = Release().save()
+        release.set_versions([version], commit=True)
+
+        revision = release.revision
+        snapshot = release.manifest_snapshot()
+
+        version.update(run='run.bat')
+
+        assert release.revision == revision + 1
+        assert flask.json.loads(release.manifest_snapshot())['packages'][0]['run'] == 'run.bat'
+        assert release.manifest_snapshot() != snapshot
+
+    @mock_s3
+    def test_renaming_a_package_bumps_its_releases(self, app, version, package):
+        release = Release().save()
+        release.set_versions([version], commit=True)
+
+        revision = release.revision
+        release.manifest_snapshot()
+
+        package.update(name='Dog Log')
+
+        assert release.revision == revision + 1
+        assert flask.json.loads(release.manifest_snapshot())['packages'][0]['name'] == 'Dog Log'
+
+        version.package.update(namespace_slug=version.package.namespace_slug)
+        assert release.revision == revision + 1
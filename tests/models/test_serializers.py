@@ -0,0 +1,33 @@
+from flask import jsonify
+
+from moto import mock_s3
+
+from ups.models import (Package, PackageVersion, Namespace, packages_schema,
+                        package_versions_schema)
+from ups.models.serializers import dump_packages, dump_versions, package_rows, version_rows
+
+
+class TestSerializers:
+    def test_dump_packages_matches_schema(self, app):
+        n = Namespace(name='Hello')
+        for name in ['Dog Bog', 'Mog', 'Ünïcode']:
+            app.db.session.add(Package(name=name, namespace=n))
+        app.db.session.commit()
+
+        query = Package.query.order_by(Package.slug)
+
+        expected = jsonify(packages_schema.dump(query.all()).data).get_data()
+        assert jsonify(dump_packages(package_rows(query).all())).get_data() == expected
+
+    @mock_s3
+    def test_dump_versions_matches_schema(self, app):
+        n = Namespace(name='Hello')
+        p = Package.create(name='Dog Bog', namespace=n)
+
+        PackageVersion.create(package=p, version='1.0.0', local='C:/dog-bog', run='run.bat')
+        PackageVersion.create(package=p, version='1.10b2', digest='ab' * 32)
+
+        query = PackageVersion.query.order_by(PackageVersion.version_key)
+
+        expected = jsonify(package_versions_schema.dump(query.all()).data).get_data()
+        assert jsonify(dump_versions(version_rows(query).all())).get_data() == expected
@@ -1,6 +1,6 @@
 from sqlalchemy import not_
 
-from ups.models.utils import TimezoneAwareDatetime
+from ups.models.utils import TimezoneAwareDatetime, version_key
 from ups.database import Model, Column, UuidPrimaryKey
 
 import arrow
@@ -56,3 +56,16 @@ class TestTimezoneAwareDatetime:
 
         assert Example.query.filter(not_(Example.created.is_future())).all() == [e]
         assert Example.query.filter(Example.created.is_future()).all() == []
+
+
+class TestVersionKey:
+    def test_version_key_sorts_numerically(self):
+        versions = ['0.9', '1.0a', '1.0b1', '1.0b2', '1.0', '1.0.1', '1.2', '1.10', '2', '10.0']
+
+        assert sorted(versions, key=version_key) == versions
+        assert sorted(version_key(v) for v in versions) == [version_key(v) for v in versions]
+
+    def test_version_key_ignores_trailing_zeros(self):
+        assert version_key('1.2') == version_key('1.2.0') == version_key('1.2.0.0')
+        assert version_key('1.02') == version_key('1.2')
+        assert version_key('1.0.1') != version_key('1.1')
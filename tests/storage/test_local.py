@@ -0,0 +1,148 @@
+import datetime
+import io
+import urllib.parse
+
+import pytest
+
+from ups.models import Namespace, Package, PackageVersion
+from ups.storage import StorageBucket, StorageCubby
+
+
+class TestLocalStorage:
+    @pytest.fixture
+    def bucket(self, app, tmpdir):
+        app.config['STORAGE_LOCAL_ROOT'] = str(tmpdir)
+        app.config['STORAGE_LOCAL_BASE_URL'] = 'http://localhost'
+        return StorageBucket("file://local/packages")
+
+    def test_store_and_retrieve(self, bucket, tmpdir):
+        cubby = bucket.cubby('dog-bog/dog-bog-1.0.0.zip')
+        cubby.store(bytes=b'not a zip')
+
+        assert cubby.exists()
+        assert cubby.filesize() == 9
+        assert cubby.contents() == b'not a zip'
+        assert tmpdir.join('local', 'packages', 'dog-bog', 'dog-bog-1.0.0.zip').read_binary() == \
+            b'not a zip'
+
+        cubby.delete()
+        assert not cubby.exists()
+
+    def test_retrieve_parallel(self, bucket, tmpdir, monkeypatch):
+        cubby = bucket.cubby('big.zip')
+        monkeypatch.setattr(cubby, 'DownloadChunkSize', 100)
+
+        data = bytes(range(256)) * 5
+        cubby.store(file=io.BytesIO(data))
+
+        filepath = str(tmpdir.join('big.zip'))
+        cubby.retrieve(filepath=filepath, parallel=True)
+
+        assert tmpdir.join('big.zip').read_binary() == data
+
+    def test_keys_cannot_escape_bucket(self, bucket):
+        with pytest.raises(ValueError):
+            bucket.cubby('../../etc/passwd')
+
+    def test_buckets_cannot_escape_root(self, app, tmpdir):
+        app.config['STORAGE_LOCAL_ROOT'] = str(tmpdir.join('root'))
+
+        with pytest.raises(ValueError):
+            StorageBucket("file://../packages")
+
+    def test_keys_cannot_escape_bucket_through_links(self, bucket, tmpdir):
+        tmpdir.join('local', 'packages', 'link').mksymlinkto(tmpdir)
+
+        with pytest.raises(ValueError):
+            bucket.cubby('link/secret.txt')
+
+    def test_file_service_needs_secret_key(self, app, client, bucket):
+        cubby = bucket.cubby('a/one.zip')
+        cubby.store(bytes=b'not a zip')
+        url = cubby.url()
+
+        app.config['SECRET_KEY'] = None
+
+        with pytest.raises(Exception):
+            StorageBucket("file://local/other")
+
+        assert client.get(url).status_code == 403
+
+    def test_list(self, bucket):
+        bucket.cubby('b/two.zip').store(bytes=b'2')
+        bucket.cubby('a/one.zip').store(bytes=b'1')
+
+        assert [c.key for c in bucket.list()] == ['a/one.zip', 'b/two.zip']
+        assert [c.key for c in bucket.list(prefix='b/')] == ['b/two.zip']
+
+    def test_storage_cubby_from_string(self, bucket):
+        bucket.cubby('a/one.zip').store(bytes=b'1')
+
+        assert StorageCubby("file://local/packages/a/one.zip").contents() == b'1'
+
+    def test_signed_url_serves_file(self, app, client, bucket):
+        cubby = bucket.cubby('a/one.zip')
+        cubby.store(bytes=b'not a zip')
+
+        response = client.get(cubby.url())
+        assert response.status_code == 200
+        assert response.data == b'not a zip'
+        assert response.mimetype == 'application/zip'
+
+    def test_signed_url_rejects_tampering_and_expiry(self, app, client, bucket):
+        cubby = bucket.cubby('a/one.zip')
+        cubby.store(bytes=b'not a zip')
+
+        url = cubby.url()
+        response = client.get(url.replace('signature=', 'signature=0'))
+        assert response.status_code == 403
+
+        response = client.get(url.replace('one.zip', 'two.zip'))
+        assert response.status_code == 403
+
+        response = client.get(cubby.url(duration=datetime.timedelta(seconds=-1)))
+        assert response.status_code == 403
+
+    def test_signed_url_ignores_request_host(self, app, bucket):
+        cubby = bucket.cubby('a/one.zip')
+
+        with app.test_request_context(headers={'Host': 'evil.example'}):
+            url = cubby.url()
+
+        assert urllib.parse.urlparse(url).netloc == 'localhost'
+
+    def test_signed_url_uses_base_url_path(self, app, bucket):
+        app.config['STORAGE_LOCAL_BASE_URL'] = 'https://example.com/ups'
+
+        url = bucket.cubby('a/one.zip').url()
+
+        assert url.startswith('https://example.com/ups/api/v1/storage/local/packages/a/one.zip?')
+
+    def test_accel_redirect(self, app, client, bucket):
+        app.config['STORAGE_LOCAL_ACCEL_REDIRECT'] = '/protected/'
+
+        cubby = bucket.cubby('a/one.zip')
+        cubby.store(bytes=b'not a zip')
+
+        response = client.get(cubby.url())
+        assert response.status_code == 200
+        assert response.data == b''
+
+        path = urllib.parse.urlparse(cubby.url()).path
+        assert path.endswith('/storage/local/packages/a/one.zip')
+        assert response.headers['X-Accel-Redirect'] == '/protected/local/packages/a/one.zip'
+
+    def test_versions_can_be_stored_locally(self, app, client, bucket, monkeypatch):
+        monkeypatch.setattr(app.storage, 'default_service', 'file')
+        monkeypatch.setattr(app.storage, 'default_location', 'local')
+        monkeypatch.setattr(app.storage, 'default_bucket', 'packages')
+
+        n = Namespace(name='Hello')
+        p = Package.create(name='Dog Bog', namespace=n)
+
+        response = client.post(f"/api/v1/namespaces/{n.slug}/{p.slug}/1.0.0",
+                               data=b'not a zip', content_type='application/zip')
+        assert response.status_code == 200
+
+        assert PackageVersion.query.one().cubby().contents() == b'not a zip'
+        assert client.get(response.json['remote']).data == b'not a zip'
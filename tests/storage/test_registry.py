@@ -0,0 +1,70 @@
+import os
+import threading
+
+from ups.storage.registry import BucketRegistry
+
+
+class FakeBucket:
+    def __init__(self, name):
+        self.name = name
+        self.location = 'LOCATION'
+
+    def service_id(self):
+        return 'fake'
+
+
+class TestBucketRegistry:
+    def test_get_builds_each_bucket_once(self):
+        registry = BucketRegistry()
+        built = []
+
+        def factory():
+            built.append(FakeBucket('a'))
+            return built[-1]
+
+        first = registry.get('fake', 'LOCATION', 'a', factory)
+        assert registry.get('fake', 'LOCATION', 'a', factory) is first
+        assert len(built) == 1
+
+        other = registry.get('fake', 'LOCATION', 'b', lambda: FakeBucket('b'))
+        assert other is not first
+        assert len(registry) == 2
+
+    def test_get_is_thread_safe(self):
+        registry = BucketRegistry()
+        built = []
+        start = threading.Barrier(8)
+
+        def factory():
+            built.append(FakeBucket('a'))
+            return built[-1]
+
+        def get():
+            start.wait()
+            registry.get('fake', 'LOCATION', 'a', factory)
+
+        threads = [threading.Thread(target=get) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(built) == 1
+
+    def test_forked_child_starts_empty(self, monkeypatch):
+        registry = BucketRegistry()
+        parent = registry.get('fake', 'LOCATION', 'a', lambda: FakeBucket('a'))
+
+        pid = os.getpid()
+        monkeypatch.setattr(os, 'getpid', lambda: pid + 1)
+
+        child = registry.get('fake', 'LOCATION', 'a', lambda: FakeBucket('a'))
+        assert child is not parent
+
+    def test_discard(self):
+        registry = BucketRegistry()
+        bucket = registry.get('fake', 'LOCATION', 'a', lambda: FakeBucket('a'))
+
+        registry.discard(bucket)
+
+        assert len(registry) == 0
@@ -0,0 +1,96 @@
+import io
+
+from moto import mock_s3
+
+from ups.storage import S3Bucket
+from ups.storage.service import read_chunk
+
+
+class TrickleStream(io.RawIOBase):
+    """A stream that, like a socket, returns fewer bytes than were asked for."""
+
+    def __init__(self, data, step=1000):
+        self.data = io.BytesIO(data)
+        self.step = step
+
+    def read(self, size=-1):
+        return self.data.read(min(size, self.step))
+
+
+class TestS3Cubby:
+    def test_read_chunk_fills_short_reads(self):
+        stream = TrickleStream(b'x' * 2500)
+
+        assert read_chunk(stream, 2200) == b'x' * 2200
+        assert read_chunk(stream, 2200) == b'x' * 300
+        assert read_chunk(stream, 2200) == b''
+
+    @mock_s3
+    def test_store_small_file_in_one_request(self, app):
+        cubby = S3Bucket(name='BUCKET', location='LOCATION').cubby('small.zip')
+        cubby.store(bytes=b'not a zip')
+
+        assert cubby.contents() == b'not a zip'
+
+    @mock_s3
+    def test_store_large_file_as_multipart_upload(self, app, monkeypatch):
+        cubby = S3Bucket(name='BUCKET', location='LOCATION').cubby('large.zip')
+
+        chunk_size = 5 * 1024 * 1024
+        monkeypatch.setattr(cubby, 'UploadChunkSize', chunk_size)
+        monkeypatch.setattr(cubby, 'UploadConcurrency', 2)
+
+        data = bytes(range(256)) * (chunk_size * 2 // 256) + b'tail'
+        cubby.store(file=TrickleStream(data, step=1024 * 1024))
+
+        assert cubby.contents() == data
+        assert cubby.bucket.client.list_multipart_uploads(Bucket='BUCKET').get('Uploads') is None
+
+    @mock_s3
+    def test_retrieve_parallel_ranges_into_file(self, app, tmpdir, monkeypatch):
+        cubby = S3Bucket(name='BUCKET', location='LOCATION').cubby('ranged.zip')
+        monkeypatch.setattr(cubby, 'DownloadChunkSize', 1000)
+
+        data = bytes(range(256)) * 41
+        cubby.store(bytes=data)
+
+        filepath = str(tmpdir.join('ranged.zip'))
+        cubby.retrieve(filepath=filepath, parallel=True)
+
+        with open(filepath, 'rb') as file:
+            assert file.read() == data
+
+        with open(filepath, 'w+b') as file:
+            file.write(b'stale contents longer than nothing')
+            cubby.retrieve(file=file, parallel=True)
+            file.seek(0)
+            assert file.read() == data
+
+    @mock_s3
+    def test_retrieve_parallel_into_memory_falls_back_to_sequential(self, app):
+        cubby = S3Bucket(name='BUCKET', location='LOCATION').cubby('small.zip')
+        cubby.store(bytes=b'not a zip')
+
+        buffer = io.BytesIO()
+        cubby.retrieve(file=buffer, parallel=True)
+
+        assert buffer.getvalue() == b'not a zip'
+
+    @mock_s3
+    def test_list_exists_and_delete_through_the_client(self, app):
+        bucket = S3Bucket(name='BUCKET', location='LOCATION')
+
+        for name in ['a/one.zip', 'a/two.zip', 'b/three.zip']:
+            bucket.cubby(name).store(bytes=b'not a zip')
+
+        listed = bucket.list(prefix='a/')
+        assert [cubby.key for cubby in listed] == ['a/one.zip', 'a/two.zip']
+        assert [cubby.filesize() for cubby in listed] == [9, 9]
+        assert len(bucket.list(max_keys=2)) == 2
+
+        cubby = bucket.cubby('a/one')
+        assert not cubby.exists()
+
+        listed[0].delete()
+        assert not listed[0].exists()
+        assert bucket.cubby('a/two.zip').filesize() == 9
@@ -0,0 +1,74 @@
+import datetime
+
+import pytest
+
+from ups.storage import urls as urls_module
+from ups.storage.urls import PresignedUrlCache
+
+
+class Clock:
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+class TestPresignedUrlCache:
+    @pytest.fixture
+    def clock(self, monkeypatch):
+        clock = Clock(1000 * 3600.0)
+        monkeypatch.setattr(urls_module.time, 'time', clock.time)
+        return clock
+
+    @pytest.fixture
+    def signed(self):
+        return []
+
+    @pytest.fixture
+    def cache(self, signed, clock):
+        def sign(string, duration):
+            signed.append(string)
+            return f"https://signed/{string}?at={clock.now}&for={duration.total_seconds()}"
+
+        return PresignedUrlCache(sign, duration=datetime.timedelta(hours=4),
+                                 refresh=datetime.timedelta(hours=1), max_size=3)
+
+    def test_signs_once_per_window(self, cache, signed, clock):
+        url = cache.get('s3://a/b/c')
+        clock.now += 1800
+        assert cache.get('s3://a/b/c') == url
+        assert signed == ['s3://a/b/c']
+
+        clock.now += 1800
+        assert cache.get('s3://a/b/c') != url
+        assert signed == ['s3://a/b/c', 's3://a/b/c']
+
+    def test_get_many_signs_only_missing(self, cache, signed):
+        cache.get('s3://a/b/1')
+
+        urls = cache.get_many(['s3://a/b/1', 's3://a/b/2', 's3://a/b/2'])
+
+        assert set(urls) == {'s3://a/b/1', 's3://a/b/2'}
+        assert signed == ['s3://a/b/1', 's3://a/b/2']
+
+    def test_evicts_stale_windows_before_current(self, cache, clock):
+        cache.get_many(['s3://a/b/1', 's3://a/b/2'])
+        clock.now += 3600
+        cache.get_many(['s3://a/b/3', 's3://a/b/4'])
+
+        assert len(cache) == 2
+        assert set(cache._urls) == {'s3://a/b/3', 's3://a/b/4'}
+
+    def test_window_remaining(self, cache, clock):
+        clock.now += 600
+        assert cache.window_remaining() == 3000
+
+    def test_window_start(self, cache, clock):
+        clock.now += 600
+        assert cache.window_start().timestamp() == 1000 * 3600.0
+
+    def test_refresh_must_be_shorter_than_duration(self):
+        with pytest.raises(ValueError):
+            PresignedUrlCache(None, duration=datetime.timedelta(hours=1),
+                              refresh=datetime.timedelta(hours=1))
@@ -0,0 +1,82 @@
+import io
+import json
+import os
+import queue
+
+import pytest
+
+from ups import log
+from ups.log import random_color, start_access_log, stop_access_log
+from ups.metrics import metrics
+
+
+@pytest.fixture
+def access_log(app):
+    """The JSON access log, written to a buffer instead of stdout."""
+    stream = io.StringIO()
+
+    stop_access_log()
+    start_access_log(stream)
+    app.config['LOG_ACCESS_FORMAT'] = 'json'
+
+    def records():
+        stop_access_log()  # waits for the writer to catch up
+        return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+    yield records
+
+    stop_access_log()
+
+
+def test_json_access_log(app, client, access_log):
+    client.get("/api/v1/namespaces/nothing/")
+
+    record, = access_log()
+
+    assert record['method'] == 'GET'
+    assert record['path'] == '/api/v1/namespaces/nothing/'
+    assert record['status'] == 404
+    assert record['duration_ms'] >= 0
+
+
+def test_access_log_sampling(app, client, access_log):
+    app.config['LOG_ACCESS_SAMPLE_RATE'] = 0
+
+    client.get("/api/v1/namespaces/nothing/")
+
+    assert access_log() == []
+
+
+def test_forked_worker_restarts_the_writer(app, client, access_log, monkeypatch):
+    parent = start_access_log()
+
+    pid = os.getpid()
+    monkeypatch.setattr(os, 'getpid', lambda: pid + 1)
+
+    client.get("/api/v1/namespaces/nothing/")
+
+    assert log._access_listener is not parent
+    assert len(access_log()) == 1
+
+
+def test_dropped_records_are_counted(app, access_log, monkeypatch):
+    full = queue.Queue(maxsize=1)
+    full.put(None)
+
+    handler, = log.access_log.handlers
+    monkeypatch.setattr(handler, 'queue', full)
+
+    log.access_log.info("dropped")
+
+    assert 'ups_access_log_dropped_total 1' in metrics.render()
+
+
+def test_random_color_is_stable_and_leaves_random_alone():
+    import random
+
+    random.seed(1)
+    expected = random.random()
+
+    random.seed(1)
+    assert random_color('127.0.0.1') == random_color('127.0.0.1')
+    assert random.random() == expected
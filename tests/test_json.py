@@ -0,0 +1,42 @@
+import datetime
+import decimal
+import pathlib
+import uuid
+
+from distutils.version import LooseVersion
+
+from flask import json
+
+from ups.views.utils import iter_json
+
+
+class TestJSON:
+    def test_encoder_converts_known_types(self, app):
+        id = uuid.uuid4()
+
+        encoded = json.loads(json.dumps({
+            "uuid": id,
+            "decimal": decimal.Decimal('1.5'),
+            "datetime": datetime.datetime(2018, 1, 2, 3, 4, 5),
+            "date": datetime.date(2018, 1, 2),
+            "path": pathlib.Path("a/b"),
+            "version": LooseVersion('1.2.3'),
+            "set": {1},
+        }))
+
+        assert encoded == {"uuid": str(id), "decimal": 1.5, "datetime": "2018-01-02T03:04:05",
+                           "date": "2018-01-02", "path": "a/b", "version": "1.2.3", "set": [1]}
+
+    def test_encoder_remembers_subclasses(self, app):
+        class Tag(LooseVersion):
+            pass
+
+        assert json.dumps(Tag('2.0')) == '"2.0"'
+        assert Tag in app.json_encoder.conversions
+
+    def test_iter_json_matches_dumps(self, app):
+        items = [{"b": i, "a": str(i)} for i in range(3)]
+        data = {"title": "Hi", "items": iter(items), "count": 3}
+
+        assert ''.join(iter_json(data)) == json.dumps(dict(data, items=items))
+        assert ''.join(iter_json(iter([]))) == '[]'
@@ -0,0 +1,97 @@
+import tracemalloc
+
+import pytest
+
+from moto import mock_s3
+
+from ups import memory
+from ups.metrics import metrics
+
+from tests.factories import Factories
+
+
+@pytest.fixture
+def admin(app):
+    app.config['ADMIN_TOKEN'] = 'secret'
+    return {'Authorization': 'Bearer secret'}
+
+
+@pytest.fixture
+def tracking():
+    memory.start()
+    yield
+    memory.stop()
+
+
+def test_top_modules_groups_allocations(tracking):
+    before = memory.get_snapshot(memory.take_snapshot())
+    hoard = [bytearray(1024) for _ in range(1000)]  # noqa: F841
+    after = memory.get_snapshot(memory.take_snapshot())
+
+    top, *_ = memory.top_modules(after, compared_to=before)
+
+    assert top['module'] == __name__
+    assert top['size_diff'] >= 1000 * 1024
+
+
+def test_memory_routes(app, client, admin):
+    assert client.get("/api/v1/admin/memory").status_code == 401
+    assert client.post("/api/v1/admin/memory/snapshots", headers=admin).status_code == 409
+
+    try:
+        response = client.post("/api/v1/admin/memory/tracking?frames=2", headers=admin)
+        assert response.json['tracing'] and response.json['frames'] == 2
+
+        first = client.post("/api/v1/admin/memory/snapshots", headers=admin).json['id']
+        second = client.post("/api/v1/admin/memory/snapshots?limit=5", headers=admin).json['id']
+
+        response = client.get(f"/api/v1/admin/memory/snapshots/{second}?compare={first}",
+                              headers=admin)
+        assert response.status_code == 200
+        assert all('size_diff' in module for module in response.json['modules'])
+
+        response = client.get(f"/api/v1/admin/memory/snapshots/{second}?compare=9999",
+                              headers=admin)
+        assert response.status_code == 404
+    finally:
+        response = client.delete("/api/v1/admin/memory/tracking", headers=admin)
+
+    assert not tracemalloc.is_tracing()
+    assert response.json['snapshots'] == []
+
+
+class TestPeakMemory(Factories):
+    @mock_s3
+    def test_manifest_retained_memory_is_recorded(self, app, client, suite, scheduled_suite_release,
+                                                  tracking):
+        endpoint = ('api.route_get_current_suite_manifest',)
+        before = memory.retained_bytes.snapshot().get(endpoint, [0])[:-1]
+
+        assert client.get(f"/api/v1/suites/{suite.slug}/current").status_code == 200
+
+        after = memory.retained_bytes.snapshot()[endpoint][:-1]
+        assert sum(after) == sum(before) + 1
+
+    def test_concurrent_requests_are_not_measured(self, app, tracking):
+        route = memory.measure_peak_memory(lambda: 'done')
+
+        with memory._measuring:
+            with app.test_request_context():
+                before = memory.retained_bytes.snapshot()
+                assert route() == 'done'
+
+        assert memory.retained_bytes.snapshot() == before
+
+    @pytest.mark.skipif(not hasattr(tracemalloc, 'reset_peak'), reason="needs Python 3.9")
+    @mock_s3
+    def test_manifest_peak_memory_is_recorded(self, app, client, suite, scheduled_suite_release,
+                                              tracking):
+        endpoint = ('api.route_get_current_suite_manifest',)
+        before = memory.peak_bytes.snapshot().get(endpoint, [0])[:-1]
+
+        assert client.get(f"/api/v1/suites/{suite.slug}/current").status_code == 200
+
+        after = memory.peak_bytes.snapshot()[endpoint][:-1]
+        assert sum(after) == sum(before) + 1
+        assert 'ups_request_peak_bytes_count{endpoint="api.route_get_current_suite_manifest"}' \
+            in metrics.render()
@@ -0,0 +1,120 @@
+import os
+import subprocess
+import sys
+import threading
+
+import pytest
+from moto import mock_s3
+
+from ups.metrics import Histogram, Metrics
+from ups.models import Namespace
+
+
+def sample(text, line):
+    """The value of the sample `line` (name and labels) in the exposition `text`."""
+    for sample_line in text.splitlines():
+        if sample_line.rsplit(' ', 1)[0] == line:
+            return float(sample_line.rsplit(' ', 1)[1])
+
+    return None
+
+
+class TestHistogram:
+    def test_threads_observe_into_their_own_shards(self):
+        histogram = Histogram('test_seconds', "", ('name',), buckets=(0.1, 1.0))
+
+        def observe():
+            for _ in range(1000):
+                histogram.observe(('a',), 0.5)
+
+        threads = [threading.Thread(target=observe) for _ in range(4)]
+
+        for thread in threads:
+            thread.start()
+
+        for thread in threads:
+            thread.join()
+
+        histogram.observe(('a',), 5)
+
+        assert histogram.snapshot() == {('a',): [0, 4000, 1, 2005.0]}
+
+    def test_workers_are_aggregated_through_the_directory(self, tmpdir):
+        worker, other = Metrics(), Metrics()
+        worker.directory = other.directory = str(tmpdir)
+
+        other.sql_seconds.observe(('packages',), 0.002)
+        other.write()
+        tmpdir.join(other._path().rsplit('/', 1)[1]).move(tmpdir.join(f'metrics-{os.getppid()}.json'))
+
+        worker.sql_seconds.observe(('packages',), 0.5)
+
+        text = worker.render()
+
+        assert sample(text, 'ups_sql_seconds_count{bind="packages"}') == 2
+        assert sample(text, 'ups_sql_seconds_bucket{bind="packages",le="0.0025"}') == 1
+
+    def test_replaced_workers_totals_are_kept(self, tmpdir, monkeypatch):
+        worker = Metrics()
+        worker.directory = str(tmpdir)
+
+        exited = subprocess.Popen([sys.executable, '-c', ''])
+        exited.wait()
+        live = os.getppid()
+
+        pids = [os.getpid()]
+        monkeypatch.setattr(os, 'getpid', lambda: pids[-1])
+
+        def as_worker(pid, seconds, *actions):
+            pids.append(pid)
+            metrics = Metrics()
+            metrics.directory = str(tmpdir)
+            metrics.sql_seconds.observe(('packages',), seconds)
+
+            for action in actions:
+                getattr(metrics, action)()
+
+            pids.pop()
+
+        def count():
+            return sample(worker.render(), 'ups_sql_seconds_count{bind="packages"}')
+
+        # a worker killed without a chance to retire its own totals
+        as_worker(exited.pid, 0.002, 'write')
+        assert count() == 1
+        assert not tmpdir.join(f'metrics-{exited.pid}.json').exists()
+
+        # a worker exiting normally, its writer waking once more
+        as_worker(live, 0.5, 'retire', 'write')
+        assert not tmpdir.join(f'metrics-{live}.json').exists()
+        assert count() == 2
+
+        # a file left under a pid that's been reused by a new worker
+        as_worker(live, 0.5, 'write')
+        as_worker(live, 5.0, 'write')
+
+        assert count() == 4
+        assert sample(worker.render(), 'ups_sql_seconds_sum{bind="packages"}') == \
+            pytest.approx(6.002)
+        assert tmpdir.join(f'metrics-{live}.json').exists()
+
+    def test_forked_worker_starts_from_zero(self, monkeypatch):
+        metrics = Metrics()
+        metrics.sql_seconds.observe(('packages',), 0.5)
+
+        pid = os.getpid()
+        monkeypatch.setattr(os, 'getpid', lambda: pid + 1)
+
+        assert metrics.collect()['ups_sql_seconds'] == {}
+
+
+@mock_s3
+def test_metrics_route(app, client):
+    Namespace.create(name='Hello')
+    client.get("/api/v1/namespaces/hello/")
+
+    text = client.get("/metrics").get_data(as_text=True)
+
+    assert sample(text, 'ups_request_seconds_count{endpoint="api.route_get_all_packages",'
+                        'method="GET",status="200"}') >= 1
+    assert sample(text, 'ups_sql_seconds_count{bind="packages"}') >= 1
@@ -1,5 +1,7 @@
 from ups.models import Package, PackageVersion, Namespace
 
+import re
+
 
 class TestPackageRoutes:
     def test_get_all_packages(self, app, client):
@@ -11,6 +13,71 @@ class TestPackageRoutes:
         assert response.status_code == 200
         assert response.json[0] == {"name": p.name, "path": p.path}
 
+    def test_get_all_packages_pages_with_cursor(self, app, client):
+        n = Namespace(name='Hello')
+        names = [f'Package {i}' for i in range(5)]
+
+        for name in names:
+            app.db.session.add(Package(name=name, namespace=n))
+
+        app.db.session.commit()
+
+        url = f"/api/v1/namespaces/{n.slug}/?limit=2"
+        seen = []
+
+        while url is not None:
+            response = client.get(url)
+            assert response.status_code == 200
+            assert len(response.json) <= 2
+
+            seen += [package['name'] for package in response.json]
+
+            link = re.match(r'<(.+)>; rel="next"', response.headers.get('Link', ''))
+            url = link and link.group(1)
+
+        assert seen == sorted(names)
+
+    def test_get_all_packages_without_limit_lists_everything(self, app, client):
+        n = Namespace(name='Hello')
+
+        for i in range(150):
+            app.db.session.add(Package(name=f'Package {i:03}', namespace=n))
+
+        app.db.session.commit()
+
+        response = client.get(f"/api/v1/namespaces/{n.slug}/")
+        assert response.status_code == 200
+        assert len(response.json) == 150
+        assert 'Link' not in response.headers
+
+    def test_get_all_packages_streams_with_limit_all(self, app, client):
+        n = Namespace(name='Hello')
+        names = [f'Package {i}' for i in range(5)]
+
+        for name in names:
+            app.db.session.add(Package(name=name, namespace=n))
+
+        app.db.session.commit()
+
+        response = client.get(f"/api/v1/namespaces/{n.slug}/?limit=all")
+        assert response.status_code == 200
+        assert response.is_streamed
+        assert [package['name'] for package in response.json] == sorted(names)
+        assert 'Link' not in response.headers
+
+    def test_get_all_packages_rejects_non_positive_limit(self, app, client):
+        n = Namespace(name='Hello').save()
+
+        for limit in ('0', '-1'):
+            response = client.get(f"/api/v1/namespaces/{n.slug}/?limit={limit}")
+            assert response.status_code == 400
+
+    def test_get_all_packages_rejects_invalid_cursor(self, app, client):
+        n = Namespace(name='Hello').save()
+
+        response = client.get(f"/api/v1/namespaces/{n.slug}/?cursor=not-a-cursor")
+        assert response.status_code == 400
+
     def test_get_all_packages_returns_404(self, app, client):
         response = client.get(f"/api/v1/namespaces/not-a-namespace/")
         assert response.status_code == 404
@@ -0,0 +1,67 @@
+import threading
+
+import pytest
+
+from ups.profiler import ProfilerBusy, Sampler
+
+
+def spin(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+@pytest.fixture
+def busy_thread():
+    stop = threading.Event()
+    thread = threading.Thread(target=spin, args=(stop,), name='busy')
+    thread.start()
+
+    yield thread
+
+    stop.set()
+    thread.join()
+
+
+def test_sampler_counts_other_threads_stacks(busy_thread):
+    sampler = Sampler(interval=0.001)
+    stacks = sampler.run(0.1)
+
+    assert sampler.samples > 0
+    assert any(stack.startswith('busy;') and 'tests.test_profiler:spin' in stack
+               for stack in stacks)
+    assert all(' ' not in line.rsplit(' ', 1)[0] for line in sampler.collapsed().splitlines())
+
+
+def test_one_profile_at_a_time():
+    with Sampler._lock:
+        with pytest.raises(ProfilerBusy):
+            Sampler().run(0.01)
+
+
+def test_profile_route_requires_admin_token(app, client):
+    assert client.get("/api/v1/admin/profile?seconds=0.1").status_code == 401
+
+    app.config['ADMIN_TOKEN'] = 'secret'
+
+    response = client.get("/api/v1/admin/profile?seconds=0.1",
+                          headers={'Authorization': 'Bearer wrong'})
+    assert response.status_code == 401
+
+    response = client.get("/api/v1/admin/profile?seconds=0.1",
+                          headers={'Authorization': 'Bearer é'})
+    assert response.status_code == 401
+
+
+def test_profile_route(app, client, busy_thread):
+    app.config['ADMIN_TOKEN'] = 'secret'
+    headers = {'Authorization': 'Bearer secret'}
+
+    response = client.get("/api/v1/admin/profile?seconds=0.1&interval=1", headers=headers)
+    assert response.status_code == 200
+    assert 'tests.test_profiler:spin' in response.get_data(as_text=True)
+
+    response = client.get("/api/v1/admin/profile?seconds=0.1&format=json", headers=headers)
+    assert response.json['samples'] > 0
+
+    response = client.get("/api/v1/admin/profile?seconds=3600", headers=headers)
+    assert response.status_code == 400
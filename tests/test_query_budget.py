@@ -0,0 +1,53 @@
+import arrow
+import collections
+import flask
+import pytest
+
+from moto import mock_s3
+
+from ups.models import Package, PackageVersion, Release, Suite
+from ups.views.queries import QueryBudgetExceeded, check_query_budget
+
+from tests.factories import Factories
+
+
+class TestQueryBudget(Factories):
+    def _check(self, app, statements, budget=None):
+        with app.test_request_context('/api/v1/suites/hello/'):
+            flask.g.statements = collections.Counter(statements)
+
+            if budget is not None:
+                flask.g.query_budget = budget
+
+            return check_query_budget(app.response_class())
+
+    def test_overrun_raises_when_strict(self, app):
+        with pytest.raises(QueryBudgetExceeded):
+            self._check(app, {'SELECT 1': 1, 'SELECT 2': 1}, budget=(1, None))
+
+        with pytest.raises(QueryBudgetExceeded):
+            self._check(app, {'SELECT 1': 3}, budget=(None, 2))
+
+        assert self._check(app, {'SELECT 1': 2}, budget=(2, 2)).status_code == 200
+
+    def test_overrun_only_warns_otherwise(self, app):
+        app.config['QUERY_BUDGET_STRICT'] = False
+
+        assert self._check(app, {'SELECT 1': 3}, budget=(1, 1)).status_code == 200
+
+    def test_routes_without_a_budget_never_raise(self, app):
+        assert self._check(app, {'SELECT 1': 1000}).status_code == 200
+
+    @mock_s3
+    def test_manifest_queries_do_not_grow_with_the_suite(self, app, client, namespace):
+        packages = [Package(name=f'Package {i}', namespace=namespace) for i in range(25)]
+        versions = [PackageVersion(package=p, version='1.0', local='C:/dog-bog') for p in packages]
+        suite = Suite.create(name='Big Suite', packages=packages)
+
+        release = Release(suite=suite).save()
+        release.set_versions(versions, commit=True)
+        release.schedule(arrow.utcnow().shift(minutes=-1), commit=True)
+
+        assert client.get(f"/api/v1/suites/{suite.slug}/current").status_code == 200
+        assert client.get(f"/api/v1/suites/{suite.slug}/?limit=100").status_code == 200
+        assert client.get(f"/api/v1/namespaces/{namespace.slug}/?limit=100").status_code == 200
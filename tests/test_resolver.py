@@ -0,0 +1,98 @@
+import pytest
+
+from moto import mock_s3
+
+from ups.models import Package, PackageVersion
+from ups.resolver import ResolutionError, Resolver
+
+from tests.factories import Factories
+
+
+class TestResolver(Factories):
+    @pytest.fixture
+    def catalogue(self, app, namespace):
+        """Packages a, b and c, where a 2.0 needs c <2 and a 1.0 needs b >=1.1."""
+        packages = {name: Package.create(name=name, namespace=namespace) for name in 'abc'}
+        versions = {}
+
+        for name, numbers in [('a', ['1.0', '2.0']), ('b', ['1.0', '1.1', '1.2']), ('c', ['1.0', '2.0'])]:
+            for number in numbers:
+                versions[name, number] = PackageVersion(package=packages[name], version=number,
+                                                        local='C:/dog-bog').save(commit=False)
+
+        versions['a', '2.0'].set_dependencies({packages['c']: '<2'})
+        versions['a', '1.0'].set_dependencies({packages['b']: '>=1.1'})
+        app.db.session.commit()
+
+        return packages, versions
+
+    def _resolve(self, resolver, packages, requirements):
+        solution = resolver.resolve({packages[name].id: spec for name, spec in requirements.items()})
+        ids = {package.id: name for name, package in packages.items()}
+
+        return {ids[package_id]: str(PackageVersion.get(version_id).version)
+                for package_id, version_id in solution.items()}
+
+    def test_resolves_highest_versions_with_dependencies(self, app, catalogue):
+        packages, _ = catalogue
+
+        assert self._resolve(Resolver(), packages, {'a': None}) == {'a': '2.0', 'c': '1.0'}
+        assert self._resolve(Resolver(), packages, {'a': '<2'}) == {'a': '1.0', 'b': '1.2'}
+
+    def test_backtracks_when_roots_conflict(self, app, catalogue):
+        packages, _ = catalogue
+
+        solution = self._resolve(Resolver(), packages, {'a': None, 'c': '>=2'})
+        assert solution == {'a': '1.0', 'b': '1.2', 'c': '2.0'}
+
+    def test_unsatisfiable_requirements_raise(self, app, catalogue):
+        packages, _ = catalogue
+
+        with pytest.raises(ResolutionError) as e:
+            self._resolve(Resolver(), packages, {'a': '<2', 'b': '<1.1'})
+
+        assert e.value.package_id == packages['b'].id
+
+    def test_memoized_resolutions_follow_catalogue_changes(self, app, catalogue):
+        packages, _ = catalogue
+        resolver = Resolver()
+
+        assert self._resolve(resolver, packages, {'c': None}) == {'c': '2.0'}
+        assert len(resolver.resolutions) == 1
+
+        assert self._resolve(resolver, packages, {'c': None}) == {'c': '2.0'}
+        assert len(resolver.resolutions) == 1
+
+        PackageVersion.create(package=packages['c'], version='3.0', local='C:/dog-bog')
+
+        assert self._resolve(resolver, packages, {'c': None}) == {'c': '3.0'}
+
+    @mock_s3
+    def test_resolve_route(self, app, client, catalogue):
+        packages, _ = catalogue
+
+        response = client.post("/api/v1/resolve", json={packages['a'].path: '<2'})
+        assert response.status_code == 200
+        assert [(v['path'], v['version']) for v in response.json['versions']] == [
+            (packages['a'].path, '1.0'), (packages['b'].path, '1.2')]
+        assert response.json['versions'][0]['dependencies'] == {packages['b'].path: '>=1.1'}
+
+        response = client.post("/api/v1/resolve", json={packages['a'].path: '>5'})
+        assert response.status_code == 409
+
+        response = client.post("/api/v1/resolve", json={'hello/nothing': None})
+        assert response.status_code == 400
+
+    @mock_s3
+    def test_set_dependencies_through_version_route(self, app, client, catalogue):
+        packages, versions = catalogue
+
+        response = client.put(f"/api/v1/namespaces/{packages['b'].path}/1.0",
+                              json={"dependencies": {packages['c'].path: '>=2'}})
+        assert response.status_code == 200
+        assert [(d.package, d.constraint) for d in versions['b', '1.0'].dependencies] == [
+            (packages['c'], '>=2')]
+
+        response = client.put(f"/api/v1/namespaces/{packages['b'].path}/1.0",
+                              json={"dependencies": {packages['c'].path: '>>2'}})
+        assert response.status_code == 400
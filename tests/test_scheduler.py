@@ -0,0 +1,103 @@
+import arrow
+import pytest
+
+from ups import scheduler as scheduler_module
+from ups.models import Release
+from ups.scheduler import scheduler
+
+from tests.factories import Factories
+
+
+class Clock:
+    def __init__(self):
+        self.now = arrow.utcnow().float_timestamp
+
+    def time(self):
+        return self.now
+
+
+class TestReleaseScheduler(Factories):
+    @pytest.fixture
+    def clock(self, monkeypatch):
+        clock = Clock()
+        monkeypatch.setattr(scheduler_module.time, 'time', clock.time)
+        return clock
+
+    @pytest.fixture
+    def activations(self):
+        activations = []
+        listener = scheduler.on_activate(lambda suite, release: activations.append((suite, release)))
+
+        yield activations
+
+        scheduler._listeners.remove(listener)
+
+    def test_loads_current_release_from_database(self, app, suite, suite_release,
+                                                 scheduled_suite_release):
+        assert scheduler.current_release_id(suite.slug) == suite_release.id
+        assert scheduler.current_release(suite) == suite_release
+
+    def test_suite_without_release_has_no_current(self, app, suite):
+        assert scheduler.current_release_id(suite.slug) is None
+        assert scheduler.current_release(suite) is None
+
+    def test_activates_release_when_due(self, app, clock, suite, suite_release, activations):
+        assert scheduler.current_release_id(suite.slug) is None
+
+        when = arrow.get(clock.now).shift(minutes=5)
+        suite_release.schedule(when, commit=True)
+
+        assert scheduler.current_release_id(suite.slug) is None
+        assert activations == []
+
+        clock.now = when.float_timestamp
+        assert scheduler.current_release_id(suite.slug) == suite_release.id
+        assert activations == [(suite.slug, suite_release.id)]
+
+    def test_latest_due_release_wins(self, app, clock, suite, suite_release, activations):
+        later = Release(suite=suite).save()
+
+        now = arrow.get(clock.now)
+        suite_release.schedule(now.shift(minutes=-10), commit=True)
+        later.schedule(now.shift(minutes=-5), commit=True)
+
+        assert scheduler.current_release_id(suite.slug) == later.id
+
+    def test_refresh_picks_up_other_processes(self, app, clock, suite, suite_release):
+        assert scheduler.current_release_id(suite.slug) is None
+
+        scheduler.enabled = False  # as if scheduled elsewhere; this process isn't told
+        suite_release.schedule(arrow.get(clock.now).shift(minutes=-1), commit=True)
+        scheduler.enabled = True
+
+        assert scheduler.current_release_id(suite.slug) is None
+
+        clock.now += scheduler.refresh_interval + 1
+        assert scheduler.current_release_id(suite.slug) == suite_release.id
+
+    def test_rolled_back_releases_are_not_activated(self, app, clock, suite, suite_release):
+        assert scheduler.current_release_id(suite.slug) is None
+
+        suite_release.schedule(arrow.get(clock.now).shift(minutes=-1), commit=False)
+        app.db.session.flush()
+        app.db.session.rollback()
+
+        assert scheduler.current_release_id(suite.slug) is None
+
+    def test_lookup_reloads_when_another_process_schedules(self, app, clock, suite,
+                                                           suite_release):
+        assert scheduler.current_release(suite) is None
+
+        scheduler.enabled = False  # as if scheduled elsewhere; this process isn't told
+        suite_release.schedule(arrow.get(clock.now).shift(minutes=-1), commit=True)
+        scheduler.enabled = True
+
+        assert scheduler.current_release(suite) == suite_release
+
+    def test_lookup_does_not_query_the_schedule(self, app, suite, suite_release,
+                                                scheduled_suite_release, statements):
+        assert scheduler.current_release(suite) == suite_release
+
+        del statements[:]
+        assert scheduler.current_release(suite) == suite_release
+        assert not [statement for statement in statements if 'scheduled_releases' in statement]
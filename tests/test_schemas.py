@@ -0,0 +1,40 @@
+import json
+
+import jsonschema
+import pytest
+
+from ups.views.errors import ErrorResponse
+from ups.views.responses import PackageNotFoundErrorResponse
+from ups.views.schemas import SchemaRegistry, schemas
+
+
+class TestSchemaRegistry:
+    def test_validators_are_compiled_once(self):
+        assert schemas.validator('response.json') is schemas.validator('response.json')
+
+    def test_refs_resolve_against_the_directory(self, tmpdir):
+        tmpdir.join('name.json').write(json.dumps({"type": "string", "minLength": 1}))
+        tmpdir.join('person.json').write(json.dumps({
+            "type": "object",
+            "properties": {"name": {"$ref": "name.json"}},
+        }))
+
+        validator = SchemaRegistry(str(tmpdir)).validator('person.json')
+
+        assert validator.is_valid({"name": "dog"})
+        assert not validator.is_valid({"name": ""})
+
+    def test_error_responses_are_flattened_and_valid(self, app):
+        response = ErrorResponse([PackageNotFoundErrorResponse('a/b'),
+                                  PackageNotFoundErrorResponse('a/c')], 400)
+
+        assert len(json.loads(response.response.get_data())['errors']) == 2
+
+    def test_invalid_error_responses_raise_when_testing(self, app):
+        with pytest.raises(jsonschema.ValidationError):
+            ErrorResponse([{"code": 404}], 404)
+
+    def test_response_validation_can_be_switched_off(self, app):
+        app.config['RESPONSE_VALIDATION_RATE'] = 0
+
+        ErrorResponse([{"code": 404}], 404)
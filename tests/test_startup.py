@@ -0,0 +1,20 @@
+import subprocess
+import sys
+
+
+def test_create_app_defers_heavy_imports():
+    script = ("import sys\n"
+              "from ups.app import create_app\n"
+              "create_app('test')\n"
+              "print(' '.join(m for m in ('boto3', 'jsonschema') if m in sys.modules))\n")
+
+    output = subprocess.run([sys.executable, '-c', script], check=True,
+                            stdout=subprocess.PIPE, universal_newlines=True).stdout
+
+    assert output.strip() == ''
+
+
+def test_create_prod_app():
+    from ups import create_app
+
+    assert create_app('prod').config['ENV'] == 'prod'
@@ -1,8 +1,10 @@
 import flask
 
-from ups.models import (Package, Namespace, Suite, packages_schema,
+from ups.models import (Package, PackageVersion, Namespace, Suite, packages_schema,
                         package_versions_schema)
 
+from ups.scheduler import scheduler
+
 from slugify import slugify
 
 from moto import mock_s3
@@ -22,6 +24,22 @@ class TestSuiteRoutes(Factories):
         assert response.json['packages'] == packages_schema.dump([p]).data
         assert response.json['slug'] == s.slug
 
+    def test_get_suite_pages_packages(self, app, client):
+        n = Namespace(name='Hello')
+        packages = [Package(name=f'Package {i}', namespace=n) for i in range(3)]
+        s = Suite.create(name="Suite", packages=packages)
+
+        response = client.get(f"/api/v1/suites/{s.slug}/?limit=2")
+        assert response.status_code == 200
+        assert response.json['slug'] == s.slug
+        assert len(response.json['packages']) == 2
+
+        next_url = response.headers['Link'].split('>')[0][1:]
+        response = client.get(next_url)
+        assert response.status_code == 200
+        assert len(response.json['packages']) == 1
+        assert 'Link' not in response.headers
+
     def test_create_suite(self, app, client):
         suite_name = "Heavenly Suite"
         response = client.post(f"/api/v1/suites/{suite_name}/")
@@ -108,3 +126,112 @@ class TestSuiteRoutes(Factories):
 
         expected = package_versions_schema.dump(suite.current_release().package_versions).data
         self.assert_json_equal(response.json['packages'], expected)
+
+    @mock_s3
+    def test_get_suite_manifest_does_not_write(self, app, client, suite, version,
+                                               scheduled_suite_release):
+        response = client.get(f"/api/v1/suites/{suite.slug}/current")
+        assert response.status_code == 200
+
+        assert response.json['packages'][0]['remote'] == version.remote
+        assert PackageVersion.query.one().url is None
+
+    @mock_s3
+    def test_get_suite_manifest_revalidates_with_etag(self, app, client, suite,
+                                                      scheduled_suite_release):
+        response = client.get(f"/api/v1/suites/{suite.slug}/current")
+        assert response.status_code == 200
+        assert response.headers['ETag']
+        assert 'no-cache' in response.headers['Cache-Control']
+
+        etag = response.headers['ETag']
+
+        response = client.get(f"/api/v1/suites/{suite.slug}/current",
+                              headers={'If-None-Match': etag})
+        assert response.status_code == 304
+        assert response.get_data() == b''
+
+        suite.current_release().set_versions([], commit=True)
+
+        response = client.get(f"/api/v1/suites/{suite.slug}/current",
+                              headers={'If-None-Match': etag})
+        assert response.status_code == 200
+
+    def test_get_suite_sets_body_etag(self, app, client):
+        s = Suite.create(name="Suite", packages=[])
+
+        response = client.get(f"/api/v1/suites/{s.slug}/?limit=10")
+        assert response.status_code == 200
+
+        response = client.get(f"/api/v1/suites/{s.slug}/?limit=10",
+                              headers={'If-None-Match': response.headers['ETag']})
+        assert response.status_code == 304
+
+    def _events(self, response):
+        events = []
+
+        for block in response.get_data(as_text=True).split('\n\n'):
+            fields = {}
+
+            for line in block.splitlines():
+                if not line.startswith(':'):
+                    name, value = line.split(': ', 1)
+                    fields[name] = fields[name] + '\n' + value if name in fields else value
+
+            if fields:
+                events.append(fields)
+
+        return events
+
+    @mock_s3
+    def test_suite_events_sends_current_release(self, app, client, suite, suite_release,
+                                                scheduled_suite_release):
+        app.config['EVENTS_HEARTBEAT_INTERVAL'] = 0.05
+
+        release_id = str(suite_release.id)
+        manifest = flask.json.loads(suite_release.manifest_snapshot())
+
+        response = client.get(f"/api/v1/suites/{suite.slug}/events?timeout=0.2")
+        assert response.status_code == 200
+        assert response.mimetype == 'text/event-stream'
+
+        events = self._events(response)
+        assert len(events) == 1
+        assert events[0]['id'] == release_id
+        assert events[0]['event'] == 'release'
+        assert flask.json.loads(events[0]['data']) == manifest
+
+    def test_suite_events_since_current_only_sends_heartbeats(self, app, client, suite,
+                                                              suite_release,
+                                                              scheduled_suite_release):
+        app.config['EVENTS_HEARTBEAT_INTERVAL'] = 0.05
+
+        response = client.get(f"/api/v1/suites/{suite.slug}/events?timeout=0.2",
+                                        headers={'Last-Event-ID': str(suite_release.id)})
+        assert response.status_code == 200
+        assert self._events(response) == []
+        assert ': heartbeat' in response.get_data(as_text=True)
+
+    @mock_s3
+    def test_suite_events_without_scheduler_sends_current_release(self, app, client, suite,
+                                                                  suite_release,
+                                                                  scheduled_suite_release,
+                                                                  monkeypatch):
+        monkeypatch.setattr(scheduler, 'enabled', False)
+        app.config['EVENTS_HEARTBEAT_INTERVAL'] = 0.05
+
+        release_id = str(suite_release.id)
+
+        response = client.get(f"/api/v1/suites/{suite.slug}/events?timeout=0.2")
+        assert response.status_code == 200
+
+        events = self._events(response)
+        assert [event['id'] for event in events] == [release_id]
+
+    def test_suite_events_rejects_invalid_timeout(self, app, client, suite):
+        response = client.get(f"/api/v1/suites/{suite.slug}/events?timeout=soon")
+        assert response.status_code == 400
+
+    def test_suite_events_rejects_invalid_since(self, app, client, suite):
+        response = client.get(f"/api/v1/suites/{suite.slug}/events?since=nope")
+        assert response.status_code == 400
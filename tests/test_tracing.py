@@ -0,0 +1,99 @@
+import json
+import os
+import queue
+import threading
+
+import pytest
+
+from moto import mock_s3
+
+from ups.metrics import metrics
+from ups.tracing import tracer
+
+from tests.factories import Factories
+
+
+TRACE_ID = '4bf92f3577b34da6a3ce929d0e0e4736'
+PARENT_ID = '00f067aa0ba902b7'
+
+
+class TestTracing(Factories):
+    @pytest.fixture
+    def spans(self, app, tmpdir):
+        """The spans exported while tracing every request."""
+        path = tmpdir.join('spans.jsonl')
+
+        app.config['TRACING_EXPORT_PATH'] = str(path)
+        tracer.init_app(app)
+
+        def spans():
+            tracer.exporter.close()  # waits for the writer to catch up
+            return [json.loads(line) for line in path.read().splitlines()] if path.exists() else []
+
+        yield spans
+
+        app.config['TRACING_EXPORT_PATH'] = None
+        tracer.init_app(app)
+
+    @mock_s3
+    def test_sampled_parent_traces_manifest(self, app, client, suite, scheduled_suite_release,
+                                            spans):
+        response = client.get(f"/api/v1/suites/{suite.slug}/current",
+                              headers={'traceparent': f'00-{TRACE_ID}-{PARENT_ID}-01'})
+        assert response.status_code == 200
+
+        exported = spans()
+        root, = [span for span in exported if span['parent_id'] == PARENT_ID]
+        names = {span['name'] for span in exported}
+
+        assert all(span['trace_id'] == TRACE_ID for span in exported)
+        assert root['attributes']['http.status_code'] == 200
+        assert response.headers['traceresponse'] == f"00-{TRACE_ID}-{root['span_id']}-01"
+        assert {'scheduler.current_release', 'release.manifest_snapshot', 'serialize.manifest',
+                'serialize.versions', 'storage.url', 'sql'} <= names
+
+    def test_unsampled_requests_make_no_spans(self, app, client, namespace, spans):
+        client.get(f"/api/v1/namespaces/{namespace.slug}/?limit=10",
+                   headers={'traceparent': f'00-{TRACE_ID}-{PARENT_ID}-00'})
+        client.get(f"/api/v1/namespaces/{namespace.slug}/?limit=10")
+
+        assert spans() == []
+
+    def test_sample_rate_starts_traces(self, app, client, namespace, spans):
+        tracer.sample_rate = 1.0
+
+        response = client.get(f"/api/v1/namespaces/{namespace.slug}/?limit=10")
+
+        root, = [span for span in spans() if span['parent_id'] is None]
+        assert root['name'] == f"GET /api/v1/namespaces/{namespace.slug}/"
+        assert response.headers['traceresponse'].split('-')[1] == root['trace_id']
+
+    def test_forked_worker_restarts_the_exporter(self, app, client, namespace, spans, monkeypatch):
+        client.get(f"/api/v1/namespaces/{namespace.slug}/?limit=10",
+                   headers={'traceparent': f'00-{TRACE_ID}-{PARENT_ID}-01'})
+        exporter = tracer.exporter
+        exporter.close()
+        exporter._thread = threading.Thread()  # a child inherits the parent's, but not its running
+
+        pids = [os.getpid()]
+        monkeypatch.setattr(os, 'getpid', lambda: pids[-1])
+
+        pids.append(pids[0] + 1)
+        client.get(f"/api/v1/namespaces/{namespace.slug}/?limit=10",
+                   headers={'traceparent': f'00-{TRACE_ID}-{PARENT_ID}-01'})
+        pids.pop()
+
+        assert exporter._pid == pids[0] + 1
+        assert len([span for span in spans() if span['parent_id'] == PARENT_ID]) == 2
+
+    def test_dropped_spans_are_counted(self, app, client, namespace, spans, monkeypatch):
+        def full(span):
+            raise queue.Full()
+
+        monkeypatch.setattr(tracer.exporter._spans, 'put_nowait', full)
+
+        client.get(f"/api/v1/namespaces/{namespace.slug}/?limit=10",
+                   headers={'traceparent': f'00-{TRACE_ID}-{PARENT_ID}-01'})
+
+        assert tracer.exporter.dropped > 0
+        assert f'ups_trace_spans_dropped_total {tracer.exporter.dropped}' in metrics.render()
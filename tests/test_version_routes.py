@@ -2,6 +2,8 @@ from moto import mock_s3
 
 from io import BytesIO
 
+import hashlib
+
 from ups.models import Package, PackageVersion, Namespace
 
 from pathlib import PosixPath
@@ -28,6 +30,124 @@ class TestVersionRoutes:
         assert response.json['versions'][0]['local'] == str(v.local)
         assert response.json['versions'][0]['version'] == str(v.version)
 
+    @mock_s3
+    def test_get_all_versions_pages_with_cursor(self, app, client):
+        n = Namespace(name='Hello')
+        p = Package.create(name='Dog Bog', namespace=n)
+
+        for version in ['1.0.0', '1.1.0', '2.0.0']:
+            PackageVersion.create(package=p, version=version, local='C:/dog-bog')
+
+        response = client.get(f"/api/v1/namespaces/{n.slug}/{p.slug}/?limit=2")
+        assert response.status_code == 200
+        assert response.json['path'] == p.path
+        assert [v['version'] for v in response.json['versions']] == ['1.0.0', '1.1.0']
+
+        next_url = response.headers['Link'].split('>')[0][1:]
+        response = client.get(next_url)
+        assert [v['version'] for v in response.json['versions']] == ['2.0.0']
+        assert 'Link' not in response.headers
+
+    @mock_s3
+    def test_get_all_versions_streams_with_limit_all(self, app, client):
+        n = Namespace(name='Hello')
+        p = Package.create(name='Dog Bog', namespace=n)
+
+        for version in ['1.0.0', '1.1.0', '2.0.0']:
+            PackageVersion.create(package=p, version=version, local='C:/dog-bog')
+
+        paged = client.get(f"/api/v1/namespaces/{n.slug}/{p.slug}/").json
+
+        response = client.get(f"/api/v1/namespaces/{n.slug}/{p.slug}/?limit=all")
+        assert response.status_code == 200
+        assert response.is_streamed
+        assert response.json == paged
+
+    @mock_s3
+    def test_get_latest_version(self, app, client):
+        n = Namespace(name='Hello')
+        p = Package.create(name='Dog Bog', namespace=n)
+
+        for version in ['1.2.0', '1.10.0', '2.0.0']:
+            PackageVersion.create(package=p, version=version, local='C:/dog-bog')
+
+        response = client.get(f"/api/v1/namespaces/{n.slug}/{p.slug}/latest")
+        assert response.status_code == 200
+        assert response.json['version'] == '2.0.0'
+
+        response = client.get(f"/api/v1/namespaces/{n.slug}/{p.slug}/latest?range=<2")
+        assert response.json['version'] == '1.10.0'
+
+        response = client.get(f"/api/v1/namespaces/{n.slug}/{p.slug}/latest?range=>2")
+        assert response.status_code == 404
+
+        response = client.get(f"/api/v1/namespaces/{n.slug}/{p.slug}/latest?range=~2")
+        assert response.status_code == 400
+
+    @mock_s3
+    def test_get_all_versions_in_range(self, app, client):
+        n = Namespace(name='Hello')
+        p = Package.create(name='Dog Bog', namespace=n)
+
+        for version in ['1.1.0', '1.2.0', '1.10.0', '2.0.0']:
+            PackageVersion.create(package=p, version=version, local='C:/dog-bog')
+
+        response = client.get(f"/api/v1/namespaces/{n.slug}/{p.slug}/?range=>=1.2,<2")
+        assert response.status_code == 200
+        assert [v['version'] for v in response.json['versions']] == ['1.2.0', '1.10.0']
+
+    @mock_s3
+    def test_get_single_version_is_cacheable(self, app, client, monkeypatch):
+        n = Namespace(name='Hello')
+        p = Package.create(name='Dog Bog', namespace=n)
+        v = PackageVersion.create(package=p, version='1.0.0', local='C:/dog-bog')
+
+        url = f"/api/v1/namespaces/{n.slug}/{p.slug}/{v.version}"
+
+        response = client.get(url)
+        assert response.status_code == 200
+        assert 'immutable' not in response.headers['Cache-Control']
+        assert response.cache_control.max_age > 0
+        assert response.headers['Last-Modified']
+
+        etag = response.headers['ETag']
+        last_modified = response.headers['Last-Modified']
+
+        response = client.get(url, headers={'If-None-Match': etag})
+        assert response.status_code == 304
+
+        response = client.get(url, headers={'If-Modified-Since': last_modified})
+        assert response.status_code == 304
+
+        # the next window's response carries newly signed URLs.
+        urls = app.storage.urls
+        monkeypatch.setattr(urls, 'window', lambda now=None: type(urls).window(urls) + 1)
+
+        response = client.get(url, headers={'If-Modified-Since': last_modified})
+        assert response.status_code == 200
+
+        v.update(local='C:/elsewhere', commit=True)
+
+        response = client.get(url, headers={'If-None-Match': etag})
+        assert response.status_code == 200
+        assert response.json['local'] == 'C:/elsewhere'
+
+    @mock_s3
+    def test_get_all_versions_etag_changes_with_versions(self, app, client):
+        n = Namespace(name='Hello')
+        p = Package.create(name='Dog Bog', namespace=n)
+
+        url = f"/api/v1/namespaces/{n.slug}/{p.slug}/"
+
+        etag = client.get(url).headers['ETag']
+        assert client.get(url, headers={'If-None-Match': etag}).status_code == 304
+
+        PackageVersion.create(package=p, version='1.0.0', local='C:/dog-bog')
+
+        response = client.get(url, headers={'If-None-Match': etag})
+        assert response.status_code == 200
+        assert len(response.json['versions']) == 1
+
     def test_get_single_package_when_package_does_not_exist_returns_404(self, app, client):
         response = client.get(f"/api/v1/namespaces/not-a-namespace/not-a-package/")
         assert response.status_code == 404
@@ -189,3 +309,82 @@ class TestVersionRoutes:
         assert PackageVersion.query.count() == 0
 
         assert v.cubby().exists() is False
+
+    @mock_s3
+    def test_post_raw_zip_body_200(self, app, client):
+        n = Namespace(name='Hello')
+        p = Package.create(name='Dog Bog', namespace=n)
+
+        bytes = b'not a zip!'
+        response = client.post(f"/api/v1/namespaces/{n.slug}/{p.slug}/1.0.0",
+                               data=bytes, content_type='application/zip')
+
+        assert response.status_code == 200
+        assert PackageVersion.query.one().cubby().contents() == bytes
+
+    @mock_s3
+    def test_post_records_digest(self, app, client):
+        n = Namespace(name='Hello')
+        p = Package.create(name='Dog Bog', namespace=n)
+
+        bytes = b'not a zip!'
+        response = client.post(f"/api/v1/namespaces/{n.slug}/{p.slug}/1.0.0",
+                               data={"file": (BytesIO(bytes), "workstation.zip")})
+
+        assert response.status_code == 200
+        assert response.json['digest'] == hashlib.sha256(bytes).hexdigest()
+
+    @mock_s3
+    def test_content_addressed_versions_share_blobs(self, app, client, monkeypatch):
+        monkeypatch.setattr(app.storage, 'content_addressed', True)
+
+        n = Namespace(name='Hello')
+        p = Package.create(name='Dog Bog', namespace=n)
+
+        bytes = b'not a zip!'
+        digest = hashlib.sha256(bytes).hexdigest()
+
+        for version in ['1.0.0', '1.0.1']:
+            response = client.post(f"/api/v1/namespaces/{n.slug}/{p.slug}/{version}",
+                                   data=bytes, content_type='application/zip')
+            assert response.status_code == 200
+            assert response.json['digest'] == digest
+
+        v1, v2 = PackageVersion.query.order_by(PackageVersion.version).all()
+        assert v1.key == v2.key == f'blobs/{digest}.zip'
+        assert [c.key for c in v1.storage_bucket().list()] == [v1.key]
+
+        response = client.delete(f"/api/v1/namespaces/{n.slug}/{p.slug}/1.0.0")
+        assert response.status_code == 200
+        assert v2.cubby().contents() == bytes
+
+        response = client.delete(f"/api/v1/namespaces/{n.slug}/{p.slug}/1.0.1")
+        assert response.status_code == 200
+        assert v2.cubby().exists() is False
+
+    @mock_s3
+    def test_content_addressed_put_links_existing_digest(self, app, client, monkeypatch):
+        monkeypatch.setattr(app.storage, 'content_addressed', True)
+
+        n = Namespace(name='Hello')
+        p = Package.create(name='Dog Bog', namespace=n)
+
+        bytes = b'not a zip!'
+        digest = hashlib.sha256(bytes).hexdigest()
+
+        response = client.put(f"/api/v1/namespaces/{n.slug}/{p.slug}/2.0.0",
+                              json={"digest": digest})
+        assert response.status_code == 400
+        assert response.json['errors'][0]['title'] == 'Digest Not Found'
+
+        response = client.post(f"/api/v1/namespaces/{n.slug}/{p.slug}/1.0.0",
+                               data=bytes, content_type='application/zip')
+        assert response.status_code == 200
+
+        response = client.put(f"/api/v1/namespaces/{n.slug}/{p.slug}/2.0.0",
+                              json={"digest": digest})
+        assert response.status_code == 200
+        assert response.json['digest'] == digest
+
+        version = PackageVersion.query.filter_by(version='2.0.0').one()
+        assert version.cubby().contents() == bytes
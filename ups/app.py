@@ -7,6 +7,8 @@ from werkzeug.routing import BaseConverter, ValidationError
 import datetime
 import os
 import logging
+import random
+import time
 import uuid
 import decimal
 import pathlib
@@ -16,10 +18,14 @@ from isodate import datetime_isoformat, date_isoformat, parse_date
 from isodate.isoerror import ISO8601Error
 from slugify import slugify
 
+from .commands import backfill_version_keys
 from .extensions import bcrypt, login_manager, migrate, marshmallow, storage
-from .log import log, bright, random_color, color
-from .settings import DevConfig, TestConfig
+from .log import log, access_log, bright, random_color, color, start_access_log
+from .settings import DevConfig, ProdConfig, TestConfig
 from .database import db
+from .metrics import metrics
+from .scheduler import scheduler
+from .tracing import tracer
 from .views import blueprint as views_blueprint
 
 
@@ -28,15 +34,11 @@ def create_app(config='dev'):
 
     :param config: A string to indicate which object to use; one of ('prod', 'dev', 'test')
     """
-    config_object = {'dev': DevConfig, 'test': TestConfig}[config]
+    config_object = {'prod': ProdConfig, 'dev': DevConfig, 'test': TestConfig}[config]
 
     app = Flask(__name__)
     app.config.from_object(config_object)
 
-    if app.config.get('PROFILE'):
-        from werkzeug.contrib.profiler import ProfilerMiddleware
-        app.wsgi_app = ProfilerMiddleware(app.wsgi_app, restrictions=[30])
-
     configure_log(app)
     configure_database(app)
     configure_json(app)
@@ -44,6 +46,7 @@ def create_app(config='dev'):
 
     register_extensions(app)
     register_blueprints(app)
+    register_commands(app)
 
     log.info("%s loaded with %s configuration", bright("ups"), bright(config))
 
@@ -58,18 +61,40 @@ def configure_log(app):
     else:
         log.setLevel(logging.INFO)
 
+    if app.config['LOG_ACCESS_FORMAT'] == 'json':
+        start_access_log()
+
     @app.before_request
     def request_log():
-        g.request_start_time = datetime.datetime.now()
-        g.request_tag = color(random_color(), request.remote_addr)
-        log.info("%s     %s %s", g.request_tag, request.method, request.path)
+        g.request_start_time = time.perf_counter()
+
+        if app.config['LOG_ACCESS_FORMAT'] == 'text' and log.isEnabledFor(logging.INFO):
+            g.request_tag = color(random_color(request.remote_addr), request.remote_addr)
+            log.info("%s     %s %s", g.request_tag, request.method, request.path)
 
     @app.after_request
     def response_log(response):
-        response_time_ms = (datetime.datetime.now() - g.request_start_time).total_seconds() * 1000.0
-        log.info("%s %d %s %s (in %.0fms)", g.request_tag,
-                 response.status_code, request.method, request.path,
-                 response_time_ms)
+        response_time_ms = (time.perf_counter() - g.request_start_time) * 1000.0
+
+        if app.config['LOG_ACCESS_FORMAT'] == 'json':
+            start_access_log()  # (re)starts the writer in a freshly forked worker
+            rate = app.config['LOG_ACCESS_SAMPLE_RATE']
+
+            if rate >= 1 or random.random() < rate:
+                access_log.info("%s %s %d", request.method, request.path, response.status_code,
+                                extra={'access': {
+                                    'method': request.method,
+                                    'path': request.path,
+                                    'query': request.query_string.decode('latin-1'),
+                                    'status': response.status_code,
+                                    'size': response.content_length,
+                                    'duration_ms': round(response_time_ms, 3),
+                                    'remote_addr': request.remote_addr,
+                                }})
+        elif 'request_tag' in g:
+            log.info("%s %d %s %s (in %.0fms)", g.request_tag,
+                     response.status_code, request.method, request.path,
+                     response_time_ms)
 
         return response
 
@@ -88,24 +113,28 @@ def configure_database(app):
 
 def configure_json(app):
     class CustomJSONEncoder(JSONEncoder):
+        # Conversions for the types json can't encode itself, looked up by exact type.
+        # A subclass is matched through its MRO the first time it is seen, then remembered.
+        conversions = {
+            uuid.UUID: str,
+            decimal.Decimal: float,
+            datetime.datetime: datetime_isoformat,
+            datetime.date: date_isoformat,
+            pathlib.Path: str,
+            LooseVersion: str,
+        }
+
         def __init__(self, *args, **kwargs):
             kwargs['separators'] = ',', ':'
             super().__init__(*args, **kwargs)
 
         def default(self, obj):
+            convert = self.conversions.get(type(obj)) or self.conversion_for(type(obj))
+
+            if convert is not None:
+                return convert(obj)
+
             try:
-                if isinstance(obj, uuid.UUID):
-                    return str(obj)
-                elif isinstance(obj, decimal.Decimal):
-                    return float(obj)
-                elif isinstance(obj, datetime.datetime):
-                    return datetime_isoformat(obj)
-                elif isinstance(obj, datetime.date):
-                    return date_isoformat(obj)
-                elif isinstance(obj, pathlib.Path):
-                    return str(obj)
-                elif isinstance(obj, LooseVersion):
-                    return str(obj)
                 iterable = iter(obj)
             except TypeError:
                 pass
@@ -113,6 +142,17 @@ def configure_json(app):
                 return list(iterable)
             return JSONEncoder.default(self, obj)
 
+        @classmethod
+        def conversion_for(cls, type_):
+            for base in type_.__mro__[1:]:
+                convert = cls.conversions.get(base)
+
+                if convert is not None:
+                    cls.conversions[type_] = convert
+                    return convert
+
+            return None
+
     app.json_encoder = CustomJSONEncoder
 
 
@@ -169,6 +209,19 @@ def register_extensions(app):
     storage.init_app(app)
     app.storage = storage
 
+    scheduler.init_app(app)
+    app.scheduler = scheduler
+
+    metrics.init_app(app)
+    app.metrics = metrics
+
+    tracer.init_app(app)
+    app.tracer = tracer
+
 
 def register_blueprints(app):
     app.register_blueprint(views_blueprint)
+
+
+def register_commands(app):
+    app.cli.add_command(backfill_version_keys)
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""In-process caches shared by the models and views."""
+from collections import OrderedDict
+
+import threading
+
+
+class LRUCache(object):
+    """A thread-safe dictionary holding at most `max_size` of its most recently used items."""
+
+    def __init__(self, max_size=1024):
+        self.max_size = max_size
+
+        self._lock = threading.Lock()
+        self._items = OrderedDict()
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                self._items.move_to_end(key)
+            except KeyError:
+                return default
+
+            return self._items[key]
+
+    def set(self, key, value):
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+        return value
+
+    def pop(self, key, default=None):
+        with self._lock:
+            return self._items.pop(key, default)
+
+    def discard_where(self, predicate):
+        """Remove every item whose key satisfies `predicate(key)`."""
+        with self._lock:
+            for key in [k for k in self._items if predicate(k)]:
+                del self._items[key]
+
+    def clear(self):
+        with self._lock:
+            self._items = OrderedDict()
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def __len__(self):
+        return len(self._items)
@@ -0,0 +1,15 @@
+"""Command line tasks, run with `flask <command>`."""
+import click
+
+from flask.cli import with_appcontext
+
+from ups.models import PackageVersion
+
+
+@click.command('backfill-version-keys')
+@click.option('--batch-size', default=1000, help="Versions updated per transaction.")
+@with_appcontext
+def backfill_version_keys(batch_size):
+    """Compute sortable version keys for versions stored before they existed."""
+    count = PackageVersion.backfill_version_keys(batch_size=batch_size)
+    click.echo(f"Set the version key of {count} version(s).")
@@ -1,12 +1,13 @@
 # -*- coding: utf-8 -*-
 """Database module, including the SQLAlchemy database object and DB-related utilities."""
+import time
 import uuid
 
 from flask_sqlalchemy import SQLAlchemy
 
 from sqlalchemy_utils import UUIDType
 
-from sqlalchemy import func
+from sqlalchemy import and_, event, func, or_
 from sqlalchemy.orm import Query, relationship
 from sqlalchemy.orm.attributes import flag_modified, set_attribute
 
@@ -29,6 +30,55 @@ class CustomQuery(Query):
 db = SQLAlchemy(session_options={'query_cls': CustomQuery})
 
 
+def on_statements(app, callback):
+    """Call `callback(bind, statement, seconds)` after every SQL statement `app` runs."""
+    binds = [None] + list(app.config.get('SQLALCHEMY_BINDS') or ())
+
+    for bind in binds:
+        engine = db.get_engine(app, bind)
+        start = object()  # this listener's key in the connection's info
+
+        def before(conn, cursor, statement, parameters, context, executemany, start=start):
+            conn.info[start] = time.perf_counter()
+
+        def after(conn, cursor, statement, parameters, context, executemany, start=start, bind=bind):
+            callback(bind, statement, time.perf_counter() - conn.info.pop(start))
+
+        event.listen(engine, 'before_cursor_execute', before)
+        event.listen(engine, 'after_cursor_execute', after)
+
+
+def keyset_page(query, columns, limit, after=None):
+    """Return up to `limit` rows of `query` in `columns` order, starting after the key `after`,
+    along with the key the next page starts after (None on the last page)."""
+    rows = keyset_query(query, columns, after).limit(limit + 1).all()
+
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+
+    return rows, [str(getattr(rows[-1], column.key)) for column in columns]
+
+
+def keyset_query(query, columns, after=None):
+    """Order `query` by `columns`, starting after the key `after` (see keyset_page())."""
+    if after is not None:
+        query = query.filter(_after_key(columns, after))
+
+    return query.order_by(*columns)
+
+
+def _after_key(columns, key):
+    # (a, b) > (x, y) spelled out, for databases without row value comparisons
+    (column, *columns), (value, *key) = columns, key
+
+    if not columns or not key:
+        return column > value
+
+    return or_(column > value, and_(column == value, _after_key(columns, key)))
+
+
 # Alias common SQLAlchemy names
 Column = db.Column
 relationship = relationship
@@ -99,6 +149,14 @@ class Model(CRUDMixin, db.Model):
 
     __abstract__ = True
 
+    # Named sets of loader options, each loading just what one kind of response serializes.
+    profiles = {}
+
+    @classmethod
+    def loading(cls, profile):
+        """Query this model with the loader options of one of its `profiles`."""
+        return cls.query.options(*cls.profiles[profile])
+
     def repr(self, columns=[]):
         kv = []
 
@@ -1,6 +1,14 @@
+import atexit
+import datetime
+import json
+import os
 import sys
 import logging
+import queue
 import random
+import zlib
+
+from logging.handlers import QueueHandler, QueueListener
 
 import colorama
 colorama.init(autoreset=True)
@@ -55,8 +63,11 @@ ALL_COLORS = [
 
 
 def random_color(key=None):
-    random.seed(key)
-    return random.choice(ALL_COLORS)
+    """A color for `key` that is always the same for the same key (random for no key)."""
+    if key is None:
+        return random.choice(ALL_COLORS)
+
+    return ALL_COLORS[zlib.crc32(key.encode()) % len(ALL_COLORS)]
 
 
 LOG_FORMAT = (dim('%(asctime)s ') +
@@ -97,3 +108,94 @@ stdout_handler.setFormatter(formatter)
 log = logging.getLogger('ups')
 log.addHandler(stdout_handler)
 log.propagate = False
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats a record as one line of JSON, including the fields of its `access` extra."""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.datetime.utcfromtimestamp(record.created).isoformat() + 'Z',
+            'level': record.levelname,
+            'message': record.getMessage(),
+        }
+        entry.update(getattr(record, 'access', {}))
+
+        return json.dumps(entry, separators=(',', ':'))
+
+
+class AccessQueueHandler(QueueHandler):
+    """Hands records to the background writer unformatted, dropping them when it falls behind."""
+
+    def __init__(self, records):
+        super().__init__(records)
+        self.dropped = 0
+
+    def prepare(self, record):
+        return record  # formatted by the writer's thread, not the request's
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+ACCESS_LOG_QUEUE_SIZE = 10000
+
+access_log = logging.getLogger('ups.access')
+access_log.setLevel(logging.INFO)
+access_log.propagate = False
+
+_access_listener = None
+_access_pid = None
+
+
+def start_access_log(stream=None):
+    """Write `access_log` records to `stream` (stdout) as JSON lines, from a background thread
+    that is started again in a forked worker."""
+    global _access_listener, _access_pid
+
+    writers = None
+
+    if _access_listener is not None and _access_pid != os.getpid():
+        writers = _access_listener.handlers
+        _access_listener = None
+
+        for handler in list(access_log.handlers):
+            access_log.removeHandler(handler)
+
+    if _access_listener is None:
+        if writers is None:
+            writer = logging.StreamHandler(stream=stream or sys.stdout)
+            writer.setFormatter(JsonFormatter())
+            writers = (writer,)
+
+        records = queue.Queue(maxsize=ACCESS_LOG_QUEUE_SIZE)
+        access_log.addHandler(AccessQueueHandler(records))
+
+        _access_listener = QueueListener(records, *writers)
+        _access_listener.start()
+        _access_pid = os.getpid()
+
+    return _access_listener
+
+
+def access_log_dropped():
+    """The number of access log records this process has dropped because its writer fell behind."""
+    return sum(getattr(handler, 'dropped', 0) for handler in access_log.handlers)
+
+
+def stop_access_log():
+    """Write out any queued access log records and stop the background writer."""
+    global _access_listener
+
+    if _access_listener is not None:
+        _access_listener.stop()
+        _access_listener = None
+
+        for handler in list(access_log.handlers):
+            access_log.removeHandler(handler)
+
+
+atexit.register(stop_access_log)
@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+"""Allocation tracking with tracemalloc: snapshots, their differences, and request peaks."""
+from collections import OrderedDict
+
+import functools
+import itertools
+import os
+import sys
+import threading
+import tracemalloc
+
+from flask import request
+
+from ups.metrics import metrics
+from ups.tracing import tracer
+
+
+MAX_SNAPSHOTS = 8  # kept in memory, oldest forgotten first
+
+BYTE_BUCKETS = tuple(float(2 ** power) for power in range(16, 31, 2))  # 64 KiB to 1 GiB
+
+peak_bytes = metrics.histogram('ups_request_peak_bytes',
+                               "Peak memory allocated while handling a request, by route.",
+                               ('endpoint',), buckets=BYTE_BUCKETS)
+retained_bytes = metrics.histogram('ups_request_retained_bytes',
+                                   "Memory allocated by a request and still held when it returns, by route.",
+                                   ('endpoint',), buckets=BYTE_BUCKETS)
+
+_snapshots = OrderedDict()
+_ids = itertools.count(1)
+_lock = threading.Lock()
+_measuring = threading.Lock()  # held while a request's memory is measured
+
+_ignored = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+    tracemalloc.Filter(False, '<unknown>'),
+)
+
+
+def start(frames=1):
+    """Start tracking allocations, remembering `frames` frames of each one's traceback."""
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+
+
+def stop():
+    """Stop tracking allocations and forget all snapshots."""
+    tracemalloc.stop()
+
+    with _lock:
+        _snapshots.clear()
+
+
+def status():
+    current, peak = tracemalloc.get_traced_memory()
+
+    return {
+        'tracing': tracemalloc.is_tracing(),
+        'frames': tracemalloc.get_traceback_limit(),
+        'current_bytes': current,
+        'peak_bytes': peak,
+        'overhead_bytes': tracemalloc.get_tracemalloc_memory(),
+        'snapshots': list(_snapshots),
+    }
+
+
+def take_snapshot():
+    """Take a snapshot of the memory allocated now, returning its id. Tracking must be on."""
+    snapshot = tracemalloc.take_snapshot().filter_traces(_ignored)
+
+    with _lock:
+        id = next(_ids)
+        _snapshots[id] = snapshot
+
+        while len(_snapshots) > MAX_SNAPSHOTS:
+            _snapshots.popitem(last=False)
+
+    return id
+
+
+def get_snapshot(id):
+    return _snapshots.get(id)
+
+
+def top_modules(snapshot, compared_to=None, limit=20):
+    """The modules allocating the most memory in `snapshot` (or the most more than they had in
+    `compared_to`), as dicts of module, size and count (and their changes, if compared)."""
+    if compared_to is None:
+        stats = [(stat.traceback[0].filename, stat.size, stat.count, None, None)
+                 for stat in snapshot.statistics('filename')]
+    else:
+        stats = [(stat.traceback[0].filename, stat.size, stat.count, stat.size_diff, stat.count_diff)
+                 for stat in snapshot.compare_to(compared_to, 'filename')]
+
+    modules = _modules_by_filename()
+    totals = {}
+
+    for filename, size, count, size_diff, count_diff in stats:
+        module = modules.get(filename, filename)
+        total = totals.setdefault(module, {'module': module, 'size': 0, 'count': 0})
+        total['size'] += size
+        total['count'] += count
+
+        if size_diff is not None:
+            total['size_diff'] = total.get('size_diff', 0) + size_diff
+            total['count_diff'] = total.get('count_diff', 0) + count_diff
+
+    key = 'size' if compared_to is None else 'size_diff'
+
+    return sorted(totals.values(), key=lambda total: abs(total[key]), reverse=True)[:limit]
+
+
+def _modules_by_filename():
+    modules = {}
+
+    for name, module in list(sys.modules.items()):
+        filename = getattr(module, '__file__', None)
+
+        if filename is not None:
+            modules[os.path.abspath(filename)] = name
+
+    return modules
+
+
+def measure_peak_memory(route):
+    """Record the memory allocated while `route` runs, for one request at a time while tracking.
+    The peak is measured from Python 3.9 (tracemalloc.reset_peak); what is retained, everywhere."""
+    @functools.wraps(route)
+    def measured_route(*args, **kwargs):
+        # the traced figures are process-wide, so concurrent measurements would mix.
+        if not tracemalloc.is_tracing() or not _measuring.acquire(blocking=False):
+            return route(*args, **kwargs)
+
+        try:
+            return _measure(route, args, kwargs)
+        finally:
+            _measuring.release()
+
+    return measured_route
+
+
+def _measure(route, args, kwargs):
+    start, _ = tracemalloc.get_traced_memory()
+    measure_peak = hasattr(tracemalloc, 'reset_peak')
+
+    if measure_peak:
+        tracemalloc.reset_peak()
+
+    try:
+        return route(*args, **kwargs)
+    finally:
+        current, peak = tracemalloc.get_traced_memory()
+        attributes = {'memory.retained_bytes': max(current - start, 0)}
+        retained_bytes.observe((request.endpoint,), attributes['memory.retained_bytes'])
+
+        if measure_peak:
+            attributes['memory.peak_bytes'] = max(peak - start, 0)
+            peak_bytes.observe((request.endpoint,), attributes['memory.peak_bytes'])
+
+        span = tracer.current()
+
+        if span is not None:
+            span.attributes.update(attributes)
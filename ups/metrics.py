@@ -0,0 +1,389 @@
+# -*- coding: utf-8 -*-
+"""Latency histograms for requests, SQL statements and storage calls, served at /metrics."""
+from bisect import bisect_left
+
+import atexit
+import fcntl
+import glob
+import json
+import os
+import threading
+import time
+
+from flask import Response, g, request
+
+from ups.database import on_statements
+from ups.log import access_log_dropped
+from ups.tracing import spans_dropped
+
+
+DEFAULT_BUCKETS = (.001, .0025, .005, .01, .025, .05, .1, .25, .5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram(object):
+    """Counts of observed durations by label values, in fixed buckets, kept per thread."""
+
+    def __init__(self, name, help, labels, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+
+        self.reset()
+
+    def reset(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._shards = []   # (thread, {labels: series}) for every thread that has observed
+        self._retired = {}  # the series of threads that have since finished
+
+    def observe(self, labels, seconds):
+        shard = getattr(self._local, 'series', None)
+
+        if shard is None:
+            shard = self._local.series = {}
+
+            with self._lock:
+                self._shards.append((threading.current_thread(), shard))
+
+        series = shard.get(labels)
+
+        if series is None:
+            series = shard[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+
+        series[bisect_left(self.buckets, seconds)] += 1
+        series[-1] += seconds
+
+    def snapshot(self):
+        """The totals of every thread's observations, as {labels: series}."""
+        with self._lock:
+            live = []
+
+            for thread, shard in self._shards:
+                if thread.is_alive():
+                    live.append((thread, shard))
+                else:
+                    merge(self._retired, shard.items())
+
+            self._shards = live
+            totals = merge({}, self._retired.items())
+
+        for _, shard in live:
+            merge(totals, list(shard.items()))
+
+        return totals
+
+
+class Counter(object):
+    """A count kept elsewhere, read by `read()` whenever it's collected."""
+
+    def __init__(self, name, help, read):
+        self.name = name
+        self.help = help
+        self.labels = ()
+        self.read = read
+
+    def reset(self):
+        pass
+
+    def snapshot(self):
+        return {(): [self.read()]}
+
+
+def merge(totals, series):
+    """Add each (labels, series) of `series` to `totals`, returning `totals`."""
+    for labels, values in series:
+        total = totals.get(labels)
+
+        if total is None:
+            totals[labels] = list(values)
+        else:
+            for i, value in enumerate(values):
+                total[i] += value
+
+    return totals
+
+
+def read_totals(path):
+    """The totals written to `path`, as {histogram name: {labels: series}}."""
+    with open(path) as f:
+        return {name: {tuple(labels): values for labels, values in series}
+                for name, series in json.load(f).items()}
+
+
+def write_totals(path, totals):
+    serialized = {name: [[list(labels), values] for labels, values in series.items()]
+                  for name, series in totals.items()}
+    staging = f'{path}.{threading.get_ident()}.tmp'
+
+    with open(staging, 'w') as f:
+        json.dump(serialized, f)
+
+    os.replace(staging, path)  # readers see the old totals or the new ones, never half
+
+
+def process_exists(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass  # someone else's
+
+    return True
+
+
+def escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class Metrics(object):
+    def __init__(self, app=None):
+        self.histograms = {}
+
+        self.request_seconds = self.histogram('ups_request_seconds',
+                                              "Time to handle a request, by route.",
+                                              ('endpoint', 'method', 'status'))
+        self.sql_seconds = self.histogram('ups_sql_seconds',
+                                          "Time to execute a SQL statement, by database.",
+                                          ('bind',))
+        self.storage_seconds = self.histogram('ups_storage_seconds',
+                                              "Time taken by a storage call, by operation.",
+                                              ('operation', 'service'))
+        self.access_log_dropped = self.counter('ups_access_log_dropped_total',
+                                               "Access log records dropped because the writer fell behind.",
+                                               access_log_dropped)
+        self.spans_dropped = self.counter('ups_trace_spans_dropped_total',
+                                          "Trace spans dropped because the exporter fell behind.",
+                                          spans_dropped)
+
+        self.directory = None
+        self._writer = None
+        self._pid = os.getpid()
+        self._writing = threading.Lock()
+        self._claimed = False  # whether a file under this pid is this process's
+        self._retired = False
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('METRICS_ENABLED', True)
+        app.config.setdefault('METRICS_DIR', None)  # shared by all of a server's worker processes
+        app.config.setdefault('METRICS_FLUSH_INTERVAL', 10)  # seconds between writes to METRICS_DIR
+
+        if not app.config['METRICS_ENABLED']:
+            return
+
+        self.directory = app.config['METRICS_DIR']
+        self.flush_interval = app.config['METRICS_FLUSH_INTERVAL']
+
+        @app.before_request
+        def start_request_timer():
+            self._check_pid()
+            g.metrics_start_time = time.perf_counter()
+
+        @app.after_request
+        def observe_request(response):
+            start = g.get('metrics_start_time')
+
+            if start is not None:
+                self.request_seconds.observe((request.endpoint or '<unmatched>', request.method,
+                                              str(response.status_code)),
+                                             time.perf_counter() - start)
+
+            return response
+
+        def observe_statement(bind, statement, seconds):
+            self.sql_seconds.observe((bind or 'default',), seconds)
+
+        on_statements(app, observe_statement)
+
+        app.add_url_rule('/metrics', 'metrics', self.route)
+
+        if self.directory is not None:
+            os.makedirs(self.directory, exist_ok=True)
+            self._start_writer()
+
+    def histogram(self, name, help, labels, buckets=DEFAULT_BUCKETS):
+        histogram = self.histograms[name] = Histogram(name, help, labels, buckets)
+        return histogram
+
+    def counter(self, name, help, read):
+        counter = self.histograms[name] = Counter(name, help, read)
+        return counter
+
+    def timed(self, histogram, *labels):
+        """A context manager observing the time spent inside it in `histogram`."""
+        return Timer(histogram, labels)
+
+    def snapshot(self):
+        """This process's totals, as {histogram name: {labels: series}}."""
+        return {name: histogram.snapshot() for name, histogram in self.histograms.items()}
+
+    def collect(self):
+        """This process's totals, plus those the other workers last wrote to METRICS_DIR."""
+        self._check_pid()
+        totals = self.snapshot()
+
+        if self.directory is None:
+            return totals
+
+        own = self._path()
+
+        for path in glob.glob(os.path.join(self.directory, 'metrics-*.json')):
+            if path == own:
+                continue
+
+            pid = os.path.basename(path)[len('metrics-'):-len('.json')]
+
+            if pid.isdigit() and not process_exists(int(pid)):
+                self._retire(path)  # its totals are read from the retired file below
+
+        for path in glob.glob(os.path.join(self.directory, 'metrics-*.json')):
+            if path == own:
+                continue
+
+            try:
+                written = read_totals(path)
+            except (OSError, ValueError):
+                continue  # a worker that's exiting, or a file from something else
+
+            for name, series in written.items():
+                if name in totals:
+                    merge(totals[name], series.items())
+
+        return totals
+
+    def write(self):
+        """Write this process's totals to METRICS_DIR, for the other workers to collect."""
+        with self._writing:
+            if self._retired:
+                return
+
+            if not self._claimed:
+                self._retire(self._path())  # left by an exited process that had our pid
+                self._claimed = True
+
+            write_totals(self._path(), self.snapshot())
+
+    def retire(self):
+        """Fold this process's totals into METRICS_DIR's retired totals, as it exits."""
+        with self._writing:
+            if self._retired:
+                return
+
+            write_totals(self._path(), self.snapshot())
+            self._retire(self._path())
+            self._retired = True
+
+    def render(self):
+        """All histograms in the Prometheus text exposition format."""
+        lines = []
+
+        for name, series in sorted(self.collect().items()):
+            histogram = self.histograms[name]
+
+            lines.append(f'# HELP {name} {histogram.help}')
+
+            if isinstance(histogram, Counter):
+                lines.append(f'# TYPE {name} counter')
+                lines.extend(f'{name} {values[0]}' for values in series.values())
+                continue
+
+            lines.append(f'# TYPE {name} histogram')
+
+            for labels, values in sorted(series.items()):
+                pairs = ','.join(f'{label}="{escape(value)}"'
+                                 for label, value in zip(histogram.labels, labels))
+                prefix = pairs + ',' if pairs else ''
+                count = 0
+
+                for bound, bucket in zip(histogram.buckets + ('+Inf',), values):
+                    count += bucket
+                    lines.append(f'{name}_bucket{{{prefix}le="{bound}"}} {count}')
+
+                lines.append(f'{name}_sum{{{pairs}}} {values[-1]}')
+                lines.append(f'{name}_count{{{pairs}}} {count}')
+
+        return '\n'.join(lines) + '\n'
+
+    def route(self):
+        return Response(self.render(), mimetype='text/plain; version=0.0.4')
+
+    def _path(self):
+        return os.path.join(self.directory, f'metrics-{os.getpid()}.json')
+
+    def _retire(self, path):
+        """Move the totals in `path` into the retired totals, so no counter goes backwards."""
+        retired = os.path.join(self.directory, 'metrics-retired.json')
+
+        with open(os.path.join(self.directory, 'metrics.lock'), 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)  # only one worker may retire a file
+
+            try:
+                written = read_totals(path)
+            except FileNotFoundError:
+                return  # already retired
+            except ValueError:
+                written = {}
+
+            try:
+                totals = read_totals(retired)
+            except (OSError, ValueError):
+                totals = {}
+
+            for name, series in written.items():
+                merge(totals.setdefault(name, {}), series.items())
+
+            write_totals(retired, totals)
+            os.remove(path)
+
+    def _start_writer(self):
+        if self._writer is not None and self._writer.is_alive():
+            return
+
+        def write_periodically():
+            while True:
+                time.sleep(self.flush_interval)
+                self.write()
+
+        self._writer = threading.Thread(target=write_periodically, name='metrics-writer',
+                                        daemon=True)
+        self._writer.start()
+
+        atexit.register(self.retire)
+
+    def _check_pid(self):
+        if self._pid == os.getpid():
+            return
+
+        # a worker forked from a preloaded app starts from zero, under its own pid.
+        self._pid = os.getpid()
+
+        for histogram in self.histograms.values():
+            histogram.reset()
+
+        self._writer = None
+        self._writing = threading.Lock()
+        self._claimed = False
+        self._retired = False
+
+        if self.directory is not None:
+            self._start_writer()
+
+
+class Timer(object):
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(self.labels, time.perf_counter() - self.start)
+
+
+metrics = Metrics()
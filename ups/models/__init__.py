@@ -2,12 +2,12 @@ from .user import User
 from .package import (Package,
                       package_schema, packages_schema)
 from .suite import (Suite,
-                    suite_schema, suites_schema)
+                    suite_schema, suites_schema, suite_summary_schema)
 from .namespace import (Namespace,
                         namespace_schema, namespaces_schema)
 from .package_version import (PackageVersion,
-                              package_versions_schema, package_version_schema,
-                              package_with_versions_schema)
+                              package_versions_schema, package_version_schema)
+from .dependency import PackageDependency
 from .release import Release, release_manifest_schema
 from .scheduled_release import ScheduledRelease, scheduled_release_manifest_schema
 
@@ -24,11 +24,12 @@ assert(namespaces_schema)
 assert(Suite)
 assert(suite_schema)
 assert(suites_schema)
+assert(suite_summary_schema)
 
 assert(PackageVersion)
 assert(package_versions_schema)
 assert(package_version_schema)
-assert(package_with_versions_schema)
+assert(PackageDependency)
 
 assert(Release)
 assert(release_manifest_schema)
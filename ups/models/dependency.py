@@ -0,0 +1,24 @@
+from ups.database import Model, db, Column, reference_col, relationship
+
+
+class PackageDependency(Model):
+    """A package that a package version needs, within a range of its versions."""
+    __bind_key__ = 'packages'
+    __tablename__ = "package_dependencies"
+
+    package_version_id = reference_col('package_versions', nullable=False)
+    package_id = reference_col('packages', nullable=False)
+    constraint = Column(db.String(255), nullable=True)  # such as '>=1.2,<2'; None for any version
+
+    package_version = relationship('PackageVersion', uselist=False,
+                                   backref=db.backref('dependencies',
+                                                      cascade='all, delete-orphan'))
+    package = relationship('Package', uselist=False,
+                           backref=db.backref('dependents', cascade='delete'))
+
+    __table_args__ = (
+        db.PrimaryKeyConstraint('package_version_id', 'package_id'),
+    )
+
+    def __repr__(self):
+        return self.repr(['package_version_id', 'package_id', 'constraint'])
@@ -1,7 +1,10 @@
+from ups.cache import LRUCache
 from ups.database import Model, db, Column, reference_col, relationship, UuidPrimaryKey
 
+from sqlalchemy import and_, event, or_
 from sqlalchemy.schema import UniqueConstraint
 from sqlalchemy.ext.hybrid import hybrid_property
+from sqlalchemy.orm import load_only
 
 from .namespace import Namespace
 from .utils import SlugMixinFactory
@@ -10,6 +13,9 @@ from ups.extensions import marshmallow as ma
 from slugify import slugify
 
 
+package_ids = LRUCache(max_size=4096)  # package path -> id, checked against the row on every use
+
+
 class Package(Model, UuidPrimaryKey, SlugMixinFactory('name', nullable=False)):
     __bind_key__ = 'packages'
     __tablename__ = "packages"
@@ -34,8 +40,7 @@ class Package(Model, UuidPrimaryKey, SlugMixinFactory('name', nullable=False)):
     @classmethod
     def lookup(cls, namespace, package):
         return (cls.query
-                   .filter_by(slug=slugify(package))
-                   .filter(Namespace.slug == slugify(namespace))
+                   .filter_by(namespace_slug=slugify(namespace), slug=slugify(package))
                    .first())
 
     @hybrid_property
@@ -44,14 +49,52 @@ class Package(Model, UuidPrimaryKey, SlugMixinFactory('name', nullable=False)):
 
     @classmethod
     def lookup_path(cls, path):
-        return (cls.query.filter_by(path=path).first())
+        """Find a package by its 'namespace/package' path, through the (namespace_slug, slug) index."""
+        package_id = package_ids.get(path)
+
+        if package_id is not None:
+            match = cls.loading('summary').get(package_id)
+
+            if match is not None and match.path == path:
+                return match
+
+            package_ids.pop(path)
+
+        namespace_slug, _, slug = path.partition('/')
+        match = cls.loading('summary').filter_by(namespace_slug=namespace_slug, slug=slug).first()
+
+        if match is not None:
+            package_ids.set(path, match.id)
+
+        return match
 
     @classmethod
     def lookup_paths(cls, paths):
         if len(paths) == 0:
             return []
 
-        return cls.query.filter(Package.path.in_(paths)).all()
+        slugs = {}
+
+        for path in paths:
+            namespace_slug, _, slug = path.partition('/')
+            slugs.setdefault(namespace_slug, []).append(slug)
+
+        return (cls.loading('summary')
+                   .filter(or_(*[and_(cls.namespace_slug == namespace_slug, cls.slug.in_(s))
+                                 for namespace_slug, s in slugs.items()]))
+                   .all())
+
+
+Package.profiles = {
+    # what PackageSchema serializes (and a package's path)
+    'summary': (load_only('name', 'namespace_slug', 'slug'),),
+}
+
+
+@event.listens_for(Package, 'after_insert')
+@event.listens_for(Package, 'after_delete')
+def forget_package_path(mapper, connection, target):
+    package_ids.pop(target.path)
 
 
 class PackageSchema(ma.Schema):
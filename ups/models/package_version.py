@@ -1,13 +1,52 @@
 from flask import current_app
 from ups.database import Model, db, Column, reference_col, relationship, UuidPrimaryKey
 
+from sqlalchemy import and_, inspect
 from sqlalchemy.schema import UniqueConstraint
-from sqlalchemy.orm import validates
+from sqlalchemy.orm import joinedload, validates
 
-from .utils import (URLType, PathType, VersionType, StorageCubbyMixinFactory)
+from .utils import (URLType, PathType, VersionType, StorageCubbyMixinFactory,
+                    TimezoneAwareDatetime, version_key)
 from ups.extensions import marshmallow as ma
+from ups.storage.service import HashingReader
 
-from .package import Package, PackageSchema
+import arrow
+import operator
+import os
+import re
+import uuid
+
+from .package import Package
+from .dependency import PackageDependency
+
+
+VERSION_CONSTRAINT_REGEX = re.compile(r'^\s*(==|!=|>=|<=|>|<|=)?\s*([0-9A-Za-z][0-9A-Za-z.+_-]*)\s*$')
+
+VERSION_OPERATORS = {
+    '==': operator.eq,
+    '=': operator.eq,
+    '!=': operator.ne,
+    '>=': operator.ge,
+    '<=': operator.le,
+    '>': operator.gt,
+    '<': operator.lt,
+}
+
+
+def parse_version_range(spec):
+    """Parse a comma-separated range such as '>=1.2,<2' into (operator, version key) pairs."""
+    constraints = []
+
+    for constraint in spec.split(','):
+        match = VERSION_CONSTRAINT_REGEX.match(constraint)
+
+        if match is None:
+            raise ValueError(f"Invalid version constraint '{constraint.strip()}'.")
+
+        op, version = match.groups()
+        constraints.append((VERSION_OPERATORS[op or '=='], version_key(version)))
+
+    return constraints
 
 
 class PackageVersion(Model, UuidPrimaryKey, StorageCubbyMixinFactory(nullable=False)):
@@ -15,21 +54,20 @@ class PackageVersion(Model, UuidPrimaryKey, StorageCubbyMixinFactory(nullable=Fa
     __tablename__ = "package_versions"
 
     version = Column(VersionType, nullable=False)
+    version_key = Column(db.String(255), nullable=True)  # see version_key(); sorts like the version
 
     local = Column(PathType, nullable=True)
     run = Column(db.String, nullable=True)
     test = Column(db.String, nullable=True)
     url = Column(URLType, nullable=True)
+    digest = Column(db.String(64), nullable=True, index=True)  # SHA-256 of the stored file
+    updated = Column(TimezoneAwareDatetime, nullable=True, default=arrow.utcnow, onupdate=arrow.utcnow)
 
     package_id = reference_col("packages", nullable=False)
     package = relationship(Package, backref=db.backref('versions',
                                                        cascade='delete',
                                                        lazy='dynamic'))
 
-    package_eager = relationship(Package, backref=db.backref('versions_eager',
-                                                             cascade='delete',
-                                                             lazy='joined'))
-
     @validates('version')
     def version_readonly(self, key, value):
         existing = getattr(self, key)
@@ -37,6 +75,8 @@ class PackageVersion(Model, UuidPrimaryKey, StorageCubbyMixinFactory(nullable=Fa
         if existing is not None:
             raise ValueError("'version' can only be written once.")
 
+        self.version_key = version_key(value)
+
         return value
 
     def __init__(self, *args, cubby=None, **kwargs):
@@ -55,19 +95,135 @@ class PackageVersion(Model, UuidPrimaryKey, StorageCubbyMixinFactory(nullable=Fa
 
     @property
     def remote(self):
-        if not self.url and self.cubby():
-            self.update(url=self.cubby().url(), commit=True)
+        """A presigned URL for this version's file, cached (not stored) until it is re-signed."""
+        string = self.storage_string()
+
+        if string is None:
+            return self.url
+
+        return current_app.storage.urls.get(string)
+
+    def store(self, file):
+        """Upload `file` as this version's package, hashing it as it streams (once per digest,
+        under 'blobs/', with STORAGE_CONTENT_ADDRESSED on)."""
+        reader = HashingReader(file)
+
+        if not current_app.storage.content_addressed:
+            self.cubby().store(file=reader)
+            self.digest = reader.hexdigest()
+            return self
+
+        bucket = self.storage_bucket()
+
+        staging = bucket.cubby(f'uploads/{uuid.uuid4()}', content_type=self.content_type)
+        staging.store(file=reader)
+
+        blob = bucket.cubby(self.blob_key(reader.hexdigest()), content_type=self.content_type)
+
+        if blob.exists():
+            staging.delete()
+        else:
+            staging.move_to(blob)
+
+        return self.link_blob(reader.hexdigest())
+
+    def blob_key(self, digest):
+        return f'blobs/{digest}{os.path.splitext(self.key)[1]}'
+
+    def blob_exists(self, digest):
+        return self.storage_bucket().cubby(self.blob_key(digest)).exists()
 
-        return self.url
+    def link_blob(self, digest):
+        """Point this version at the already stored blob for `digest`."""
+        previous = self.cubby() if inspect(self).persistent else None
+
+        self.key = self.blob_key(digest)
+        self.digest = digest
+
+        if previous is not None and previous.key != self.key:
+            self.delete_file(previous)
+
+        return self
+
+    def delete_file(self, cubby=None):
+        """Delete this version's stored file, unless another version shares it."""
+        cubby = cubby or self.cubby()
+
+        shared = (PackageVersion.query
+                  .filter_by(service=self.service, location=self.location,
+                             bucket=self.bucket, key=cubby.key)
+                  .filter(PackageVersion.id != self.id)
+                  .count())
+
+        if not shared:
+            cubby.delete()
+
+    @classmethod
+    def presign(cls, versions):
+        """Sign the URLs of all `versions` in one batch, ahead of serializing them."""
+        strings = [v.storage_string() for v in versions]
+        current_app.storage.urls.get_many([s for s in strings if s is not None])
+
+        return versions
+
+    @classmethod
+    def in_range(cls, spec):
+        """A filter for versions matching a comma-separated range, such as '>=1.2,<2'."""
+        return and_(*[op(cls.version_key, key) for op, key in parse_version_range(spec)])
+
+    def set_dependencies(self, requirements):
+        """Declare the packages this version needs, as {package: version range (or None)}."""
+        for spec in requirements.values():
+            if spec is not None:
+                parse_version_range(spec)
+
+        if self.dependencies:
+            self.dependencies = []
+            db.session.flush()  # delete the old rows before inserting any with the same key
+
+        self.dependencies = [PackageDependency(package=package, constraint=spec)
+                             for package, spec in requirements.items()]
+        self.updated = arrow.utcnow()  # so cached resolutions see the change
+
+    @classmethod
+    def latest(cls, package, spec=None):
+        """The highest version of `package` (within the range `spec`, if given), or None."""
+        query = cls.query.filter_by(package_id=package.id)
+
+        if spec is not None:
+            query = query.filter(cls.in_range(spec))
+
+        return query.order_by(cls.version_key.desc(), cls.version.desc()).first()
+
+    @classmethod
+    def backfill_version_keys(cls, batch_size=1000):
+        """Compute `version_key` for versions stored before it existed. Returns how many were set."""
+        count = 0
+
+        while True:
+            rows = (db.session.query(cls.id, cls.version)
+                              .filter(cls.version_key.is_(None))
+                              .limit(batch_size)
+                              .all())
+
+            if not rows:
+                return count
+
+            db.session.bulk_update_mappings(cls, [{'id': id, 'version_key': version_key(version)}
+                                                  for id, version in rows])
+            db.session.commit()
+
+            count += len(rows)
 
     __table_args__ = (
         UniqueConstraint('package_id', 'version', name='package_version_tuple_is_unique'),
+        db.Index('package_version_key', 'package_id', 'version_key'),
     )
 
 
 class PackageVersionSchema(ma.Schema):
     class Meta:
-        fields = ("local", "version", "name", "run", "test", "remote")
+        fields = ("local", "version", "name", "run", "test", "remote", "digest")
 
     name = ma.Function(lambda version: version.package.name if version.package else None)
 
@@ -76,12 +232,7 @@ package_version_schema = PackageVersionSchema()
 package_versions_schema = PackageVersionSchema(many=True)
 
 
-class PackageWithVersionsSchema(ma.Schema):
-    class Meta:
-        fields = PackageSchema.Meta.fields + ('versions_eager',)
-
-    versions_eager = ma.Nested(PackageVersionSchema, many=True,
-                               dump_to='versions')
-
-
-package_with_versions_schema = PackageWithVersionsSchema()
+PackageVersion.profiles = {
+    # versions from many packages, each serialized with its package's name
+    'manifest': (joinedload(PackageVersion.package).load_only('name', 'namespace_slug', 'slug'),),
+}
@@ -1,7 +1,18 @@
+from flask import current_app, jsonify
+from sqlalchemy import event, inspect, select
+
+from ups.cache import LRUCache
 from ups.database import Model, db, Column, relationship, reference_col, UuidPrimaryKey
 from ups.extensions import marshmallow as ma
+from ups.tracing import traced, tracer
 
+from .package import Package
 from .package_version import PackageVersion, package_version_schema
+from .serializers import dump_versions, version_rows
+
+
+# Ready-to-send manifest JSON, keyed by (release id, revision, presigned URL window).
+manifest_snapshots = LRUCache(max_size=256)
 
 
 class ReleasePackage(Model):
@@ -12,7 +23,8 @@ class ReleasePackage(Model):
     release_id = reference_col('releases', nullable=False)
     package_version_id = reference_col('package_versions', nullable=False)
 
-    release = relationship('Release', backref='release_packages', uselist=False)
+    release = relationship('Release', uselist=False,
+                           backref=db.backref('release_packages', cascade='all, delete-orphan'))
     package = relationship('Package', backref='release_packages', uselist=False)
     package_version = relationship('PackageVersion', backref='release_packages', uselist=False)
 
@@ -37,6 +49,7 @@ class Release(Model, UuidPrimaryKey):
     __tablename__ = "releases"
 
     title = Column(db.Unicode)
+    revision = Column(db.Integer, nullable=False, default=0)  # bumped when the manifest changes
 
     packages = relationship('Package', secondary="releases_packages",
                             backref='releases', viewonly=True)
@@ -51,11 +64,39 @@ class Release(Model, UuidPrimaryKey):
                          uselist=False)
 
     def set_versions(self, versions=[], commit=False):
+        if self.release_packages:
+            self.release_packages = []
+            db.session.flush()  # delete the old rows before their replacements are inserted
+
         self.release_packages = [ReleasePackage(release=self, package_version=v)
                                  for v in versions]
+        self.revision = (self.revision or 0) + 1
 
         self.save(commit=commit)
 
+        manifest_snapshots.discard_where(lambda key: key[0] == self.id)
+
+    @traced('release.manifest_snapshot')
+    def manifest_snapshot(self):
+        """Return this release's manifest as ready-to-send JSON, serialized at most once per
+        revision and presigned URL window."""
+        key = (self.id, self.revision, current_app.storage.urls.window())
+        snapshot = manifest_snapshots.get(key)
+
+        if snapshot is None:
+            rows = (version_rows(PackageVersion.query
+                                               .join(ReleasePackage,
+                                                     ReleasePackage.package_version_id == PackageVersion.id)
+                                               .filter(ReleasePackage.release_id == self.id))
+                    .order_by(Package.name, PackageVersion.id).all())
+
+            with tracer.span('serialize.manifest', versions=len(rows)):
+                snapshot = jsonify(title=self.title, packages=dump_versions(rows)).get_data()
+
+            manifest_snapshots.set(key, snapshot)
+
+        return snapshot
+
 
 class ReleaseManifestSchema(ma.Schema):
     class Meta:
@@ -66,3 +107,31 @@ class ReleaseManifestSchema(ma.Schema):
 
 release_manifest_schema = ReleaseManifestSchema()
 release_manifests_schema = ReleaseManifestSchema(many=True)
+
+
+@event.listens_for(PackageVersion, 'after_update')
+def bump_release_revisions(mapper, connection, version):
+    """Releases serialize their versions, so editing a version changes their manifests."""
+    release_ids = (select([ReleasePackage.release_id])
+                   .where(ReleasePackage.package_version_id == version.id))
+
+    connection.execute(Release.__table__.update()
+                       .where(Release.id.in_(release_ids))
+                       .values(revision=Release.revision + 1))
+
+
+@event.listens_for(Package, 'after_update')
+def bump_renamed_package_release_revisions(mapper, connection, package):
+    """Manifests include their packages' names, so renaming a package changes them too."""
+    if not inspect(package).attrs.name.history.has_changes():
+        return
+
+    release_ids = (select([ReleasePackage.release_id])
+                   .select_from(ReleasePackage.__table__.join(PackageVersion.__table__,
+                                                              ReleasePackage.package_version_id ==
+                                                              PackageVersion.id))
+                   .where(PackageVersion.package_id == package.id))
+
+    connection.execute(Release.__table__.update()
+                       .where(Release.id.in_(release_ids))
+                       .values(revision=Release.revision + 1))
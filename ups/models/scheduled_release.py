@@ -1,5 +1,8 @@
+from sqlalchemy import event
+
 from ups.database import Model, db, Column, relationship, reference_col, UuidPrimaryKey
 from ups.extensions import marshmallow as ma
+from ups.tracing import traced
 
 from .utils import TimezoneAwareDatetime
 
@@ -28,6 +31,7 @@ def schedule_release(release, datetime, commit=True):
     return ScheduledRelease(release=release, datetime=datetime).save(commit=commit)
 
 
+@traced('suite.current_release')
 def suite_current_release(self):
     return (self.releases
             .join(ScheduledRelease)
@@ -36,6 +40,18 @@ def suite_current_release(self):
             .first())
 
 
+@event.listens_for(ScheduledRelease, 'after_insert')
+@event.listens_for(ScheduledRelease, 'after_delete')
+def bump_schedule_revision(mapper, connection, scheduled_release):
+    """Let every process's scheduler see that the suite's timeline has changed."""
+    suite_id = scheduled_release.release.suite_id
+
+    if suite_id is not None:
+        connection.execute(Suite.__table__.update()
+                           .where(Suite.slug == suite_id)
+                           .values(schedule_revision=Suite.schedule_revision + 1))
+
+
 Release.schedule = schedule_release
 Suite.current_release = suite_current_release
 
@@ -0,0 +1,76 @@
+"""Compiled serializers for the hottest schemas, building the same dicts from plain column tuples."""
+from flask import current_app
+
+from sqlalchemy import type_coerce
+
+from ups.database import db
+from ups.tracing import traced
+
+from .package import Package
+from .package_version import PackageVersion
+from .utils import storage_string
+
+
+PACKAGE_COLUMNS = (Package.name, Package.namespace_slug, Package.slug)
+
+VERSION_COLUMNS = (
+    PackageVersion.local,
+    type_coerce(PackageVersion.version, db.Unicode).label('version'),  # skip LooseVersion()
+    Package.name,
+    PackageVersion.run,
+    PackageVersion.test,
+    PackageVersion.url,
+    PackageVersion.digest,
+    PackageVersion.service,
+    PackageVersion.location,
+    PackageVersion.bucket,
+    PackageVersion.key,
+    PackageVersion.version_key,
+)
+
+
+def package_rows(query):
+    """Select PACKAGE_COLUMNS from a query of packages."""
+    return query.with_entities(*PACKAGE_COLUMNS)
+
+
+def dump_packages(rows):
+    """What packages_schema.dump() gives, from rows of PACKAGE_COLUMNS."""
+    return [{"name": name, "path": namespace_slug + "/" + slug}
+            for name, namespace_slug, slug in rows]
+
+
+def version_rows(query):
+    """Select VERSION_COLUMNS from a query of package versions."""
+    return (query.join(Package, Package.id == PackageVersion.package_id)
+                 .with_entities(*VERSION_COLUMNS))
+
+
+@traced('serialize.versions')
+def dump_versions(rows):
+    """What package_versions_schema.dump() gives, from rows of VERSION_COLUMNS."""
+    strings = [storage_string(row.service, row.location, row.bucket, row.key) for row in rows]
+    urls = current_app.storage.urls.get_many([string for string in strings if string is not None])
+
+    return [{"local": row.local,
+             "version": row.version,
+             "name": row.name,
+             "run": row.run,
+             "test": row.test,
+             "remote": row.url if string is None else urls[string],
+             "digest": row.digest}
+            for row, string in zip(rows, strings)]
+
+
+def iter_dumped(query, dump, batch_size=1000):
+    """Dump the rows of `query` with `dump` a batch at a time, as they're fetched, for streaming."""
+    batch = []
+
+    for row in query.yield_per(batch_size):
+        batch.append(row)
+
+        if len(batch) == batch_size:
+            yield from dump(batch)
+            batch = []
+
+    yield from dump(batch)
@@ -1,6 +1,6 @@
 from ups.database import Model, db, Column, reference_col, relationship
 
-from .package import packages_schema
+from .package import Package, packages_schema
 from .utils import SlugMixinFactory
 from ups.extensions import marshmallow as ma
 
@@ -12,10 +12,17 @@ class Suite(Model,
     __tablename__ = "suites"
 
     name = Column(db.Unicode(255), nullable=False, unique=True)
+    schedule_revision = Column(db.Integer, nullable=False, default=0)  # bumped when a release is scheduled
 
     packages = relationship('Package', secondary='suite_packages',
                             backref=db.backref('suites'))
 
+    def packages_query(self):
+        """A query for this suite's packages, to page through them without loading them all."""
+        return (Package.query
+                       .join(SuitePackage, SuitePackage.package_id == Package.id)
+                       .filter(SuitePackage.suite_id == self.slug))
+
 
 class SuiteSchema(ma.Schema):
     class Meta:
@@ -26,6 +33,7 @@ class SuiteSchema(ma.Schema):
 
 suite_schema = SuiteSchema()
 suites_schema = SuiteSchema(many=True)
+suite_summary_schema = SuiteSchema(only=("name", "slug"))
 
 
 class SuitePackage(Model):
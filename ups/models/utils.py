@@ -15,6 +15,7 @@ from distutils.version import LooseVersion
 from pathlib import Path
 
 import pytz
+import re
 
 
 assert(URLType)
@@ -68,6 +69,40 @@ class VersionType(types.TypeDecorator):
         return LooseVersion(value)
 
 
+VERSION_TOKEN_REGEX = re.compile(r'[0-9]+|[a-z]+')
+
+
+def version_key(version):
+    """Return a string that sorts, as a plain string, the way `version` does ('1.9' < '1.10')."""
+    parts = []
+    zeros = []  # held back until a nonzero number shows they aren't trailing
+
+    for token in VERSION_TOKEN_REGEX.findall(str(version).lower()):
+        if token.isdigit():
+            digits = token.lstrip('0') or '0'
+            number = f'c{len(digits):02d}{digits}'  # the length first, so 10 > 9
+
+            if digits == '0':
+                zeros.append(number)
+            else:
+                parts += zeros + [number]
+                zeros = []
+        else:
+            parts.append(f'a{token}!')  # tags sort before the end of a version
+            zeros = []
+
+    parts.append('b')
+
+    return ''.join(parts)
+
+
+def storage_string(service, location, bucket, key):
+    if None in (service, location, bucket, key):
+        return None
+
+    return f"{service}://{location}/{bucket}/{key}"
+
+
 def StorageBucketMixinFactory(nullable=False):
     class StorageBucketMixin:
         service = db.Column(db.String, nullable=nullable)        # S3 or Alibaba
@@ -88,12 +123,19 @@ def StorageCubbyMixinFactory(nullable=False):
         key = db.Column(db.String(256), nullable=nullable)       # the key
         content_type = db.Column(db.String(256), nullable=True)
 
+        def storage_string(self):
+            return storage_string(self.service, self.location, self.bucket, self.key)
+
         def cubby(self):
-            if None in (self.service, self.location, self.bucket, self.key):
+            string = self.storage_string()
+
+            if string is None:
                 return None
 
-            return StorageCubby(f"{self.service}://{self.location}/{self.bucket}/{self.key}",
-                                content_type=self.content_type)
+            return StorageCubby(string, content_type=self.content_type)
+
+        def storage_bucket(self):
+            return StorageBucket(f"{self.service}://{self.location}/{self.bucket}")
 
         def set_cubby(self, cubby):
             self.bucket = cubby.bucket.name
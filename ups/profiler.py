@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""A statistical profiler that samples the stacks of a running process's threads."""
+from collections import Counter
+
+import sys
+import threading
+import time
+
+
+class ProfilerBusy(Exception):
+    """Another profile of this process is already being taken."""
+
+
+class Sampler(object):
+    """Samples every other thread's stack each `interval` seconds, counting identical stacks."""
+
+    _lock = threading.Lock()  # one profile at a time per process
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.samples = 0
+        self.stacks = Counter()
+
+    def run(self, seconds):
+        """Sample for `seconds`, returning the counted stacks. Raises ProfilerBusy if another
+        sampler is running."""
+        if not self._lock.acquire(blocking=False):
+            raise ProfilerBusy()
+
+        try:
+            own = threading.get_ident()
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            end = time.perf_counter() + seconds
+
+            while time.perf_counter() < end:
+                for ident, frame in sys._current_frames().items():
+                    if ident != own:
+                        self.stacks[self._stack(names.get(ident, ident), frame)] += 1
+
+                self.samples += 1
+                time.sleep(self.interval)
+        finally:
+            self._lock.release()
+
+        return self.stacks
+
+    def _stack(self, thread_name, frame):
+        labels = []
+
+        while frame is not None:
+            code = frame.f_code
+            labels.append(f"{frame.f_globals.get('__name__', '?')}:{code.co_name}")
+            frame = frame.f_back
+
+        labels.append(str(thread_name).replace(' ', '_'))
+        labels.reverse()
+
+        return ';'.join(labels)
+
+    def collapsed(self):
+        """The stacks in the collapsed ("folded") format flame graph tools read:
+        one 'root;...;leaf count' line per stack."""
+        return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common())
@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+"""Resolve root requirements to one version of every package they need, dependencies included."""
+from sqlalchemy import func
+
+import functools
+
+from ups.cache import LRUCache
+from ups.database import db
+from ups.models import PackageDependency, PackageVersion
+from ups.models.package_version import parse_version_range
+from ups.models.utils import version_key
+
+
+_parse_range = functools.lru_cache(maxsize=4096)(parse_version_range)
+
+
+def _matches(key, specs):
+    return all(op(key, bound) for spec in specs for op, bound in _parse_range(spec))
+
+
+class ResolutionError(Exception):
+    """No set of versions satisfies the requirements."""
+
+    def __init__(self, package_id, constraints):
+        self.package_id = package_id
+        self.constraints = constraints
+
+        super().__init__(f"No version of package {package_id} satisfies {constraints}.")
+
+
+class Resolver(object):
+    """A backtracking resolver that prefers the highest version of each package, memoizing
+    candidates and single-root solutions per catalogue fingerprint."""
+
+    MaxSteps = 10000  # candidate versions tried before a solve is abandoned
+
+    def __init__(self, max_size=4096):
+        self.candidates = LRUCache(max_size=max_size)
+        self.resolutions = LRUCache(max_size=max_size)
+
+    def catalogue(self):
+        """A value that changes whenever any version is added, removed or changed."""
+        return tuple(db.session.query(func.count(PackageVersion.id),
+                                      func.max(PackageVersion.updated)).one())
+
+    def resolve(self, requirements):
+        """Resolve {package id: version range (or None)} to {package id: version id}.
+        Raises ResolutionError if the requirements can't all be satisfied."""
+        catalogue = self.catalogue()
+
+        requirements = {package_id: (spec,) if spec else ()
+                        for package_id, spec in requirements.items()}
+
+        merged = {}
+
+        for package_id, specs in requirements.items():
+            solution = self._solve(catalogue, {package_id: specs})
+
+            for dependency_id, version_id in solution.items():
+                if merged.setdefault(dependency_id, version_id) != version_id:
+                    # the roots prefer different versions of a shared dependency; solve together
+                    return self._solve(catalogue, requirements)
+
+        return merged
+
+    def _solve(self, catalogue, requirements):
+        key = (catalogue, frozenset(requirements.items()))
+        solution = self.resolutions.get(key)
+
+        if solution is None:
+            state = {'steps': 0, 'conflict': None}
+            chosen = self._search(catalogue, {}, dict(requirements), tuple(requirements), state)
+
+            if chosen is None:
+                raise ResolutionError(*state['conflict'])
+
+            solution = {package_id: version_id for package_id, (version_id, _) in chosen.items()}
+            self.resolutions.set(key, solution)
+
+        return solution
+
+    def _search(self, catalogue, chosen, constraints, pending, state):
+        if not pending:
+            return chosen
+
+        package_id, pending = pending[0], pending[1:]
+
+        if package_id in chosen:
+            return self._search(catalogue, chosen, constraints, pending, state)
+
+        for key, version_id, dependencies in self._candidates(catalogue, package_id):
+            if not _matches(key, constraints.get(package_id, ())):
+                continue
+
+            state['steps'] += 1
+
+            if state['steps'] > self.MaxSteps:
+                break
+
+            next_chosen = dict(chosen)
+            next_chosen[package_id] = (version_id, key)
+            next_constraints = dict(constraints)
+            next_pending = list(pending)
+
+            for dependency_id, spec in dependencies:
+                if spec:
+                    next_constraints[dependency_id] = next_constraints.get(dependency_id, ()) + (spec,)
+
+                if dependency_id in next_chosen:
+                    if spec and not _matches(next_chosen[dependency_id][1], (spec,)):
+                        state['conflict'] = (dependency_id, next_constraints[dependency_id])
+                        break
+                else:
+                    next_pending.append(dependency_id)
+            else:
+                solution = self._search(catalogue, next_chosen, next_constraints,
+                                        tuple(next_pending), state)
+
+                if solution is not None:
+                    return solution
+
+        if state['conflict'] is None or state['steps'] > self.MaxSteps:
+            state['conflict'] = (package_id, constraints.get(package_id, ()))
+
+        return None
+
+    def _candidates(self, catalogue, package_id):
+        """A package's versions, highest first, as (version key, version id, dependencies)."""
+        candidates = self.candidates.get((catalogue, package_id))
+
+        if candidates is None:
+            versions = (db.session.query(PackageVersion.id, PackageVersion.version,
+                                         PackageVersion.version_key)
+                                  .filter(PackageVersion.package_id == package_id)
+                                  .all())
+
+            dependencies = {}
+
+            for version_id, dependency_id, spec in (
+                    db.session.query(PackageDependency.package_version_id,
+                                     PackageDependency.package_id,
+                                     PackageDependency.constraint)
+                              .join(PackageVersion,
+                                    PackageVersion.id == PackageDependency.package_version_id)
+                              .filter(PackageVersion.package_id == package_id)):
+                dependencies.setdefault(version_id, []).append((dependency_id, spec))
+
+            candidates = sorted(((key or version_key(version), version_id,
+                                  tuple(dependencies.get(version_id, ())))
+                                 for version_id, version, key in versions),
+                                key=lambda candidate: candidate[0], reverse=True)
+
+            self.candidates.set((catalogue, package_id), candidates)
+
+        return candidates
+
+
+resolver = Resolver()
@@ -0,0 +1,255 @@
+# -*- coding: utf-8 -*-
+"""Tracks which release is current for each suite, without querying on every request."""
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+import arrow
+import bisect
+import os
+import threading
+import time
+
+from ups.database import db
+from ups.log import log
+from ups.models import Release, ScheduledRelease, Suite
+from ups.tracing import traced
+
+
+class ReleaseScheduler(object):
+    """Keeps an in-memory timeline of every suite's scheduled releases, reloaded periodically."""
+
+    def __init__(self, app=None):
+        self.app = None
+        self.enabled = False
+
+        self._listeners = []
+        self._reset()
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('SCHEDULER_ENABLED', True)
+        app.config.setdefault('SCHEDULER_BACKGROUND', True)
+        app.config.setdefault('SCHEDULER_REFRESH_INTERVAL', 30)
+
+        self.app = app
+        self.enabled = app.config['SCHEDULER_ENABLED']
+        self.background = app.config['SCHEDULER_BACKGROUND']
+        self.refresh_interval = app.config['SCHEDULER_REFRESH_INTERVAL']
+
+        self._reset()
+
+    def _reset(self):
+        self._condition = threading.Condition()
+        self._upcoming = {}   # suite slug -> [(timestamp, release id)], soonest first
+        self._current = {}    # suite slug -> (timestamp, release id)
+        self._next = None     # the soonest upcoming timestamp of any suite
+        self._loaded_at = None
+        self._revisions = {}  # suite slug -> schedule_revision, as loaded
+        self._thread = None
+        self._pid = None
+
+    def on_activate(self, callback):
+        """Call `callback(suite_slug, release_id)` whenever a suite's current release changes."""
+        self._listeners.append(callback)
+        return callback
+
+    def current_release_id(self, suite_slug):
+        """Return the id of `suite_slug`'s current release, or None if it has none."""
+        self._ensure_running()
+
+        now = time.time()
+
+        if self._next is not None and self._next <= now:
+            with self._condition:
+                self._activate(now)
+
+        current = self._current.get(suite_slug)
+        return current[1] if current is not None else None
+
+    def wait_for_change(self, suite_slug, release_id, timeout):
+        """Block until `suite_slug`'s current release isn't `release_id`, or for at most
+        `timeout` seconds, and return the id of its current release."""
+        self._ensure_running()
+
+        deadline = time.time() + timeout
+
+        while True:
+            with self._condition:
+                now = time.time()
+
+                if self._next is not None and self._next <= now:
+                    self._activate(now)
+
+                current = self._current.get(suite_slug)
+                current_id = current[1] if current is not None else None
+
+                if current_id != release_id or now >= deadline:
+                    return current_id
+
+                wait = min(deadline - now, self.refresh_interval)
+
+                if self._next is not None:
+                    wait = min(wait, self._next - now)
+
+                self._condition.wait(wait)
+
+            if not self.background and time.time() - self._loaded_at > self.refresh_interval:
+                self.load()
+
+    @traced('scheduler.current_release')
+    def current_release(self, suite):
+        """Return `suite`'s current release, reloading first if another process scheduled one."""
+        if not self.enabled:
+            return suite.current_release()
+
+        if self._loaded_at is not None and suite.schedule_revision != self._revisions.get(suite.slug, 0):
+            self.load()
+
+        release_id = self.current_release_id(suite.slug)
+        return Release.get(release_id) if release_id is not None else None
+
+    def add(self, suite_slug, when, release_id):
+        """Add a release to `suite_slug`'s timeline, activating it at `when`."""
+        with self._condition:
+            self._revisions[suite_slug] = self._revisions.get(suite_slug, 0) + 1
+            bisect.insort(self._upcoming.setdefault(suite_slug, []),
+                          (arrow.get(when).float_timestamp, release_id))
+            self._activate(time.time())
+            self._condition.notify_all()
+
+    def load(self):
+        """Reload every suite's timeline from the database."""
+        revisions = dict(db.session.query(Suite.slug, Suite.schedule_revision))
+        rows = (db.session.query(Release.suite_id, ScheduledRelease.datetime, Release.id)
+                .join(ScheduledRelease)
+                .filter(Release.suite_id.isnot(None))
+                .all())
+
+        with self._condition:
+            current = self._current
+            self._upcoming = {}
+            self._current = {}
+
+            for suite_slug, when, release_id in rows:
+                self._upcoming.setdefault(suite_slug, []).append((when.float_timestamp, release_id))
+
+            for timeline in self._upcoming.values():
+                timeline.sort()
+
+            self._loaded_at = time.time()
+            self._revisions = revisions
+            self._activate(self._loaded_at, previous=current)
+            self._condition.notify_all()
+
+    def _activate(self, now, previous=None):
+        """Make every release due by `now` current. Must hold `_condition`."""
+        previous = dict(self._current) if previous is None else previous
+        changed = []
+
+        for suite_slug, timeline in self._upcoming.items():
+            due = 0
+
+            while due < len(timeline) and timeline[due][0] <= now:
+                due += 1
+
+            if due == 0:
+                continue
+
+            latest = timeline[due - 1]
+            del timeline[:due]
+
+            current = self._current.get(suite_slug)
+
+            if current is None or latest >= current:
+                self._current[suite_slug] = latest
+
+        for suite_slug, current in self._current.items():
+            before = previous.get(suite_slug)
+
+            if before is None or before[1] != current[1]:
+                changed.append((suite_slug, current[1]))
+
+        self._next = min((timeline[0][0] for timeline in self._upcoming.values() if timeline),
+                         default=None)
+
+        if changed:
+            self._condition.notify_all()
+
+        for suite_slug, release_id in changed:
+            for listener in self._listeners:
+                try:
+                    listener(suite_slug, release_id)
+                except Exception:
+                    log.exception("Release activation listener %r failed.", listener)
+
+    def _ensure_running(self):
+        if not self.enabled:
+            return
+
+        if self._pid != os.getpid():
+            # a forked worker must load (and run) its own timeline.
+            with self._condition:
+                if self._pid != os.getpid():
+                    self._pid = os.getpid()
+                    self._loaded_at = None
+                    self._thread = None
+
+        if self._loaded_at is None or time.time() - self._loaded_at > self.refresh_interval:
+            if self._thread is None:
+                self.load()
+
+        if self.background and self._thread is None:
+            with self._condition:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name='ups-scheduler',
+                                                    daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                now = time.time()
+                timeout = self.refresh_interval
+
+                if self._next is not None:
+                    timeout = max(0, min(timeout, self._next - now))
+
+                self._condition.wait(timeout)
+
+            try:
+                with self.app.app_context():
+                    if time.time() - (self._loaded_at or 0) >= self.refresh_interval:
+                        self.load()
+                    else:
+                        with self._condition:
+                            self._activate(time.time())
+            except Exception:
+                log.exception("The release scheduler failed to refresh.")
+
+
+scheduler = ReleaseScheduler()
+
+
+@event.listens_for(ScheduledRelease, 'after_insert')
+def queue_for_timeline(mapper, connection, scheduled_release):
+    """Hold newly scheduled releases in their session until it's committed."""
+    release = scheduled_release.release
+
+    if release.suite_id is not None:
+        object_session(scheduled_release).info.setdefault('scheduled_releases', []).append(
+            (release.suite_id, scheduled_release.datetime, release.id))
+
+
+@event.listens_for(Session, 'after_commit')
+def add_to_timeline(session):
+    """Put the releases a session scheduled on this process' timeline straight away."""
+    for suite_slug, when, release_id in session.info.pop('scheduled_releases', ()):
+        if scheduler.enabled and scheduler._loaded_at is not None:
+            scheduler.add(suite_slug, when, release_id)
+
+
+@event.listens_for(Session, 'after_rollback')
+def forget_scheduled(session):
+    session.info.pop('scheduled_releases', None)
@@ -8,13 +8,36 @@ class Config:
     PROJECT_ROOT = os.path.abspath(os.path.join(APP_DIR, os.pardir))
     DEFAULT_LOCALE = 'en'
 
+    SECRET_KEY = os.getenv('SECRET_KEY')
+    ADMIN_TOKEN = os.getenv('ADMIN_TOKEN')  # Bearer token for the /admin routes; unset disables them
+
     AWS_ACCESS_KEY_ID = os.getenv('AWS_ACCESS_KEY_ID')
     AWS_SECRET_ACCESS_KEY = os.getenv('AWS_SECRET_ACCESS_KEY')
 
+    #
+    # Suite release event streams
+    #
+    EVENTS_HEARTBEAT_INTERVAL = 15  # seconds between keep-alive comments
+    EVENTS_MAX_DURATION = 300       # seconds before a stream ends (clients reconnect)
+
+    #
+    # Logging
+    #
+    LOG_ACCESS_FORMAT = 'text'    # 'text' (colored, to the ups log), 'json' (queued access log) or None
+    LOG_ACCESS_SAMPLE_RATE = 1.0  # fraction of requests written to the JSON access log
+
+    #
+    # Validation
+    #
+    RESPONSE_VALIDATION_RATE = 0.0  # fraction of error responses checked against response.json
+    QUERY_BUDGET_STRICT = False     # raise, rather than warn, when a route exceeds its query budget
+
 
 class ProdConfig(Config):
     ENV = 'prod'
     DEBUG = True
+
+    LOG_ACCESS_FORMAT = 'json'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
 
@@ -38,6 +61,9 @@ class TestConfig(DevConfig):
     TESTING = True
     DEBUG = True
 
+    RESPONSE_VALIDATION_RATE = 1.0
+    QUERY_BUDGET_STRICT = True
+
     #
     # SQLAlchemy
     #
@@ -54,9 +80,16 @@ class TestConfig(DevConfig):
     AWS_ACCESS_KEY_ID = 'INVALID'
     AWS_SECRET_ACCESS_KEY = 'INVALID'
 
+    SECRET_KEY = 'INVALID'
+
     #
     # STORAGE
     #
     STORAGE_DEFAULT_SERVICE = 's3'
     STORAGE_DEFAULT_BUCKET = 'BUCKET'
     STORAGE_DEFAULT_LOCATION = 'LOCATION'
+
+    #
+    # SCHEDULER
+    #
+    SCHEDULER_BACKGROUND = False  # releases are activated by the lookups themselves
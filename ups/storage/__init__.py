@@ -1,14 +1,18 @@
 from .s3 import S3Bucket
+from .local import LocalBucket
+from .registry import buckets
+from .urls import PresignedUrlCache
 
 from flask import current_app
 from ups.log import log
 
+import datetime
+import os
 import re
-import boto3
 
 
 STORAGE_BUCKET_REGEX = \
-    re.compile(r"(?P<service>(s3)):\/\/(?P<location>[^\/]+)\/(?P<bucket>[^\/]+)")
+    re.compile(r"(?P<service>(s3|file)):\/\/(?P<location>[^\/]+)\/(?P<bucket>[^\/]+)")
 STORAGE_STRING_REGEX = \
     re.compile(r"{}\/(?P<key>.+)".format(STORAGE_BUCKET_REGEX.pattern))
 
@@ -21,11 +25,21 @@ def StorageBucket(string):
 
     d = match.groupdict()
 
-    if d['service'] == 's3' or current_app.config['TESTING']:
-        return S3Bucket(name=d['bucket'], location=d['location'])
+    if d['service'] == 'file':
+        if not current_app.config.get('SECRET_KEY'):
+            raise Exception('The "file" storage service needs SECRET_KEY to sign its URLs.')
+
+        def build():
+            return LocalBucket(name=d['bucket'], location=d['location'],
+                               root=current_app.config['STORAGE_LOCAL_ROOT'])
+    elif d['service'] == 's3' or current_app.config['TESTING']:
+        def build():
+            return S3Bucket(name=d['bucket'], location=d['location'])
     else:
         raise Exception('Invalid storage service "{service}" requested.'.format(**d))
 
+    return buckets.get(d['service'], d['location'], d['bucket'], build)
+
 
 def StorageCubby(string, content_type=None):
     bucket = StorageBucket(string)
@@ -33,11 +47,18 @@ def StorageCubby(string, content_type=None):
     return bucket.cubby(match.groupdict()['key'], content_type=content_type)
 
 
+def sign_url(string, duration):
+    return StorageCubby(string).url(duration)
+
+
 class Storage(object):
     def __init__(self, app=None):
         self.default_service = None
         self.default_location = None
         self.default_bucket = None
+        self.content_addressed = False
+        self.urls = None
+        self._session = None
 
         if app is not None:
             self.init_app(app)
@@ -46,23 +67,53 @@ class Storage(object):
         self.app = app
         app.config.setdefault('STORAGE_DEFAULT_SERVICE', 's3')
         app.config.setdefault('STORAGE_DEFAULT_LOCATION', 'us-west-1')
+        app.config.setdefault('STORAGE_URL_DURATION', datetime.timedelta(days=1))
+        app.config.setdefault('STORAGE_URL_REFRESH', datetime.timedelta(hours=1))
+        app.config.setdefault('STORAGE_URL_CACHE_SIZE', 10000)
+        app.config.setdefault('STORAGE_LOCAL_ROOT',
+                              os.path.join(app.config.get('PROJECT_ROOT', os.getcwd()), 'storage'))
+        app.config.setdefault('STORAGE_LOCAL_ACCEL_REDIRECT', None)
+        app.config.setdefault('STORAGE_LOCAL_BASE_URL', None)  # e.g. 'https://ups.example.com'
+        app.config.setdefault('STORAGE_CONTENT_ADDRESSED', False)
 
         self.default_service = self.app.config['STORAGE_DEFAULT_SERVICE']
         self.default_location = self.app.config['STORAGE_DEFAULT_LOCATION']
         self.default_bucket = self.app.config.get('STORAGE_DEFAULT_BUCKET')
+        self.content_addressed = self.app.config['STORAGE_CONTENT_ADDRESSED']
 
-        aws_access_key_id = app.config.get('AWS_ACCESS_KEY_ID')
-        aws_secret_access_key = app.config.get('AWS_SECRET_ACCESS_KEY')
+        self.aws_access_key_id = app.config.get('AWS_ACCESS_KEY_ID')
+        self.aws_secret_access_key = app.config.get('AWS_SECRET_ACCESS_KEY')
 
-        if aws_access_key_id is None and not app.debug:
+        if self.aws_access_key_id is None and not app.debug:
             log.error("'AWS_ACCESS_KEY_ID' is not set.")
 
-        if aws_secret_access_key is None and not app.debug:
+        if self.aws_secret_access_key is None and not app.debug:
             log.error("'AWS_SECRET_ACCESS_KEY' is not set.")
 
-        self.session = boto3.Session(region_name=app.config['STORAGE_DEFAULT_LOCATION'],
-                                     aws_access_key_id=aws_access_key_id,
-                                     aws_secret_access_key=aws_secret_access_key)
+        if self.default_service == 'file' and app.config.get('SECRET_KEY') is None:
+            log.error("'SECRET_KEY' is not set; local storage URLs cannot be signed.")
+
+        self.urls = PresignedUrlCache(sign_url,
+                                      duration=app.config['STORAGE_URL_DURATION'],
+                                      refresh=app.config['STORAGE_URL_REFRESH'],
+                                      max_size=app.config['STORAGE_URL_CACHE_SIZE'])
+
+        # buckets built for a previous app may have been configured differently.
+        buckets.clear()
+
+        self._session = None
+
+    @property
+    def session(self):
+        """A boto3 session with the configured credentials, created when first used."""
+        if self._session is None:
+            import boto3
+
+            self._session = boto3.Session(region_name=self.default_location,
+                                          aws_access_key_id=self.aws_access_key_id,
+                                          aws_secret_access_key=self.aws_secret_access_key)
+
+        return self._session
 
     @property
     def bucket(self):
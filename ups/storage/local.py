@@ -0,0 +1,168 @@
+from flask import current_app
+
+import hashlib
+import hmac
+import mimetypes
+import os
+import shutil
+import tempfile
+import time
+import urllib.parse
+
+from .registry import buckets
+from .service import Bucket, Cubby, KeyValueCubby, timed
+
+
+def url_signature(secret, path, expires):
+    """Return the signature that authorizes downloading `path` until `expires`."""
+    message = f"{path}:{expires}".encode('utf-8')
+    return hmac.new(secret.encode('utf-8'), message, hashlib.sha256).hexdigest()
+
+
+def base_url_adapter():
+    """Return a URL adapter for STORAGE_LOCAL_BASE_URL (or SERVER_NAME), never the request's host,
+    as signed URLs are cached and shared between requests."""
+    config = current_app.config
+    base_url = config['STORAGE_LOCAL_BASE_URL']
+
+    if base_url is None and config.get('SERVER_NAME') is not None:
+        base_url = (f"{config['PREFERRED_URL_SCHEME']}://{config['SERVER_NAME']}"
+                    f"{config['APPLICATION_ROOT'] or ''}")
+
+    if base_url is None:
+        raise Exception("Set STORAGE_LOCAL_BASE_URL (or SERVER_NAME) to link to locally stored files.")
+
+    scheme, netloc, path, _, _ = urllib.parse.urlsplit(base_url)
+
+    return current_app.url_map.bind(netloc, script_name=path or '/', url_scheme=scheme)
+
+
+class LocalBucket(Bucket):
+    """A bucket stored as the directory `<root>/<location>/<name>` on the local filesystem."""
+
+    def __init__(self, name, location, root):
+        super().__init__(name, location)
+
+        self.path = os.path.realpath(os.path.join(root, location, name))
+
+        if not self.path.startswith(os.path.join(os.path.realpath(root), '')):
+            raise ValueError(f"Bucket '{location}/{name}' is outside of {root}.")
+
+        os.makedirs(self.path, exist_ok=True)
+
+    def cubby(self, name, content_type=None, acl=None):
+        return LocalCubby(self, name, content_type=content_type)
+
+    def service_id(self):
+        return "file"
+
+    def delete(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+        buckets.discard(self)
+
+    def list(self, prefix=None, max_keys=None):
+        keys = []
+
+        for directory, _, filenames in os.walk(self.path):
+            for filename in filenames:
+                keys.append(os.path.relpath(os.path.join(directory, filename), self.path))
+
+        keys = sorted(key.replace(os.sep, '/') for key in keys
+                      if prefix is None or key.startswith(prefix))
+
+        return [self.cubby(key) for key in keys[:max_keys]]
+
+
+class LocalCubby(KeyValueCubby):
+    def __init__(self, bucket, name, content_type=None):
+        super().__init__(bucket, name)
+
+        self.name = name
+        self.content_type = content_type or mimetypes.guess_type(name)[0]
+
+        self.path = os.path.realpath(os.path.join(bucket.path, name))
+
+        if not self.path.startswith(os.path.join(bucket.path, '')):
+            raise ValueError(f"Key '{name}' is outside of bucket {bucket}.")
+
+    @timed('url')
+    def url(self, duration=Cubby.DefaultUrlDuration):
+        expires = int(time.time() + duration.total_seconds())
+        path = f"{self.bucket.location}/{self.bucket.name}/{self.key}"
+        signature = url_signature(current_app.config['SECRET_KEY'], path, expires)
+
+        return base_url_adapter().build('api.route_get_stored_file',
+                                        dict(location=self.bucket.location, bucket=self.bucket.name,
+                                             key=self.key, expires=expires, signature=signature),
+                                        force_external=True)
+
+    def store_filelike(self, filelike):
+        self._store(lambda file: shutil.copyfileobj(filelike, file, self.UploadChunkSize))
+        return self.url()
+
+    def store_filepath(self, filepath):
+        with open(filepath, 'rb') as source:
+            self._store(lambda file: shutil.copyfileobj(source, file, self.UploadChunkSize))
+
+        return self.url()
+
+    def _store(self, write):
+        """Write into a temporary file beside the target, then move it into place, so
+        readers never see a partially written file."""
+        directory = os.path.dirname(self.path)
+        os.makedirs(directory, exist_ok=True)
+
+        descriptor, temporary = tempfile.mkstemp(dir=directory, prefix='.upload-')
+
+        try:
+            with os.fdopen(descriptor, 'wb') as file:
+                write(file)
+
+            os.replace(temporary, self.path)
+        except Exception:
+            os.remove(temporary)
+            raise
+
+    def retrieve_filepath(self, filepath, parallel=False):
+        shutil.copyfile(self.path, filepath)  # copied in-kernel where the platform allows it
+
+    def retrieve_filelike(self, filelike):
+        if filelike.closed:
+            raise Exception("File provided was already closed.")
+
+        with open(self.path, 'rb') as file:
+            shutil.copyfileobj(file, filelike, self.DownloadChunkSize)
+
+    def retrieve_range_into(self, view, start):
+        with open(self.path, 'rb') as file:
+            file.seek(start)
+
+            offset = 0
+
+            while offset < len(view):
+                with view[offset:] as remaining:
+                    read = file.readinto(remaining)
+
+                if not read:
+                    raise IOError(f"{self} ended before byte {start + offset}.")
+
+                offset += read
+
+    def move_to(self, cubby):
+        os.makedirs(os.path.dirname(cubby.path), exist_ok=True)
+        os.replace(self.path, cubby.path)
+
+    def delete(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+    def filesize(self):
+        return os.path.getsize(self.path)
+
+    def service_id(self):
+        return "file"
+
+    def exists(self):
+        return os.path.isfile(self.path)
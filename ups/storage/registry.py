@@ -0,0 +1,48 @@
+import os
+import threading
+
+
+class BucketRegistry(object):
+    """A process-wide cache of `Bucket`s by (service, location, name), emptied in a forked child."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets = {}
+        self._pid = os.getpid()
+
+    def get(self, service, location, name, factory):
+        """Return the registered bucket, calling `factory()` to build it if there is none."""
+        key = (service, location, name)
+
+        bucket = self._buckets.get(key)
+
+        if bucket is not None and self._pid == os.getpid():
+            return bucket
+
+        with self._lock:
+            if self._pid != os.getpid():
+                self._buckets = {}
+                self._pid = os.getpid()
+
+            bucket = self._buckets.get(key)
+
+            if bucket is None:
+                bucket = factory()
+                self._buckets[key] = bucket
+
+            return bucket
+
+    def discard(self, bucket):
+        with self._lock:
+            self._buckets.pop((bucket.service_id(), bucket.location, bucket.name), None)
+
+    def clear(self):
+        with self._lock:
+            self._buckets = {}
+            self._pid = os.getpid()
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+buckets = BucketRegistry()
@@ -1,23 +1,33 @@
-from tempfile import SpooledTemporaryFile
+from concurrent.futures import ThreadPoolExecutor
 
-import boto3
-from botocore.exceptions import ClientError
+import threading
 
-from .service import Bucket, Cubby, KeyValueCubby
+from ups.tracing import traced
+
+from .registry import buckets
+from .service import Bucket, Cubby, KeyValueCubby, read_chunk, timed
 
 
 class S3Bucket(Bucket):
+    # Enough for a few concurrent requests, each running a full set of parallel
+    # part uploads or ranged downloads, to reuse kept-alive connections.
+    MaxPoolConnections = 4 * max(Cubby.UploadConcurrency, Cubby.DownloadConcurrency)
+
+    @traced('storage.s3_bucket')
     def __init__(self, name, location, acl='public-read'):
         super().__init__(name, location)
 
-        self.s3 = boto3.resource('s3')
-        self.client = boto3.client('s3')
+        # boto3 takes longer to import than the rest of the app, so it waits for a bucket.
+        import boto3
+        from botocore.config import Config
+        from botocore.exceptions import ClientError
 
-        self._bucket = self.s3.Bucket(name)
+        # only the low-level client is thread-safe, so it is all a shared bucket keeps.
+        self.client = boto3.client('s3', config=Config(max_pool_connections=self.MaxPoolConnections))
 
         try:
             bucket_configuration = {'LocationConstraint': location}
-            self._bucket.create(CreateBucketConfiguration=bucket_configuration)
+            self.client.create_bucket(Bucket=name, CreateBucketConfiguration=bucket_configuration)
         except ClientError:
             pass
 
@@ -28,33 +38,35 @@ class S3Bucket(Bucket):
         return "s3"
 
     def delete(self):
-        self._bucket.delete()
+        self.client.delete_bucket(Bucket=self.name)
+        buckets.discard(self)
 
     def list(self, prefix=None, max_keys=None, **kwargs):
         if prefix is not None:
-            kwargs['prefix'] = prefix
-        if max_keys is not None:
-            kwargs['max_keys'] = max_keys
+            kwargs['Prefix'] = prefix
+
+        cubbies = []
+        pages = self.client.get_paginator('list_objects').paginate(Bucket=self.name, **kwargs)
+
+        for page in pages:
+            for obj in page.get('Contents', []):
+                if max_keys is not None and len(cubbies) >= max_keys:
+                    return cubbies
 
-        keys = self._bucket.objects.all(**kwargs)
+                cubbies.append(S3Cubby(self, obj['Key'], size=obj['Size']))
 
-        return [S3Cubby(self, key.name, key=key) for key in keys]
+        return cubbies
 
 
 class S3Cubby(KeyValueCubby):
-    def __init__(self, bucket, name, content_type=None, acl='public-read', key=None):
+    def __init__(self, bucket, name, content_type=None, acl='public-read', size=None):
         super().__init__(bucket, name)
 
         self.content_type = content_type
-
-        if key is None:
-            self._key = self.bucket._bucket.Object(name)
-        else:
-            self._key = key
-            self.name = self._key.name
-
         self.acl = acl
+        self._size = size
 
+    @timed('url')
     def url(self, duration=Cubby.DefaultUrlDuration):
         return self.bucket.client.generate_presigned_url('get_object',
                                                          Params={
@@ -64,33 +76,113 @@ class S3Cubby(KeyValueCubby):
                                                          ExpiresIn=duration.total_seconds())
 
     def store_filelike(self, filelike):
-        copy = SpooledTemporaryFile()  # boto3 now closes the file.
-        copy.write(filelike.read())
-        copy.seek(0)
-
         details = {'ACL': self.acl}
 
         if self.content_type:
             details['ContentType'] = self.content_type
 
-        self._key.upload_fileobj(copy, ExtraArgs=details)
+        first = read_chunk(filelike, self.UploadChunkSize)
+
+        if len(first) < self.UploadChunkSize:
+            self.bucket.client.put_object(Bucket=self.bucket.name, Key=self.key,
+                                          Body=first, **details)
+        else:
+            self.store_multipart(first, filelike, details)
+
         return self.url()
 
+    def store_multipart(self, first, filelike, details):
+        """Stream `filelike` into a multipart upload, with at most `UploadConcurrency` parts in memory."""
+        client = self.bucket.client
+        params = {"Bucket": self.bucket.name, "Key": self.key}
+
+        upload_id = client.create_multipart_upload(**params, **details)['UploadId']
+
+        slots = threading.BoundedSemaphore(self.UploadConcurrency)
+        failed = threading.Event()
+
+        def upload_part(number, body):
+            try:
+                response = client.upload_part(PartNumber=number, UploadId=upload_id,
+                                              Body=body, **params)
+                return {"ETag": response['ETag'], "PartNumber": number}
+            except Exception:
+                failed.set()
+                raise
+            finally:
+                slots.release()
+
+        try:
+            futures = []
+
+            with ThreadPoolExecutor(max_workers=self.UploadConcurrency) as pool:
+                chunk = first
+                slots.acquire()
+
+                while chunk and not failed.is_set():
+                    futures.append(pool.submit(upload_part, len(futures) + 1, chunk))
+                    chunk = None  # don't pin the part while waiting for a free slot
+
+                    slots.acquire()
+                    chunk = read_chunk(filelike, self.UploadChunkSize)
+
+                slots.release()
+
+            parts = [future.result() for future in futures]
+
+            client.complete_multipart_upload(UploadId=upload_id,
+                                             MultipartUpload={"Parts": parts},
+                                             **params)
+        except Exception:
+            client.abort_multipart_upload(UploadId=upload_id, **params)
+            raise
+
     def retrieve_filelike(self, filelike):
         if filelike.closed:
             raise Exception("File provided was already closed.")
 
-        return self._key.download_fileobj(filelike)
+        return self.bucket.client.download_fileobj(self.bucket.name, self.key, filelike)
+
+    ReadBufferSize = 256 * 1024
+
+    def retrieve_range_into(self, view, start):
+        end = start + len(view) - 1
+
+        body = self.bucket.client.get_object(Bucket=self.bucket.name, Key=self.key,
+                                             Range=f"bytes={start}-{end}")['Body']
+
+        offset = 0
+
+        while offset < len(view):
+            chunk = body.read(min(self.ReadBufferSize, len(view) - offset))
+
+            if not chunk:
+                raise IOError(f"{self} ended before byte {start + offset}.")
+
+            view[offset:offset + len(chunk)] = chunk
+            offset += len(chunk)
+
+    def move_to(self, cubby):
+        # a managed copy, so objects over 5 GB are copied part by part.
+        self.bucket.client.copy({"Bucket": self.bucket.name, "Key": self.key},
+                                cubby.bucket.name, cubby.key,
+                                ExtraArgs={'ACL': cubby.acl})
+        self.delete()
 
     def delete(self):
-        return self._key.delete()
+        return self.bucket.client.delete_object(Bucket=self.bucket.name, Key=self.key)
 
     def filesize(self):
-        return self._key.content_length
+        if self._size is None:
+            self._size = self.bucket.client.head_object(Bucket=self.bucket.name,
+                                                        Key=self.key)['ContentLength']
+
+        return self._size
 
     def service_id(self):
         return "s3"
 
     def exists(self):
-        matches = list(self.bucket._bucket.objects.filter(Prefix=self.key))
-        return len(matches) > 0 and matches[0].key == self.key
+        matches = self.bucket.client.list_objects(Bucket=self.bucket.name, Prefix=self.key,
+                                                  MaxKeys=1).get('Contents', [])
+        return len(matches) > 0 and matches[0]['Key'] == self.key
@@ -1,7 +1,67 @@
+from concurrent.futures import ThreadPoolExecutor
+
 import datetime
+import functools
+import hashlib
 import io
+import mmap
 import os
 
+from ups.metrics import metrics
+from ups.tracing import tracer
+
+
+def timed(operation):
+    """Record the time taken by a cubby method in the `ups_storage_seconds` histogram, and as
+    a span of the current trace."""
+    span_name = f'storage.{operation}'
+
+    def decorator(method):
+        @functools.wraps(method)
+        def timed_method(self, *args, **kwargs):
+            service = self.service_id()
+
+            with metrics.timed(metrics.storage_seconds, operation, service), \
+                    tracer.span(span_name, service=service):
+                return method(self, *args, **kwargs)
+
+        return timed_method
+
+    return decorator
+
+
+def read_chunk(filelike, size):
+    """Read up to `size` bytes from `filelike`, returning fewer only at EOF."""
+    chunks = []
+    remaining = size
+
+    while remaining > 0:
+        chunk = filelike.read(remaining)
+
+        if not chunk:
+            break
+
+        chunks.append(chunk)
+        remaining -= len(chunk)
+
+    return b''.join(chunks)
+
+
+class HashingReader(object):
+    """Wraps a file-like object, hashing everything read through it."""
+
+    def __init__(self, filelike, algorithm='sha256'):
+        self.filelike = filelike
+        self.hash = hashlib.new(algorithm)
+
+    def read(self, size=-1):
+        data = self.filelike.read(size)
+        self.hash.update(data)
+        return data
+
+    def hexdigest(self):
+        return self.hash.hexdigest()
+
 
 class Bucket:
     def __init__(self, name, location):
@@ -25,29 +85,73 @@ class Bucket:
 
 
 class Cubby:
-    def retrieve(self, filepath=None, file=None, bytes=None):
+    @timed('retrieve')
+    def retrieve(self, filepath=None, file=None, bytes=None, parallel=False):
         if filepath is not None:
             if os.path.isdir(filepath):
                 filepath = os.path.join(filepath, self.name)
 
-            return self.retrieve_filepath(filepath)
+            return self.retrieve_filepath(filepath, parallel=parallel)
         elif file is not None:
+            if parallel:
+                return self.retrieve_mapped(file)
+
             return self.retrieve_filelike(file)
         elif bytes is not None:
             return self.retrieve_filelike(bytes)
         else:
             buffer = io.BytesIO()
             self.retrieve_filelike(buffer)
-            buffer.seek(0)
-            return buffer.read()
+            return buffer.getvalue()
+
+    def retrieve_filepath(self, filepath, parallel=False):
+        if parallel:
+            with open(filepath, 'w+b') as file:
+                return self.retrieve_mapped(file)
 
-    def retrieve_filepath(self, filepath):
         with open(filepath, 'wb') as file:
             return self.retrieve_filelike(file)
 
     def retrieve_filelike(self, file):
         raise NotImplementedError()
 
+    DownloadChunkSize = 8 * 1024 * 1024
+    DownloadConcurrency = 4
+
+    def retrieve_mapped(self, file):
+        """Download into `file`, a real file opened 'w+b', as byte ranges fetched in parallel
+        and written straight into a memory map of it."""
+        try:
+            fileno = file.fileno()
+        except (AttributeError, io.UnsupportedOperation):
+            return self.retrieve_filelike(file)
+
+        size = self.filesize()
+
+        file.seek(0)
+        file.truncate(size)
+        file.flush()
+
+        if size == 0:
+            return
+
+        with mmap.mmap(fileno, size) as target, memoryview(target) as view:
+            def fetch(start):
+                with view[start:start + self.DownloadChunkSize] as part:
+                    self.retrieve_range_into(part, start)
+
+            with ThreadPoolExecutor(max_workers=self.DownloadConcurrency) as pool:
+                for future in [pool.submit(fetch, start)
+                               for start in range(0, size, self.DownloadChunkSize)]:
+                    future.result()
+
+            target.flush()
+
+    def retrieve_range_into(self, view, start):
+        """Fill the writable buffer `view` with the bytes beginning at offset `start`."""
+        raise NotImplementedError()
+
+    @timed('store')
     def store(self, filepath=None, file=None, string=None, bytes=None):
         if filepath is not None:
             self.store_filepath(filepath)
@@ -69,11 +173,18 @@ class Cubby:
     def store_filelike(self, filelike):
         raise NotImplementedError()
 
+    UploadChunkSize = 8 * 1024 * 1024  # S3 requires every multipart part but the last >= 5 MiB
+    UploadConcurrency = 4
+
     DefaultUrlDuration = datetime.timedelta(weeks=52 * 3)  # 3 years
 
     def url(self, duration=DefaultUrlDuration):
         raise NotImplementedError()
 
+    def move_to(self, cubby):
+        """Move this cubby's contents to `cubby`, in the same service."""
+        raise NotImplementedError()
+
     def filesize(self):
         return NotImplementedError()
 
@@ -91,10 +202,7 @@ class Cubby:
         return self.bucket.service_id()
 
     def contents(self):
-        result = io.BytesIO()
-        self.retrieve(bytes=result)
-        result.seek(0)
-        return result.read()
+        return self.retrieve()
 
 
 class KeyValueCubby(Cubby):
@@ -0,0 +1,82 @@
+from collections import OrderedDict
+
+import datetime
+import threading
+import time
+
+
+class PresignedUrlCache(object):
+    """Caches presigned URLs by storage string, re-signing each one once per `refresh` window."""
+
+    def __init__(self, sign, duration=datetime.timedelta(days=1),
+                 refresh=datetime.timedelta(hours=1), max_size=10000):
+        if refresh >= duration:
+            raise ValueError("Presigned URLs must be refreshed before they expire.")
+
+        self.sign = sign
+        self.duration = duration
+        self.refresh = refresh
+        self.max_size = max_size
+
+        self._lock = threading.Lock()
+        self._urls = OrderedDict()  # string -> (window, url), oldest signed first
+
+    def window(self, now=None):
+        """Return the index of the refresh window containing `now`."""
+        now = time.time() if now is None else now
+        return int(now // self.refresh.total_seconds())
+
+    def window_start(self, now=None):
+        """Return the time the refresh window containing `now` began, as a UTC datetime."""
+        start = self.window(now) * self.refresh.total_seconds()
+        return datetime.datetime.fromtimestamp(start, datetime.timezone.utc)
+
+    def window_remaining(self, now=None):
+        """Return the seconds left before the URLs served now are re-signed."""
+        now = time.time() if now is None else now
+        return self.refresh.total_seconds() - now % self.refresh.total_seconds()
+
+    def get(self, string):
+        return self.get_many([string])[string]
+
+    def get_many(self, strings):
+        """Return a {string: url} dict, signing every missing or stale URL in one pass."""
+        window = self.window()
+
+        urls = {}
+        signed = []
+
+        for string in strings:
+            entry = self._urls.get(string)
+
+            if entry is not None and entry[0] == window:
+                urls[string] = entry[1]
+            elif string not in urls:
+                urls[string] = self.sign(string, self.duration)
+                signed.append(string)
+
+        if signed:
+            self._store([(string, urls[string]) for string in signed], window)
+
+        return urls
+
+    def _store(self, items, window):
+        with self._lock:
+            for string, url in items:
+                self._urls.pop(string, None)
+                self._urls[string] = (window, url)
+
+            if len(self._urls) > self.max_size:
+                # evict URLs signed in earlier windows first, then the oldest signed.
+                for string in [s for s, (w, _) in self._urls.items() if w != window]:
+                    del self._urls[string]
+
+                while len(self._urls) > self.max_size:
+                    self._urls.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._urls = OrderedDict()
+
+    def __len__(self):
+        return len(self._urls)
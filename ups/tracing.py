@@ -0,0 +1,287 @@
+# -*- coding: utf-8 -*-
+"""Spans timing a request's work, propagated with W3C trace context and written to a file."""
+import atexit
+import functools
+import json
+import os
+import queue
+import random
+import re
+import threading
+import time
+
+from flask import request
+
+from ups.database import on_statements
+
+
+TRACEPARENT_REGEX = re.compile(r'^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$')
+
+_local = threading.local()  # .span: the span being timed by this thread, if any
+
+
+def _current():
+    return getattr(_local, 'span', None)
+
+
+class Span(object):
+    def __init__(self, name, trace_id, parent_id=None, attributes=None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.attributes = attributes or {}
+
+        self.start = time.time()
+        self._start = time.perf_counter()
+        self.duration = None
+
+    def child(self, name, attributes=None):
+        return Span(name, self.trace_id, self.span_id, attributes)
+
+    def finish(self, duration=None):
+        self.duration = time.perf_counter() - self._start if duration is None else duration
+
+    def traceparent(self):
+        """This span as a `traceparent` header value, for the calls it makes."""
+        return f'00-{self.trace_id}-{self.span_id}-01'
+
+    def to_dict(self):
+        return {
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'start': self.start,
+            'duration_ms': round(self.duration * 1000.0, 3),
+            'attributes': self.attributes,
+        }
+
+
+class FileExporter(object):
+    """Appends finished spans to `path` as JSON lines, dropping them if the writer falls behind."""
+
+    def __init__(self, path, max_queued=10000):
+        self.path = path
+        self.dropped = 0
+
+        self._spans = queue.Queue(maxsize=max_queued)
+        self._thread = None
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    def export(self, span):
+        if self._pid != os.getpid():
+            self._forked()
+
+        if self._thread is None:
+            self._start()
+
+        try:
+            self._spans.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self):
+        """Write out the queued spans and stop the writer."""
+        with self._lock:
+            if self._thread is not None:
+                self._spans.put(None)
+                self._thread.join()
+                self._thread = None
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._write, name='trace-exporter',
+                                                daemon=True)
+                self._thread.start()
+
+    def _forked(self):
+        # a forked worker inherits the queue and lock, but not the thread draining them.
+        self._spans = queue.Queue(maxsize=self._spans.maxsize)
+        self._thread = None
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self.dropped = 0
+
+    def _write(self):
+        with open(self.path, 'a') as f:
+            while True:
+                span = self._spans.get()
+
+                if span is None:
+                    return
+
+                f.write(json.dumps(span.to_dict(), default=str) + '\n')
+
+                if self._spans.empty():
+                    f.flush()
+
+
+class _NoSpan(object):
+    """Stands in for a span when the request isn't being traced."""
+
+    def __enter__(self):
+        return None
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_no_span = _NoSpan()
+
+
+class _SpanContext(object):
+    def __init__(self, tracer, span):
+        self.tracer = tracer
+        self.span = span
+
+    def __enter__(self):
+        self.parent = _current()
+        _local.span = self.span
+        return self.span
+
+    def __exit__(self, exc_type, exc, traceback):
+        _local.span = self.parent
+
+        if exc_type is not None:
+            self.span.attributes['error'] = exc_type.__name__
+
+        self.tracer.finish(self.span)
+
+        return False
+
+
+class Tracer(object):
+    def __init__(self, app=None):
+        self.exporter = None
+        self.sample_rate = 0.0
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('TRACING_EXPORT_PATH', None)  # no spans are made without one
+        app.config.setdefault('TRACING_SAMPLE_RATE', 0.0)   # of requests without a sampled parent
+
+        if self.exporter is not None:
+            self.exporter.close()
+            self.exporter = None
+
+        if app.config['TRACING_EXPORT_PATH'] is None:
+            return
+
+        self.exporter = FileExporter(app.config['TRACING_EXPORT_PATH'])
+        self.sample_rate = app.config['TRACING_SAMPLE_RATE']
+
+        atexit.register(self.exporter.close)
+
+        @app.before_request
+        def start_request_span():
+            span = self.start_request(request.headers.get('traceparent'),
+                                      f'{request.method} {request.path}')
+
+            if span is not None:
+                span.attributes['http.method'] = request.method
+                span.attributes['http.target'] = request.full_path.rstrip('?')
+
+            _local.span = span
+
+        @app.after_request
+        def finish_request_span(response):
+            span = _current()
+
+            if span is None:
+                return response
+
+            span.attributes['http.route'] = request.endpoint
+            span.attributes['http.status_code'] = response.status_code
+            response.headers['traceresponse'] = span.traceparent()
+
+            if response.is_streamed:
+                response.call_on_close(lambda: self.finish_request(span))
+            else:
+                self.finish_request(span)
+
+            return response
+
+        def record_statement(bind, statement, seconds):
+            self.record('sql', seconds, bind=bind or 'default', statement=statement[:200])
+
+        on_statements(app, record_statement)
+
+    def start_request(self, traceparent, name):
+        """The root span of a request, or None if it's not to be traced."""
+        match = TRACEPARENT_REGEX.match(traceparent or '')
+
+        if match is not None:
+            trace_id, parent_id, flags = match.groups()
+
+            if not int(flags, 16) & 1:
+                return None
+
+            return Span(name, trace_id, parent_id)
+
+        if self.sample_rate <= 0 or random.random() >= self.sample_rate:
+            return None
+
+        return Span(name, os.urandom(16).hex())
+
+    def finish_request(self, span):
+        _local.span = None
+        self.finish(span)
+
+    def current(self):
+        """The span being timed in this context, or None."""
+        return _current()
+
+    def span(self, name, **attributes):
+        """A context manager timing its body as a child of the current span (if any)."""
+        parent = _current()
+
+        if parent is None:
+            return _no_span
+
+        return _SpanContext(self, parent.child(name, attributes))
+
+    def record(self, name, seconds, **attributes):
+        """Add a child span for something that has just taken `seconds`."""
+        parent = _current()
+
+        if parent is not None:
+            span = parent.child(name, attributes)
+            span.start -= seconds
+            span.finish(seconds)
+            self.finish(span)
+
+    def finish(self, span):
+        if span.duration is None:
+            span.finish()
+
+        if self.exporter is not None:
+            self.exporter.export(span)
+
+
+def traced(name):
+    """Time every call of the decorated function as a span named `name`."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def traced_fn(*args, **kwargs):
+            if _current() is None:
+                return fn(*args, **kwargs)
+
+            with tracer.span(name):
+                return fn(*args, **kwargs)
+
+        return traced_fn
+
+    return decorator
+
+
+tracer = Tracer()
+
+
+def spans_dropped():
+    """The number of spans this process has dropped because its exporter fell behind."""
+    return tracer.exporter.dropped if tracer.exporter is not None else 0
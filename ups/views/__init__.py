@@ -1,4 +1,9 @@
+from .caching import *  # noqa
+from .queries import *  # noqa
 from .package_views import *  # noqa
 from .namespace_views import *  # noqa
 from .suite_views import *  # noqa
 from .version_views import *  # noqa
+from .storage_views import *  # noqa
+from .resolve_views import *  # noqa
+from .admin_views import *  # noqa
@@ -0,0 +1,115 @@
+from flask import current_app, jsonify, request
+
+from .blueprint import blueprint
+from .responses import (InvalidArgumentResponse, MemoryNotTrackedErrorResponse,
+                        ProfilerBusyErrorResponse, SnapshotNotFoundErrorResponse)
+from .utils import admin_required
+
+from ups import memory
+from ups.profiler import ProfilerBusy, Sampler
+
+
+def float_argument(name, default, minimum, maximum):
+    try:
+        value = float(request.args.get(name, default))
+    except ValueError:
+        value = None
+
+    if value is None or not minimum <= value <= maximum:
+        raise InvalidArgumentResponse(code="invalid-argument",
+                                      title=f"Invalid '{name}'",
+                                      detail=f"'{name}' must be a number from {minimum} to {maximum}.")
+
+    return value
+
+
+@blueprint.route('/admin/profile', methods=['GET'])
+@admin_required
+def route_profile():
+    """Sample this worker's other threads for `?seconds=`, responding with the collapsed stacks
+    (or, with `?format=json`, counts by stack)."""
+    seconds = float_argument('seconds', 10, 0.1, current_app.config['PROFILER_MAX_SECONDS'])
+    interval = float_argument('interval', 5, 1, 1000) / 1000.0
+
+    sampler = Sampler(interval=interval)
+
+    try:
+        sampler.run(seconds)
+    except ProfilerBusy:
+        raise ProfilerBusyErrorResponse()
+
+    if request.args.get('format') == 'json':
+        return jsonify(samples=sampler.samples, interval_ms=interval * 1000.0,
+                       stacks=dict(sampler.stacks))
+
+    return current_app.response_class(sampler.collapsed(), mimetype='text/plain')
+
+
+@blueprint.route('/admin/memory', methods=['GET'])
+@admin_required
+def route_memory_status():
+    return jsonify(memory.status())
+
+
+@blueprint.route('/admin/memory/tracking', methods=['POST'])
+@admin_required
+def route_start_memory_tracking():
+    """Start tracking allocations, with `?frames=` frames of traceback each (default 1)."""
+    memory.start(int(float_argument('frames', 1, 1, 100)))
+
+    return jsonify(memory.status())
+
+
+@blueprint.route('/admin/memory/tracking', methods=['DELETE'])
+@admin_required
+def route_stop_memory_tracking():
+    memory.stop()
+
+    return jsonify(memory.status())
+
+
+@blueprint.route('/admin/memory/snapshots', methods=['POST'])
+@admin_required
+def route_take_memory_snapshot():
+    if not memory.status()['tracing']:
+        raise MemoryNotTrackedErrorResponse()
+
+    id = memory.take_snapshot()
+    limit = int(float_argument('limit', 20, 1, 1000))
+
+    return jsonify(id=id, modules=memory.top_modules(memory.get_snapshot(id), limit=limit))
+
+
+@blueprint.route('/admin/memory/snapshots/<int:id>', methods=['GET'])
+@admin_required
+def route_get_memory_snapshot(id):
+    """The modules allocating the most in snapshot `id`, or with `?compare=<earlier id>`, the
+    modules whose allocations grew (or shrank) the most since that snapshot."""
+    snapshot = memory.get_snapshot(id)
+
+    if snapshot is None:
+        raise SnapshotNotFoundErrorResponse(id)
+
+    compared_to = None
+
+    if 'compare' in request.args:
+        compare = request.args['compare']
+        compared_to = memory.get_snapshot(int(compare)) if compare.isdigit() else None
+
+        if compared_to is None:
+            raise SnapshotNotFoundErrorResponse(compare)
+
+    limit = int(float_argument('limit', 20, 1, 1000))
+
+    return jsonify(id=id, compared_to=request.args.get('compare'),
+                   modules=memory.top_modules(snapshot, compared_to, limit=limit))
+
+
+@blueprint.record_once
+def configure_admin(state):
+    state.app.config.setdefault('PROFILER_MAX_SECONDS', 60)
+    state.app.config.setdefault('MEMORY_TRACKING', False)  # track allocations from startup
+    state.app.config.setdefault('MEMORY_TRACKING_FRAMES', 1)
+
+    if state.app.config['MEMORY_TRACKING']:
+        memory.start(state.app.config['MEMORY_TRACKING_FRAMES'])
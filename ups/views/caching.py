@@ -0,0 +1,59 @@
+from flask import current_app, request
+
+from .blueprint import blueprint
+
+import calendar
+import hashlib
+
+
+def make_etag(*parts):
+    """Build an entity tag from the values that identify a response's contents."""
+    return hashlib.sha1(':'.join(str(part) for part in parts).encode('utf-8')).hexdigest()[:32]
+
+
+def _timestamp(dt):
+    return calendar.timegm(dt.utctimetuple())  # naive datetimes are taken to be UTC
+
+
+def is_not_modified(etag, last_modified=None):
+    """Return whether the client's cached copy, per If-None-Match/If-Modified-Since, is current."""
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+
+    if last_modified is not None and request.if_modified_since is not None:
+        return _timestamp(last_modified) <= _timestamp(request.if_modified_since)
+
+    return False
+
+
+def conditional_response(render, etag, last_modified=None, max_age=None):
+    """Respond with `render()`, or with an empty 304 if the client's copy is current."""
+    if is_not_modified(etag, last_modified):
+        response = current_app.response_class(status=304)
+    else:
+        response = render()
+
+    response.set_etag(etag, weak=True)
+
+    if last_modified is not None:
+        response.last_modified = last_modified
+
+    if max_age is None:
+        response.cache_control.no_cache = True
+    else:
+        response.cache_control.public = True
+        response.cache_control.max_age = int(max_age)
+
+    return response
+
+
+@blueprint.after_request
+def add_body_etag(response):
+    """Let clients revalidate JSON GETs whose routes don't set validators of their own."""
+    if (request.method == 'GET' and response.status_code == 200 and
+            response.mimetype == 'application/json' and
+            not response.is_streamed and 'ETag' not in response.headers):
+        response.add_etag()
+        response.make_conditional(request)
+
+    return response
@@ -1,12 +1,29 @@
 from flask import current_app, Response
 
 import json
-import jsonschema
+import random
+
+from ups.log import log
 
 from .blueprint import blueprint
+from .schemas import schemas
+
+
+def validate_response(response):
+    """Check RESPONSE_VALIDATION_RATE of responses against schemas/response.json, raising under
+    TESTING and logging otherwise."""
+    rate = current_app.config.get('RESPONSE_VALIDATION_RATE', 0)
+
+    if rate <= 0 or (rate < 1 and random.random() >= rate):
+        return
+
+    error = next(schemas.validator('response.json').iter_errors(response), None)
 
+    if error is not None:
+        if current_app.testing:
+            raise error
 
-RESPONSE_SCHEMA = json.load(open('./schemas/response.json'))
+        log.error("Invalid error response %s: %s", response, error.message)
 
 
 class ErrorResponse(Exception):
@@ -27,11 +44,11 @@ class ErrorResponse(Exception):
             errors = [error]
         elif type(errors) is list and all(isinstance(e, ErrorResponse) for e in
                                           errors):
-            errors = [e.errors for e in errors]
+            errors = [error for e in errors for error in e.errors]
 
         response = {"errors": errors}
 
-        jsonschema.validate(RESPONSE_SCHEMA, response)
+        validate_response(response)
 
         self.errors = errors
 
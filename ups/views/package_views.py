@@ -1,11 +1,18 @@
-from .utils import success
+from flask import jsonify
+
+from .utils import success, limit_query, cursor_query, with_next_page, stream_json
 from .responses import (PackageNotFoundErrorResponse,
                         PackageAlreadyExistsErrorResponse,
                         NamespaceNotFoundErrorResponse)
 from .blueprint import blueprint
+from .queries import query_budget
+from .errors import ErrorResponse
+from .responses import InvalidArgumentResponse
 
-from ups.models import (Package, Namespace, packages_schema,
-                        package_schema)
+from ups.database import keyset_page, keyset_query
+from ups.models.package_version import parse_version_range
+from ups.models.serializers import dump_packages, iter_dumped, package_rows
+from ups.models import (Package, Namespace, package_schema)
 
 from slugify import slugify
 
@@ -29,11 +36,47 @@ def get_package(namespace_slug, package_slug):
     return match
 
 
+def get_requirements(requirements):
+    """Look up the packages in {package path: version range (or None)}, keyed by package."""
+    if type(requirements) is not dict:
+        raise InvalidArgumentResponse(code="invalid-argument",
+                                      title="Invalid Requirements",
+                                      detail="Requirements must map package paths to version ranges.")
+
+    packages = {package.path: package for package in Package.lookup_paths(list(requirements))}
+    missing_paths = [path for path in requirements if path not in packages]
+
+    if missing_paths:
+        raise ErrorResponse(errors=[PackageNotFoundErrorResponse(path) for path in missing_paths],
+                            status=400)
+
+    for spec in requirements.values():
+        try:
+            if spec is not None:
+                parse_version_range(spec)
+        except (ValueError, AttributeError):
+            raise InvalidArgumentResponse(code="invalid-argument",
+                                          title="Invalid Version Range",
+                                          detail=f"Invalid version range {spec!r}.")
+
+    return {packages[path]: spec for path, spec in requirements.items()}
+
+
 @blueprint.route('/namespaces/<slug:namespace>/', methods=['GET'])
-def route_get_all_packages(namespace):
+@query_budget(3, repeats=1)
+@limit_query(default=100, max=1000, allow_all=True)
+@cursor_query
+def route_get_all_packages(namespace, limit, after):
     match = get_namespace(namespace)
 
-    return packages_schema.jsonify(match.packages, many=True)
+    query = package_rows(Package.query.filter_by(namespace_slug=match.slug))
+
+    if limit is None:
+        return stream_json(iter_dumped(keyset_query(query, [Package.slug], after), dump_packages))
+
+    rows, next_key = keyset_page(query, [Package.slug], limit, after)
+
+    return with_next_page(jsonify(dump_packages(rows)), next_key)
 
 
 @blueprint.route('/namespaces/<slug:namespace>/<package>/', methods=['POST'])
@@ -0,0 +1,73 @@
+from flask import current_app, g, has_request_context, request
+
+from ups.database import on_statements
+from ups.log import log
+
+from .blueprint import blueprint
+
+import collections
+import functools
+
+
+class QueryBudgetExceeded(Exception):
+    """A route ran more SQL statements than its `query_budget` allows."""
+
+
+def query_budget(queries, repeats=None):
+    """Limit a route to `queries` SQL statements per request, and any one statement to `repeats`."""
+    def decorator(route):
+        @functools.wraps(route)
+        def budgeted_route(*args, **kwargs):
+            g.query_budget = (queries, repeats)
+            return route(*args, **kwargs)
+
+        return budgeted_route
+
+    return decorator
+
+
+def count_statement(bind, statement, seconds):
+    if has_request_context() and 'statements' in g:
+        g.statements[statement] += 1
+
+
+@blueprint.record_once
+def count_statements(state):
+    state.app.config.setdefault('QUERY_BUDGET_STRICT', False)
+    state.app.config.setdefault('QUERY_REPEAT_WARNING', 20)  # repeats of a statement to warn about
+
+    on_statements(state.app, count_statement)
+
+
+@blueprint.before_request
+def start_counting_statements():
+    g.statements = collections.Counter()
+
+
+@blueprint.after_request
+def check_query_budget(response):
+    statements = g.pop('statements', None)
+
+    if not statements:
+        return response
+
+    budget = g.get('query_budget')
+    queries, repeats = budget or (None, current_app.config['QUERY_REPEAT_WARNING'])
+    statement, repeated = statements.most_common(1)[0]
+    problems = []
+
+    if queries is not None and sum(statements.values()) > queries:
+        problems.append(f"ran {sum(statements.values())} SQL statements (budget {queries})")
+
+    if repeats is not None and repeated > repeats:
+        problems.append(f"ran one statement {repeated} times (budget {repeats}): {statement}")
+
+    if problems:
+        message = f"{request.method} {request.path} " + '; '.join(problems)
+
+        if budget is not None and current_app.config['QUERY_BUDGET_STRICT']:
+            raise QueryBudgetExceeded(message)
+
+        log.warning(message)
+
+    return response
@@ -1,4 +1,4 @@
-from flask import request
+from flask import current_app, request
 
 from .responses import ReleaseNotFoundErrorResponse
 from .blueprint import blueprint
@@ -18,7 +18,7 @@ def route_get_release(id):
     if release is None:
         raise ReleaseNotFoundErrorResponse(id)
 
-    return release_manifest_schema.jsonify(release)
+    return current_app.response_class(release.manifest_snapshot(), mimetype='application/json')
 
 
 @blueprint.route('/releases/<id>/schedule', methods=['POST'])
@@ -0,0 +1,42 @@
+from flask import jsonify, request
+
+from .blueprint import blueprint
+from .package_views import get_requirements
+from .responses import UnresolvableRequirementsErrorResponse
+from .utils import validate_request_json
+
+from ups.database import db
+from ups.models import Package, PackageVersion, package_version_schema
+from ups.resolver import ResolutionError, resolver
+
+
+@blueprint.route('/resolve', methods=['POST'])
+@validate_request_json("requirements.json")
+def route_resolve():
+    """Resolve {package path: version range} to one version of every package needed, in one go."""
+    requirements = get_requirements(request.json)
+
+    try:
+        solution = resolver.resolve({package.id: spec for package, spec in requirements.items()})
+    except ResolutionError as e:
+        raise UnresolvableRequirementsErrorResponse(Package.get(e.package_id).path, e.constraints)
+
+    versions = (PackageVersion.loading('manifest')
+                              .filter(PackageVersion.id.in_(list(solution.values())))
+                              .options(db.subqueryload(PackageVersion.dependencies))
+                              .all())
+
+    PackageVersion.presign(versions)
+
+    paths = {version.package_id: version.package.path for version in versions}
+
+    resolved = []
+
+    for version in sorted(versions, key=lambda version: paths[version.package_id]):
+        data = package_version_schema.dump(version).data
+        data['path'] = paths[version.package_id]
+        data['dependencies'] = {paths[dependency.package_id]: dependency.constraint
+                                for dependency in version.dependencies}
+        resolved.append(data)
+
+    return jsonify(versions=resolved)
@@ -74,3 +74,66 @@ class InvalidArgumentResponse(JsonApiErrorResponse):
                                 title=title,
                                 detail=detail,
                                 status=400)
+
+
+class UnresolvableRequirementsErrorResponse(JsonApiErrorResponse):
+    def __init__(self, package_path, constraints):
+        if constraints:
+            detail = f"No version of '{package_path}' satisfies {', '.join(constraints)}."
+        else:
+            detail = f"No version of '{package_path}' exists."
+
+        return super().__init__(code="unresolvable",
+                                title="Requirements Unresolvable",
+                                detail=detail,
+                                status=409)
+
+
+class StoredFileNotFoundErrorResponse(ModelNotFoundErrorResponse):
+    def __init__(self, path):
+        detail = f"No stored file '{path}' exists."
+        return super().__init__(model_name="File", detail=detail)
+
+
+class InvalidSignatureErrorResponse(JsonApiErrorResponse):
+    def __init__(self):
+        return super().__init__(code='invalid-signature',
+                                title="Invalid Signature",
+                                detail="This URL has expired or was not signed by this server.",
+                                status=403)
+
+
+class UnknownDigestErrorResponse(ModelNotFoundErrorResponse):
+    def __init__(self, digest):
+        detail = f"No stored file has digest '{digest}'; upload the file instead."
+        return super().__init__(model_name="Digest", detail=detail, status=400)
+
+
+class AdminTokenRequiredErrorResponse(JsonApiErrorResponse):
+    def __init__(self):
+        return super().__init__(code="unauthorized",
+                                title="Admin Token Required",
+                                detail="This route requires the admin token as a Bearer token.",
+                                status=401)
+
+
+class ProfilerBusyErrorResponse(JsonApiErrorResponse):
+    def __init__(self):
+        return super().__init__(code="profiler-busy",
+                                title="Profiler Busy",
+                                detail="This worker is already being profiled; try again shortly.",
+                                status=409)
+
+
+class MemoryNotTrackedErrorResponse(JsonApiErrorResponse):
+    def __init__(self):
+        return super().__init__(code="memory-not-tracked",
+                                title="Memory Not Tracked",
+                                detail="Start tracking allocations before taking a snapshot.",
+                                status=409)
+
+
+class SnapshotNotFoundErrorResponse(ModelNotFoundErrorResponse):
+    def __init__(self, id):
+        detail = f"No memory snapshot {id} exists (only the latest few are kept)."
+        return super().__init__(model_name="Snapshot", detail=detail)
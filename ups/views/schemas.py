@@ -0,0 +1,55 @@
+"""JSON schemas from the project's schemas/ directory, compiled once and shared."""
+import json
+import os
+import pathlib
+import threading
+
+from ups.settings import Config
+
+
+class SchemaRegistry(object):
+    """Validators for the JSON schemas in one directory, each built once per process."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.base_uri = pathlib.Path(directory).as_uri() + '/'
+
+        self._documents = {}
+        self._validators = {}
+        self._lock = threading.Lock()
+
+    def document(self, name):
+        """The parsed schema `name` (such as 'response.json')."""
+        uri = self.base_uri + name
+
+        if uri not in self._documents:
+            with open(os.path.join(self.directory, name)) as f:
+                self._documents[uri] = json.load(f)
+
+        return self._documents[uri]
+
+    def validator(self, name):
+        """A validator for the schema `name`, built the first time it's asked for."""
+        validator = self._validators.get(name)
+
+        if validator is None:
+            with self._lock:
+                validator = self._validators.get(name)
+
+                if validator is None:
+                    validator = self.compile(self.document(name), self.base_uri + name)
+                    self._validators[name] = validator
+
+        return validator
+
+    def compile(self, schema, uri=None):
+        """Build a validator for `schema`, resolving `$ref`s against this directory."""
+        import jsonschema  # only once something is validated; it's slow to import
+
+        resolver = jsonschema.RefResolver(uri or self.base_uri, schema, store=self._documents)
+
+        return jsonschema.Draft4Validator(schema, resolver=resolver,
+                                          format_checker=jsonschema.FormatChecker())
+
+
+schemas = SchemaRegistry(os.path.join(Config.PROJECT_ROOT, 'schemas'))
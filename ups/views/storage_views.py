@@ -0,0 +1,48 @@
+from flask import current_app, request, send_file, Response
+
+from .blueprint import blueprint
+from .responses import (StoredFileNotFoundErrorResponse, InvalidSignatureErrorResponse)
+
+from ups.storage import StorageCubby
+from ups.storage.local import url_signature
+
+import hmac
+import time
+
+
+@blueprint.route('/storage/<location>/<bucket>/<path:key>', methods=['GET'])
+def route_get_stored_file(location, bucket, key):
+    """Serve a file from the local ("file://") storage service via a signed URL."""
+    path = f"{location}/{bucket}/{key}"
+    secret = current_app.config.get('SECRET_KEY')
+
+    if not secret:
+        raise InvalidSignatureErrorResponse()  # nothing can have been signed
+
+    try:
+        expires = int(request.args.get('expires', ''))
+    except ValueError:
+        raise InvalidSignatureErrorResponse()
+
+    expected = url_signature(secret, path, expires)
+
+    if expires < time.time() or not hmac.compare_digest(expected, request.args.get('signature', '')):
+        raise InvalidSignatureErrorResponse()
+
+    cubby = StorageCubby(f"file://{path}")
+
+    if not cubby.exists():
+        raise StoredFileNotFoundErrorResponse(path)
+
+    mimetype = cubby.content_type or 'application/octet-stream'
+    accel_redirect = current_app.config.get('STORAGE_LOCAL_ACCEL_REDIRECT')
+
+    if accel_redirect:
+        # let the fronting nginx send the file itself.
+        response = Response(mimetype=mimetype)
+        response.headers['X-Accel-Redirect'] = f"{accel_redirect.rstrip('/')}/{path}"
+        return response
+
+    # send_file hands the open file to the server's wsgi.file_wrapper (sendfile(2) under
+    # gunicorn), or sets X-Sendfile when USE_X_SENDFILE is on.
+    return send_file(cubby.path, mimetype=mimetype, conditional=True)
@@ -1,15 +1,25 @@
-from flask import request
+from flask import current_app, jsonify, request, stream_with_context
+
+import time
+import uuid
 
 from .blueprint import blueprint
+from .caching import conditional_response, make_etag
+from .queries import query_budget
 from .errors import (ErrorResponse)
 from .responses import (PackageNotFoundErrorResponse,
+                        InvalidArgumentResponse,
                         SuiteNotFoundErrorResponse,
                         SuiteAlreadyExistsErrorResponse,
                         SuiteReleaseNotFoundErrorResponse)
-from .utils import success, validate_request_json
+from .utils import (success, validate_request_json, limit_query, cursor_query,
+                    with_next_page, stream_json)
 
-from ups.models import (Package, Suite, suite_schema,
-                        release_manifest_schema)
+from ups.database import db, keyset_page, keyset_query
+from ups.memory import measure_peak_memory
+from ups.models import (Package, Release, Suite, suite_schema, suite_summary_schema)
+from ups.models.serializers import dump_packages, iter_dumped, package_rows
+from ups.scheduler import scheduler
 
 from slugify import slugify
 
@@ -24,22 +34,105 @@ def get_suite(suite_slug):
 
 
 @blueprint.route('/suites/<slug:suite>/', methods=['GET'])
-def route_get_suite(suite):
+@query_budget(3, repeats=1)
+@limit_query(default=100, max=1000, allow_all=True)
+@cursor_query
+def route_get_suite(suite, limit, after):
     match = get_suite(suite)
 
-    return suite_schema.jsonify(match)
+    query = package_rows(match.packages_query())
+    columns = [Package.namespace_slug, Package.slug]
+
+    data = suite_summary_schema.dump(match).data
+
+    if limit is None:
+        data['packages'] = iter_dumped(keyset_query(query, columns, after), dump_packages)
+        return stream_json(data)
+
+    rows, next_key = keyset_page(query, columns, limit, after)
+
+    data['packages'] = dump_packages(rows)
+
+    return with_next_page(jsonify(data), next_key)
 
 
 @blueprint.route('/suites/<slug:suite>/current', methods=['GET'])
+@query_budget(5, repeats=1)
+@measure_peak_memory
 def route_get_current_suite_manifest(suite):
     suite = get_suite(suite)
 
-    release = suite.current_release()
+    release = scheduler.current_release(suite)
 
     if release is None:
         raise SuiteReleaseNotFoundErrorResponse(suite)
 
-    return release_manifest_schema.jsonify(release)
+    # the current release can change at any moment, so clients always revalidate.
+    window = current_app.storage.urls.window()
+
+    return conditional_response(lambda: current_app.response_class(release.manifest_snapshot(),
+                                                                   mimetype='application/json'),
+                                etag=make_etag(release.id, release.revision, window))
+
+
+@blueprint.route('/suites/<slug:suite>/events', methods=['GET'])
+def route_get_suite_events(suite):
+    """Stream the suite's manifest as a Server-Sent Event each time its current release changes,
+    starting with the current one unless it is `?since=` (or Last-Event-ID)."""
+    suite = get_suite(suite)
+    suite_slug = suite.slug
+
+    since = request.args.get('since') or request.headers.get('Last-Event-ID')
+
+    try:
+        since = uuid.UUID(since) if since else None
+    except ValueError:
+        raise InvalidArgumentResponse(code='invalid-argument', title="Invalid Release Id",
+                                      detail=f"'{since}' is not a release id.")
+
+    heartbeat = current_app.config['EVENTS_HEARTBEAT_INTERVAL']
+    timeout = request.args.get('timeout', current_app.config['EVENTS_MAX_DURATION'])
+
+    try:
+        duration = min(float(timeout), current_app.config['EVENTS_MAX_DURATION'])
+    except ValueError:
+        raise InvalidArgumentResponse(code='invalid-argument', title="Invalid Timeout",
+                                      detail=f"'{timeout}' is not a number of seconds.")
+
+    def events(release_id):
+        deadline = time.time() + duration
+
+        # don't hold a database connection open between events.
+        db.session.close()
+
+        while time.time() < deadline:
+            wait = min(heartbeat, deadline - time.time())
+
+            if scheduler.enabled:
+                current_id = scheduler.wait_for_change(suite_slug, release_id, wait)
+            else:
+                current = Suite.get(suite_slug).current_release()
+                current_id = current.id if current is not None else None
+
+                if current_id is None or current_id == release_id:
+                    time.sleep(wait)
+
+            if current_id is not None and current_id != release_id:
+                release_id = current_id
+                data = Release.get(release_id).manifest_snapshot().decode('utf-8')
+                db.session.close()
+
+                lines = ''.join(f"data: {line}\n" for line in data.splitlines())
+                yield f"id: {release_id}\nevent: release\n{lines}\n"
+            else:
+                yield ": heartbeat\n\n"
+
+    response = current_app.response_class(stream_with_context(events(since)),
+                                          mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # stop nginx from buffering the stream
+
+    return response
 
 
 @blueprint.route('/suites/<slug:suite>/', methods=['DELETE'])
@@ -65,7 +158,7 @@ def route_create_suite(suite):
 
 
 @blueprint.route('/suites/<slug:suite_slug>/packages', methods=['PUT'])
-@validate_request_json("schemas/suite_packages.json")
+@validate_request_json("suite_packages.json")
 def route_update_suite_packages(suite_slug):
     suite = get_suite(suite_slug)
 
@@ -1,16 +1,22 @@
 from flask_login import current_user, login_required
-from flask import jsonify, request
+from flask import current_app, json as flask_json, jsonify, request, stream_with_context
 
 from ups.log import log
 
+from .responses import AdminTokenRequiredErrorResponse
+from .schemas import schemas
+
+import base64
+import binascii
+import collections.abc
 import functools
+import hmac
 import os
 import json
-import pathlib
-import jsonschema
 import re
 
 from isodate import parse_date
+from urllib.parse import urlencode
 
 
 def success(data=None):
@@ -32,6 +38,49 @@ def fail(errors=[], status_code=500):
     return jsonify(errors=errors), status_code
 
 
+def iter_json(obj):
+    """Encode `obj` as JSON a piece at a time, consuming iterators (and iterator values of dicts) lazily."""
+    if isinstance(obj, dict):
+        keys = sorted(obj) if current_app.config['JSON_SORT_KEYS'] else list(obj)
+
+        yield '{'
+
+        for i, key in enumerate(keys):
+            yield (',' if i else '') + json.dumps(str(key)) + ':'
+            yield from iter_json(obj[key])
+
+        yield '}'
+    elif isinstance(obj, collections.abc.Iterator):
+        yield '['
+
+        for i, item in enumerate(obj):
+            yield (',' if i else '') + flask_json.dumps(item)
+
+        yield ']'
+    else:
+        yield flask_json.dumps(obj)
+
+
+def stream_json(obj, status=200, chunk_size=16 * 1024):
+    """Respond with `obj` as JSON, sent as it is encoded (see iter_json()), in chunks."""
+    def chunks():
+        buffer, size = [], 0
+
+        for piece in iter_json(obj):
+            buffer.append(piece)
+            size += len(piece)
+
+            if size >= chunk_size:
+                yield ''.join(buffer)
+                buffer, size = [], 0
+
+        buffer.append('\n')
+        yield ''.join(buffer)
+
+    return current_app.response_class(stream_with_context(chunks()), status=status,
+                                      mimetype='application/json')
+
+
 def role_required(role):
     def decorator(route):
         route = login_required(route)
@@ -48,6 +97,22 @@ def role_required(role):
     return decorator
 
 
+def admin_required(route):
+    """Allow only requests carrying ADMIN_TOKEN as a Bearer token (none, if it isn't set)."""
+    @functools.wraps(route)
+    def decorated_route(*args, **kwargs):
+        token = current_app.config.get('ADMIN_TOKEN')
+        scheme, _, given = request.headers.get('Authorization', '').partition(' ')
+
+        if not token or scheme.lower() != 'bearer' or \
+                not hmac.compare_digest(given.encode('utf-8', 'surrogateescape'), token.encode('utf-8')):
+            raise AdminTokenRequiredErrorResponse()
+
+        return route(*args, **kwargs)
+
+    return decorated_route
+
+
 def concerns(Model, key=None, id_key="id", check_login=True):
     if key is None:
         key = Model.__tablename__
@@ -87,24 +152,11 @@ def concerns(Model, key=None, id_key="id", check_login=True):
 
 
 def get_json_validator(schema):
+    """A validator for `schema`: the name of a file in schemas/, or a schema itself."""
     if type(schema) is str:
-        try:
-            schema = json.load(open(schema))
-        except Exception:
-            raise Exception(f'validate_request_json: failed to load JSON schema from {schema}')
-
-    # get a properly formatted file:// path to the directory for schemas,
-    # to allow schema reference resolution.
-    # for some reason, pathlib.Path() does not append a / to a direcory,
-    # so I put it in manually
-    schemas_directory = os.path.abspath("./schemas/")
-    schemas_directory_uri = pathlib.Path(schemas_directory).as_uri()
-    schemas_directory_uri_string = str(schemas_directory_uri) + "/"
+        return schemas.validator(schema)
 
-    resolver = jsonschema.RefResolver(schemas_directory_uri_string, schema)
-
-    return jsonschema.Draft4Validator(schema, resolver=resolver,
-                                      format_checker=jsonschema.FormatChecker())
+    return schemas.compile(schema)
 
 
 MISSING_REQUIREMENT_REGEX = re.compile(r"^'(?P<key>.+)' is a required property$")
@@ -128,7 +180,8 @@ def error_dict_for_validation_error(error):
 
 def validate_request_json(schema):
     """Augment a route by adding a JSON schema pass before route handling."""
-    validator = get_json_validator(schema)
+    # a named schema is compiled on first use, so importing the routes stays cheap
+    validator = None if type(schema) is str else get_json_validator(schema)
 
     def decorator(route):
         @functools.wraps(route)
@@ -144,7 +197,7 @@ def validate_request_json(schema):
                 return fail(error, 400)
 
             errors = [error_dict_for_validation_error(e)
-                      for e in validator.iter_errors(request.get_json())]
+                      for e in (validator or schemas.validator(schema)).iter_errors(data)]
 
             if len(errors) > 0:
                 return fail(errors, 400)
@@ -156,15 +209,22 @@ def validate_request_json(schema):
     return decorator
 
 
-def limit_query(default=50, max=50):
+def limit_query(default=50, max=50, allow_all=False):
+    """Pass `?limit=` to the route as `limit`; with `allow_all`, `?limit=all` passes None,
+    as does a request without `?limit=` or `?cursor=`, so unpaged clients still get everything."""
     def limit_query_decorator(route):
         @functools.wraps(route)
         def decorated_route(*args, **kwargs):
-            if 'limit' in request.args:
+            if allow_all and (request.args.get('limit') == 'all' or
+                              'limit' not in request.args and 'cursor' not in request.args):
+                kwargs['limit'] = None
+            elif 'limit' in request.args:
                 try:
                     kwargs['limit'] = int(request.args['limit'])
                     if kwargs['limit'] > max:
                         return fail("'limit' must be <= {}".format(max), 400)
+                    if kwargs['limit'] < 1:
+                        return fail("'limit' must be >= 1", 400)
 
                 except Exception:
                     return fail("Failed to parse 'limit' as an integer.", 400)
@@ -178,6 +238,47 @@ def limit_query(default=50, max=50):
     return limit_query_decorator
 
 
+def encode_cursor(key):
+    """Encode a keyset page key as an opaque, URL-safe cursor."""
+    return base64.urlsafe_b64encode(json.dumps(key).encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    key = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8'))
+
+    if type(key) is not list or not key or not all(type(value) is str for value in key):
+        raise ValueError(f"Invalid cursor {cursor!r}.")
+
+    return key
+
+
+def cursor_query(route):
+    """Pass the page key from a `?cursor=` token to the route as `after` (None on the first page)."""
+    @functools.wraps(route)
+    def decorated_route(*args, **kwargs):
+        kwargs['after'] = None
+
+        if 'cursor' in request.args:
+            try:
+                kwargs['after'] = decode_cursor(request.args['cursor'])
+            except (ValueError, binascii.Error, UnicodeError):
+                return fail("Failed to parse 'cursor'.", 400)
+
+        return route(*args, **kwargs)
+
+    return decorated_route
+
+
+def with_next_page(response, next_key):
+    """Add a `Link: <...>; rel="next"` header pointing at the page after `next_key`, if any."""
+    if next_key is not None:
+        args = request.args.to_dict()
+        args['cursor'] = encode_cursor(next_key)
+        response.headers['Link'] = f'<{request.base_url}?{urlencode(args)}>; rel="next"'
+
+    return response
+
+
 def date_range_query(route):
     @functools.wraps(route)
     def decorated_route(*args, **kwargs):
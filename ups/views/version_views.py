@@ -1,13 +1,20 @@
-from .utils import success, fail
+from .utils import success, fail, limit_query, cursor_query, with_next_page, stream_json
 from .blueprint import blueprint
-from .responses import (VersionNotFoundErrorResponse, VersionAlreadyExistsErrorResponse)
+from .caching import conditional_response, make_etag
+from .queries import query_budget
+from .responses import (VersionNotFoundErrorResponse, VersionAlreadyExistsErrorResponse,
+                        UnknownDigestErrorResponse, InvalidArgumentResponse)
 
-from flask import request
+from flask import current_app, jsonify, request
 
-from ups.models import (PackageVersion, package_version_schema,
-                        package_with_versions_schema)
+from sqlalchemy import func
 
-from .package_views import get_package
+from ups.database import db, keyset_page, keyset_query
+from ups.memory import measure_peak_memory
+from ups.models import PackageVersion, package_schema, package_version_schema
+from ups.models.serializers import dump_versions, iter_dumped, version_rows
+
+from .package_views import get_package, get_requirements
 
 
 def get_version(namespace_slug, package_slug, version):
@@ -21,19 +28,97 @@ def get_version(namespace_slug, package_slug, version):
     return version
 
 
+def version_range():
+    """The `?range=` of versions requested (such as '>=1.2,<2') as a filter, or None."""
+    spec = request.args.get('range')
+
+    if spec is None:
+        return None
+
+    try:
+        return PackageVersion.in_range(spec)
+    except ValueError as e:
+        raise InvalidArgumentResponse(code="invalid-argument",
+                                      title="Invalid Version Range",
+                                      detail=str(e))
+
+
 @blueprint.route('/namespaces/<slug:namespace_slug>/<slug:package_slug>/', methods=['GET'])
-def route_get_package(namespace_slug, package_slug):
+@query_budget(4, repeats=1)
+@limit_query(default=100, max=1000, allow_all=True)
+@cursor_query
+def route_get_package(namespace_slug, package_slug, limit, after):
     match = get_package(namespace_slug, package_slug)
-    print(match.versions.all())
-    return package_with_versions_schema.jsonify(match)
+    in_range = version_range()
+
+    count, updated = (db.session.query(func.count(PackageVersion.id), func.max(PackageVersion.updated))
+                      .filter(PackageVersion.package_id == match.id)
+                      .one())
+
+    urls = current_app.storage.urls
+
+    def render():
+        query = PackageVersion.query.filter_by(package_id=match.id)
+
+        if in_range is not None:
+            query = query.filter(in_range)
+
+        columns = [PackageVersion.version_key, PackageVersion.version]
+        data = package_schema.dump(match).data
+
+        if limit is None:
+            data['versions'] = iter_dumped(keyset_query(version_rows(query), columns, after),
+                                           dump_versions)
+            return stream_json(data)
+
+        rows, next_key = keyset_page(version_rows(query), columns, limit, after)
+
+        data['versions'] = dump_versions(rows)
+
+        return with_next_page(jsonify(data), next_key)
+
+    return conditional_response(render,
+                                etag=make_etag(match.id, match.name, count, updated,
+                                               request.query_string, urls.window()),
+                                max_age=urls.window_remaining())
+
+
+@blueprint.route('/namespaces/<slug:namespace_slug>/<slug:package_slug>/latest', methods=['GET'])
+@query_budget(3, repeats=1)
+def route_get_latest_version(namespace_slug, package_slug):
+    package = get_package(namespace_slug, package_slug)
+    version_range()  # validate it before querying
+
+    version = PackageVersion.latest(package, request.args.get('range'))
+
+    if version is None:
+        raise VersionNotFoundErrorResponse(request.args.get('range', 'latest'), package.path)
+
+    # unlike a specific version, "latest" moves whenever a version is added.
+    window = current_app.storage.urls.window()
+
+    return conditional_response(lambda: package_version_schema.jsonify(version),
+                                etag=make_etag(version.id, version.updated, window))
 
 
 @blueprint.route('/namespaces/<slug:namespace_slug>/<slug:package_slug>/<version:version>',
                  methods=['GET'])
+@query_budget(3, repeats=1)
 def route_get_version(namespace_slug, package_slug, version):
     version = get_version(namespace_slug, package_slug, version)
 
-    return package_version_schema.jsonify(version)
+    # cached for as long as its presigned URL is being served, then revalidated, since
+    # a version can be re-uploaded or edited.
+    urls = current_app.storage.urls
+    last_modified = urls.window_start()
+
+    if version.updated is not None:
+        last_modified = max(last_modified, version.updated.datetime)
+
+    return conditional_response(lambda: package_version_schema.jsonify(version),
+                                etag=make_etag(version.id, version.updated, urls.window()),
+                                last_modified=last_modified,
+                                max_age=urls.window_remaining())
 
 
 @blueprint.route('/namespaces/<slug:namespace_slug>/<slug:package_slug>/<version:version>',
@@ -41,7 +126,7 @@ def route_get_version(namespace_slug, package_slug, version):
 def route_delete_version(namespace_slug, package_slug, version):
     version = get_version(namespace_slug, package_slug, version)
 
-    version.cubby().delete()
+    version.delete_file()
     version.delete()
 
     return success()
@@ -49,8 +134,14 @@ def route_delete_version(namespace_slug, package_slug, version):
 
 @blueprint.route('/namespaces/<slug:namespace_slug>/<slug:package_slug>/<version:version>',
                  methods=['POST', 'PUT'])
+@measure_peak_memory
 def route_create_version(namespace_slug, package_slug, version):
-    file = request.files.get('file')
+    if request.mimetype == 'application/zip':
+        file = request.stream  # a raw body is streamed straight to storage, never buffered
+        filename = '.zip'
+    else:
+        file = request.files.get('file')
+        filename = file.filename if file is not None else None
 
     package = get_package(namespace_slug, package_slug)
 
@@ -60,7 +151,7 @@ def route_create_version(namespace_slug, package_slug, version):
         if existing is not None:
             raise VersionAlreadyExistsErrorResponse(version, package_slug)
 
-        if file is None or not file.filename.endswith('.zip'):
+        if file is None or not filename.endswith('.zip'):
             detail = f"The package must be provided as a .zip file in the request."
             error = {
                 "code": "file-missing",
@@ -79,10 +170,21 @@ def route_create_version(namespace_slug, package_slug, version):
         }
         return fail(error, 400)
 
+    digest = data.pop('digest', None)
+    dependencies = data.pop('dependencies', None)
+
     version = existing or PackageVersion(version=version, package=package, **data)
 
+    if dependencies is not None:
+        version.set_dependencies(get_requirements(dependencies))
+
     if file is not None:
-        version.cubby().store(file=file)
+        version.store(file)
+    elif digest is not None:
+        if not current_app.storage.content_addressed or not version.blob_exists(digest):
+            raise UnknownDigestErrorResponse(digest)
+
+        version.link_blob(digest)
 
     version.update(**data)
 